@@ -1,7 +1,9 @@
 from django.contrib import admin
 from website.models import (Category, SubCategory, WebsiteRecommendation,
                             WebsiteComment, BookRecommendation, BookComment,
-                            VideoRecommendation, VideoComment)
+                            VideoRecommendation, VideoComment, UrlMetadata,
+                            VideoMetadata, BookMetadata,
+                            QueuedEmail, Report)
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -11,6 +13,25 @@ class CategoryAdmin(admin.ModelAdmin):
 class SubCategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
 
+
+class ReportAdmin(admin.ModelAdmin):
+    # content_object would load each reported object with its own query
+    list_display = ('content_type', 'object_id', 'reported_by', 'status',
+                    'created_date')
+    list_filter = ('status', 'content_type')
+    list_select_related = ('content_type', 'reported_by')
+    ordering = ('-created_date',)
+    actions = ('mark_resolved', 'mark_dismissed')
+
+    def mark_resolved(self, request, queryset):
+        queryset.update(status=Report.RESOLVED)
+    mark_resolved.short_description = 'Mark selected reports as resolved'
+
+    def mark_dismissed(self, request, queryset):
+        queryset.update(status=Report.DISMISSED)
+    mark_dismissed.short_description = 'Mark selected reports as dismissed'
+
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(SubCategory, SubCategoryAdmin)
 admin.site.register(WebsiteRecommendation)
@@ -19,3 +40,8 @@ admin.site.register(BookRecommendation)
 admin.site.register(BookComment)
 admin.site.register(VideoRecommendation)
 admin.site.register(VideoComment)
+admin.site.register(UrlMetadata)
+admin.site.register(VideoMetadata)
+admin.site.register(BookMetadata)
+admin.site.register(QueuedEmail)
+admin.site.register(Report, ReportAdmin)
@@ -0,0 +1,162 @@
+import os
+from datetime import timedelta
+import bottlenose
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.utils import timezone
+from stdnum import isbn as stdnum_isbn
+from website.models import BookMetadata
+
+
+# ItemLookup accepts up to this many comma separated ItemIds per request
+ITEM_LOOKUP_MAX_IDS = 10
+
+_amazon = None
+
+
+def to_isbn13(isbn):
+    # the ISBN-13 form of a valid ISBN-10 or ISBN-13, so the same book
+    # always has the same key
+    return stdnum_isbn.to_isbn13(isbn)
+
+
+def isbn_forms(isbn):
+    """
+    Returns the ISBN-13 and, for books that have one, the ISBN-10 a valid
+    ISBN can be stored as.
+    """
+    isbn = to_isbn13(isbn)
+    forms = {isbn}
+    if isbn.startswith('978'):
+        forms.add(stdnum_isbn.to_isbn10(isbn))
+    return forms
+
+
+def get_amazon_client():
+    # built the first time it is needed and then shared by every request
+    global _amazon
+    if _amazon is None:
+        _amazon = bottlenose.Amazon(
+            os.environ['AWS_ACCESS_KEY_ID'],
+            os.environ['AWS_SECRET_ACCESS_KEY'],
+            os.environ['AWS_ASSOCIATE_TAG'],
+            Parser=lambda text: BeautifulSoup(text, 'xml')
+        )
+    return _amazon
+
+
+def parse_item(item):
+    """
+    Returns a dict of the book details held in an <Item> element of an
+    ItemLookup response.
+    """
+    date_published = item.find('PublicationDate').string
+    # some amazon books only return the year and not the full date
+    if len(date_published) == 4:
+        date_published = "%s-01-01" % date_published
+    return {
+        'title': item.find('Title').string,
+        'author': item.find('Author').string,
+        'description': item.find('Content').string,
+        'url': item.find('DetailPageURL').string,
+        'image_url': item.find('LargeImage').find('URL').string,
+        'publish_date': date_published,
+    }
+
+
+def fetch_book_details(isbn):
+    """
+    Looks up a book on Amazon by ISBN. Returns a dict of its details, or
+    None if Amazon has no book with that ISBN.
+    """
+    results = get_amazon_client().ItemLookup(ItemId=isbn,
+                                             ResponseGroup="Medium",
+                                             SearchIndex="Books",
+                                             IdType="ISBN")
+    item = results.find('Item')
+    if item is None:
+        return None
+    return parse_item(item)
+
+
+def item_isbns(item):
+    # the identifiers an <Item> can be matched back to a requested ISBN by
+    isbns = set()
+    for tag in ('ASIN', 'ISBN', 'EAN', 'EANListElement'):
+        for element in item.find_all(tag):
+            if element.string:
+                isbns.add(element.string.strip())
+    return isbns
+
+
+def fetch_books_details(isbns):
+    """
+    Looks up at most ITEM_LOOKUP_MAX_IDS ISBNs in a single ItemLookup
+    request. Returns a dict of each ISBN to its details, or to None if
+    Amazon has no usable details for it.
+    """
+    results = get_amazon_client().ItemLookup(ItemId=','.join(isbns),
+                                             ResponseGroup="Medium",
+                                             SearchIndex="Books",
+                                             IdType="ISBN")
+    books = dict.fromkeys(isbns)
+    for item in results.find_all('Item'):
+        try:
+            details = parse_item(item)
+        except AttributeError:
+            # the item is missing an element a recommendation needs
+            continue
+        for isbn in item_isbns(item) & set(isbns):
+            books[isbn] = details
+    return books
+
+
+def cached_book_details(isbn):
+    """
+    Returns (True, details) if a lookup of isbn is stored and still fresh,
+    where details is None for an ISBN Amazon did not know, and (False, None)
+    if it has to be looked up. Lookups are stored under the ISBN-13, so an
+    ISBN-10 and ISBN-13 of one book share them.
+    """
+    metadata = BookMetadata.objects.filter(isbn=to_isbn13(isbn)).first()
+    if metadata is None:
+        return False, None
+    ttl = (settings.BOOK_METADATA_TTL if metadata.found
+           else settings.BOOK_METADATA_NEGATIVE_TTL)
+    if metadata.fetched_date < timezone.now() - timedelta(seconds=ttl):
+        return False, None
+    if not metadata.found:
+        return True, None
+    return True, {'title': metadata.title,
+                  'author': metadata.author,
+                  'description': metadata.description,
+                  'url': metadata.url,
+                  'image_url': metadata.image_url,
+                  'publish_date': metadata.publish_date}
+
+
+def store_book_details(isbn, details):
+    # details of None records that Amazon does not know the ISBN
+    defaults = {'found': details is not None, 'fetched_date': timezone.now()}
+    if details is not None:
+        defaults.update({'title': details['title'],
+                         'author': details['author'],
+                         'description': details['description'],
+                         'url': details['url'],
+                         'image_url': details['image_url'],
+                         'publish_date': details['publish_date']})
+    BookMetadata.objects.update_or_create(isbn=to_isbn13(isbn),
+                                          defaults=defaults)
+
+
+def get_book_details(isbn):
+    """
+    Returns the same as fetch_book_details, reusing stored lookups so an
+    ISBN recommended in several subcategories is only looked up once.
+    ISBNs Amazon does not know are remembered for a shorter time.
+    """
+    found, details = cached_book_details(isbn)
+    if not found:
+        details = fetch_book_details(isbn)
+        store_book_details(isbn, details)
+    return details
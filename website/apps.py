@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class WebsiteConfig(AppConfig):
     name = 'website'
+
+    def ready(self):
+        # connect the signal receivers defined in website/signals.py
+        import website.signals  # noqa
@@ -1,5 +1,26 @@
+from django.conf import settings
+from django.core.cache import cache
 from website.models import Category
 
 
+CATEGORY_CACHE_KEY = 'website_category_navigation'
+
+
+def get_categories():
+    # the category list is shown on every page so it is cached rather than
+    # queried on each render. The signal receivers in website/signals.py
+    # clear it whenever a category is saved or deleted.
+    categories = cache.get(CATEGORY_CACHE_KEY)
+    if categories is None:
+        categories = list(Category.objects.order_by('name'))
+        cache.set(CATEGORY_CACHE_KEY, categories,
+                  settings.CATEGORY_CACHE_TIMEOUT)
+    return categories
+
+
+def clear_category_cache():
+    cache.delete(CATEGORY_CACHE_KEY)
+
+
 def category_context(request):
-    return {'categories': Category.objects.order_by('name')}
+    return {'categories': get_categories()}
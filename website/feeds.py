@@ -0,0 +1,75 @@
+from django.db import connection
+
+
+class RecommendationFeed(object):
+    """
+    A newest first feed merged from querysets of different recommendation
+    models. The database merges, counts and slices the feed with UNION ALL
+    over (type, id, created_date) and only the recommendations on the page
+    being shown are loaded, so it can be handed to el_pagination's paginate
+    tag in place of a sorted list.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = querysets
+        self._count = None
+
+    def _union_sql(self):
+        parts = []
+        params = []
+        for index, queryset in enumerate(self.querysets):
+            sql, queryset_params = (queryset.order_by()
+                                            .values_list('id', 'created_date')
+                                            .query.sql_with_params())
+            alias = 'feed_%d' % index
+            parts.append('SELECT %%s AS item_type, %s.id, %s.created_date '
+                         'FROM (%s) AS %s' % (alias, alias, sql, alias))
+            params.append(index)
+            params.extend(queryset_params)
+        return ' UNION ALL '.join(parts), params
+
+    def count(self):
+        if self._count is None:
+            sql, params = self._union_sql()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM (%s) AS feed' % sql,
+                               params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        # loads the whole feed, the paginate tag only asks for one page
+        return iter(self[:len(self)])
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            items = self[key:key + 1]
+            if not items:
+                raise IndexError('feed index out of range')
+            return items[0]
+
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= start:
+            return []
+
+        sql, params = self._union_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql + ' ORDER BY created_date DESC, item_type, id DESC '
+                      'LIMIT %s OFFSET %s', params + [stop - start, start])
+            rows = cursor.fetchall()
+
+        # load the recommendations on this page, one query per model
+        objects = {}
+        for index, queryset in enumerate(self.querysets):
+            ids = [pk for item_type, pk, created_date in rows
+                   if item_type == index]
+            if ids:
+                objects[index] = queryset.in_bulk(ids)
+        return [objects[item_type][pk]
+                for item_type, pk, created_date in rows
+                if pk in objects[item_type]]
@@ -212,6 +212,8 @@ class VideoForm(forms.ModelForm):
                 subcategory=self.subcategory).exists():
             raise forms.ValidationError("This video has already been "
                                         "recommended!")
+        # kept so the view does not have to parse the url again
+        self.video_id = video_id
         return url
 
 
@@ -238,6 +240,7 @@ class DateFilterForm(forms.Form):
     CHOICES = (('all-time-best', 'All time best'),
                ('best-of-year', 'Best of year'),
                ('best-of-month', 'Best of month'),
+               ('hot', 'Hot'),
                ('newest', 'Newest'),)
 
     time_filter = forms.ChoiceField(
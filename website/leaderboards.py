@@ -0,0 +1,94 @@
+from datetime import date, datetime, time
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import IntegerField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from website.models import LeaderboardEntry
+
+
+# DateFilterForm time_filter values served from a leaderboard
+TIME_FILTER_WINDOWS = {
+    'best-of-year': LeaderboardEntry.YEAR,
+    'best-of-month': LeaderboardEntry.MONTH,
+}
+
+
+def period_start(window, today=None):
+    # first day of the year or month window containing today
+    today = today or date.today()
+    if window == LeaderboardEntry.YEAR:
+        return date(today.year, 1, 1)
+    return date(today.year, today.month, 1)
+
+
+def period_start_datetime(window):
+    return timezone.make_aware(datetime.combine(period_start(window),
+                                                time()))
+
+
+def add_to_leaderboards(*recommendations):
+    """
+    Adds new recommendations to the leaderboards of the windows they were
+    created in.
+    """
+    entries = []
+    for recommendation in recommendations:
+        content_type = ContentType.objects.get_for_model(recommendation)
+        for window, name in LeaderboardEntry.WINDOW_CHOICES:
+            if recommendation.created_date >= period_start_datetime(window):
+                entries.append(LeaderboardEntry(
+                    window=window,
+                    period_start=period_start(window),
+                    content_type=content_type,
+                    object_id=recommendation.pk,
+                    subcategory_id=recommendation.subcategory_id,
+                    score=recommendation.score,
+                    created_date=recommendation.created_date))
+    LeaderboardEntry.objects.bulk_create(entries)
+
+
+def sync_leaderboard_scores(model, pks=None):
+    """
+    Copies the score of the recommendations in pks, or of every
+    recommendation of model, onto their leaderboard entries after their
+    votes change.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    score = RawSQL('SELECT %s.score FROM %s WHERE %s.id = %s.object_id' % (
+        table, table, table, qn(LeaderboardEntry._meta.db_table)), [],
+        output_field=IntegerField())
+    entries = LeaderboardEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(model))
+    if pks is not None:
+        entries = entries.filter(object_id__in=pks)
+    return entries.update(score=score)
+
+
+def refresh_leaderboard(model, window):
+    """
+    Rebuilds the leaderboard of model for the current period of window,
+    dropping the entries of earlier periods. Returns the number of entries.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    start = period_start(window)
+    since = period_start_datetime(window)
+    recommendations = (model.objects
+                            .filter(created_date__gte=since)
+                            .values_list('id', 'subcategory_id', 'score',
+                                         'created_date'))
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(content_type=content_type,
+                                        window=window).delete()
+        entries = LeaderboardEntry.objects.bulk_create(
+            [LeaderboardEntry(window=window,
+                              period_start=start,
+                              content_type=content_type,
+                              object_id=pk,
+                              subcategory_id=subcategory_id,
+                              score=score,
+                              created_date=created_date)
+             for pk, subcategory_id, score, created_date in recommendations],
+            batch_size=1000)
+    return len(entries)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection
+from django.utils import timezone
+from website.models import QueuedEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Stores a mail in the outbox for the send_queued_mail worker, in place
+    of sending it with send_mail while the request waits.
+    """
+    return QueuedEmail.objects.create(subject=subject,
+                                      body=message,
+                                      from_email=from_email,
+                                      to=','.join(recipient_list))
+
+
+def retry_delay(attempts):
+    # doubles after every failed attempt
+    return timedelta(seconds=settings.MAIL_OUTBOX_RETRY_DELAY
+                     * 2 ** (attempts - 1))
+
+
+def mail_failed(queued, error):
+    queued.attempts += 1
+    queued.last_error = str(error)
+    queued.next_attempt_date = timezone.now() + retry_delay(queued.attempts)
+    queued.save(update_fields=['attempts', 'last_error',
+                               'next_attempt_date'])
+
+
+def claim_queued_mail(batch_size):
+    """
+    Claims up to batch_size mails that are due by moving their
+    next_attempt_date MAIL_OUTBOX_CLAIM_TIMEOUT seconds ahead in the same
+    statement that selects them. Rows locked by another worker are skipped,
+    so two workers never send the same mail, and a worker that dies mid
+    batch only holds its mails until the claim runs out.
+    """
+    now = timezone.now()
+    table = db_connection.ops.quote_name(QueuedEmail._meta.db_table)
+    sql = """
+        UPDATE {table}
+        SET next_attempt_date = %s
+        WHERE id IN (
+            SELECT id FROM {table}
+            WHERE sent_date IS NULL AND next_attempt_date <= %s
+              AND attempts < %s
+            ORDER BY next_attempt_date
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id
+    """.format(table=table)
+    claimed_until = now + timedelta(
+        seconds=settings.MAIL_OUTBOX_CLAIM_TIMEOUT)
+    with db_connection.cursor() as cursor:
+        cursor.execute(sql, [claimed_until, now,
+                             settings.MAIL_OUTBOX_MAX_ATTEMPTS, batch_size])
+        ids = [row[0] for row in cursor.fetchall()]
+    return list(QueuedEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def send_queued_mail(batch_size):
+    """
+    Claims and sends up to batch_size mails that are due over a single
+    connection to the mail server. Mails that fail are retried later with a
+    growing delay until MAIL_OUTBOX_MAX_ATTEMPTS is reached. Returns the
+    number of mails tried.
+    """
+    batch = claim_queued_mail(batch_size)
+    if not batch:
+        return 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for queued in batch:
+            mail_failed(queued, e)
+        return len(batch)
+
+    try:
+        for queued in batch:
+            message = EmailMessage(queued.subject, queued.body,
+                                   queued.from_email, queued.to.split(','),
+                                   connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                mail_failed(queued, e)
+            else:
+                queued.sent_date = timezone.now()
+                queued.save(update_fields=['sent_date'])
+    finally:
+        connection.close()
+    return len(batch)
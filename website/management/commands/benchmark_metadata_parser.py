@@ -0,0 +1,63 @@
+import time
+import tracemalloc
+from io import BytesIO
+from django.core.management.base import BaseCommand
+from bs4 import BeautifulSoup
+from website.metadata import read_metadata
+
+
+HEAD = (b'<head><title>Benchmark page</title>'
+        b'<meta property="og:title" content="Benchmark page">'
+        b'<meta property="og:description" content="A large test page">'
+        b'<meta property="og:image" content="http://test.com/img.png">'
+        b'</head>')
+PARAGRAPH = (b'<div class="post"><p>Lorem ipsum dolor sit amet, '
+             b'<a href="/link">consectetur</a> adipiscing elit.</p></div>')
+
+
+def lxml_parse(page):
+    soup = BeautifulSoup(page, 'lxml')
+    og_image_url = soup.find('meta', property='og:image', content=True)
+    return og_image_url['content']
+
+
+def streaming_parse(page):
+    return read_metadata(BytesIO(page), max_bytes=len(page))['image']
+
+
+class Command(BaseCommand):
+    help = ('Compares the streaming open graph parser against parsing the '
+            'whole page with BeautifulSoup and lxml.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 100, 1000, 5000],
+                            help='Page sizes to test in KB.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write('%8s %-10s %12s %14s' % ('size', 'parser',
+                                                   'time (ms)',
+                                                   'peak mem (KB)'))
+        for size in options['sizes']:
+            paragraphs = size * 1024 // len(PARAGRAPH)
+            page = (b'<html>' + HEAD + b'<body>' + PARAGRAPH * paragraphs
+                    + b'</body></html>')
+            for name, parse in (('lxml', lxml_parse),
+                                ('streaming', streaming_parse)):
+                elapsed, peak = self.measure(parse, page, options['repeat'])
+                self.stdout.write('%6sKB %-10s %12.2f %14.1f'
+                                  % (size, name, elapsed * 1000,
+                                     peak / 1024))
+
+    def measure(self, parse, page, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(page)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        tracemalloc.start()
+        parse(page)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from website.vote_events import compact_vote_events
+
+
+class Command(BaseCommand):
+    help = ('Rolls the vote events of the hours that have ended into hourly '
+            'and daily vote snapshots and deletes events and hourly '
+            'snapshots past their retention. Run hourly from the scheduler.')
+
+    def handle(self, *args, **options):
+        hourly, daily, deleted = compact_vote_events()
+        self.stdout.write('%d hourly and %d daily vote snapshots written, '
+                          '%d vote events deleted.' % (hourly, daily, deleted))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from website.models import UrlMetadata
+
+
+class Command(BaseCommand):
+    help = ('Deletes fetched website details that have not been refreshed '
+            'for URL_METADATA_MAX_AGE seconds.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.URL_METADATA_MAX_AGE)
+        deleted, _ = (UrlMetadata.objects
+                                 .filter(fetched_date__lt=cutoff)
+                                 .delete())
+        self.stdout.write('Deleted %d url metadata entries.' % deleted)
@@ -0,0 +1,135 @@
+import csv
+import time
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from website.amazon import (ITEM_LOOKUP_MAX_IDS, cached_book_details,
+                            fetch_books_details, isbn_forms,
+                            store_book_details, to_isbn13)
+from website.leaderboards import add_to_leaderboards
+from website.models import Category, SubCategory, BookRecommendation
+
+
+class Command(BaseCommand):
+    help = ('Recommends every book in a CSV of ISBNs in a subcategory, '
+            'looking the books up on Amazon in batches. ISBNs are stored '
+            'as ISBN-13 and the books are added to the leaderboards and '
+            'search as they are inserted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file',
+                            help='CSV file with an ISBN in the first column.')
+        parser.add_argument('category', help='Category slug.')
+        parser.add_argument('subcategory', help='Subcategory slug.')
+        parser.add_argument('--user', required=True,
+                            help='Username the books are recommended by.')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='Seconds to wait between Amazon requests.')
+
+    def handle(self, *args, **options):
+        try:
+            category = Category.objects.get(slug=options['category'])
+            subcategory = SubCategory.objects.get(
+                slug=options['subcategory'], category=category)
+            user = User.objects.get(username=options['user'])
+        except (Category.DoesNotExist, SubCategory.DoesNotExist,
+                User.DoesNotExist) as e:
+            raise CommandError(e)
+
+        self.failures = []
+        isbns = self.read_isbns(options['csv_file'], subcategory)
+        books = self.look_up_books(isbns, options['sleep'])
+
+        recommendations = []
+        for isbn in isbns:
+            details = books.get(isbn)
+            if details is None:
+                if isbn in books:
+                    self.failures.append((isbn, 'not found on Amazon'))
+                continue
+            recommendations.append(BookRecommendation(
+                isbn=isbn,
+                title=details['title'],
+                recommended_by=user,
+                category=category,
+                subcategory=subcategory,
+                book_author=details['author'],
+                book_description=details['description'],
+                book_url=details['url'],
+                book_image_url=details['image_url'],
+                book_publish_date=details['publish_date']))
+        # bulk_create sends no post_save, so the leaderboard entries the
+        # signal would add are added here; the search vector is filled in by
+        # the table's insert trigger
+        BookRecommendation.objects.bulk_create(recommendations)
+        add_to_leaderboards(*recommendations)
+
+        for isbn, reason in self.failures:
+            self.stderr.write('%s: %s' % (isbn, reason))
+        self.stdout.write('Recommended %d books, %d failed.'
+                          % (len(recommendations), len(self.failures)))
+
+    def read_isbns(self, csv_file, subcategory):
+        # returns the valid ISBNs of the file as ISBN-13s that are not
+        # already recommended in the subcategory, in file order and without
+        # repeats
+        isbn_field = BookRecommendation._meta.get_field('isbn')
+        isbns = []
+        with open(csv_file, newline='') as f:
+            for row in csv.reader(f):
+                if not row or not row[0].strip():
+                    continue
+                isbn = row[0].replace('-', '').replace(' ', '').upper()
+                if isbn == 'ISBN':
+                    continue
+                try:
+                    isbn_field.run_validators(isbn)
+                except ValidationError:
+                    self.failures.append((row[0], 'not a valid ISBN'))
+                    continue
+                isbn = to_isbn13(isbn)
+                if isbn not in isbns:
+                    isbns.append(isbn)
+
+        # books recommended through the site may be stored as ISBN-10s
+        forms = set()
+        for isbn in isbns:
+            forms |= isbn_forms(isbn)
+        existing = set(to_isbn13(isbn) for isbn in
+                       BookRecommendation.objects
+                                         .filter(subcategory=subcategory,
+                                                 isbn__in=forms)
+                                         .values_list('isbn', flat=True))
+        for isbn in isbns:
+            if isbn in existing:
+                self.failures.append((isbn, 'already recommended'))
+        return [isbn for isbn in isbns if isbn not in existing]
+
+    def look_up_books(self, isbns, sleep):
+        books = {}
+        missing = []
+        for isbn in isbns:
+            found, details = cached_book_details(isbn)
+            if found:
+                books[isbn] = details
+            else:
+                missing.append(isbn)
+
+        for start in range(0, len(missing), ITEM_LOOKUP_MAX_IDS):
+            if start:
+                # Amazon throttles accounts making more than one request a
+                # second
+                time.sleep(sleep)
+            batch = missing[start:start + ITEM_LOOKUP_MAX_IDS]
+            try:
+                results = fetch_books_details(batch)
+            except Exception as e:
+                for isbn in batch:
+                    self.failures.append((isbn, 'lookup failed: %s' % e))
+                continue
+            for isbn, details in results.items():
+                store_book_details(isbn, details)
+                books[isbn] = details
+            self.stdout.write('Looked up %d of %d books.'
+                              % (start + len(batch), len(missing)))
+        return books
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from website.metadata import claim_pending_websites, update_website_image
+
+
+class Command(BaseCommand):
+    help = ('Fetches the og:image of website recommendations that are '
+            'waiting for one. Run with --loop as a worker process.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new websites.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--sleep', type=float, default=5,
+                            help='Seconds to wait when nothing is pending.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_batch(options['batch_size'])
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['sleep'])
+
+    def process_batch(self, batch_size):
+        websites = claim_pending_websites(batch_size)
+        for website in websites:
+            try:
+                update_website_image(website)
+            except Exception as error:
+                # one bad row must not stop the rest of the batch, it is
+                # tried again once its claim runs out
+                self.stderr.write('%s: %s' % (website.url, error))
+                continue
+            self.stdout.write('%s: %s' % (website.url,
+                                          website.image_url or 'no image'))
+        return len(websites)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from website.search import SEARCH_FIELDS, search_vector
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the search_vector column of every recommendation, '
+            'in batches of ids so no single update locks a whole table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in SEARCH_FIELDS:
+            last_id = model.objects.aggregate(last_id=Max('id'))['last_id']
+            updated = 0
+            for start in range(0, (last_id or 0) + 1, batch_size):
+                updated += (model.objects
+                                 .filter(id__gte=start,
+                                         id__lt=start + batch_size)
+                                 .update(search_vector=search_vector(model)))
+            self.stdout.write('Rebuilt search vectors for %d %s rows.'
+                              % (updated, model._meta.verbose_name))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from website.models import (WebsiteRecommendation, BookRecommendation,
+                            VideoRecommendation)
+from website.leaderboards import sync_leaderboard_scores
+from website.votes import refresh_vote_counts
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the upvote_count, downvote_count and score columns of '
+            'every recommendation from the vote table.')
+
+    def handle(self, *args, **options):
+        for model in (WebsiteRecommendation, BookRecommendation,
+                      VideoRecommendation):
+            updated = refresh_vote_counts(model)
+            sync_leaderboard_scores(model)
+            self.stdout.write('Rebuilt vote counts for %d %s rows.'
+                              % (updated, model._meta.verbose_name))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from website.models import (WebsiteRecommendation, BookRecommendation,
+                            VideoRecommendation)
+from website.ranking import refresh_hot_scores
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the time decayed scores used by the hot ordering of '
+            'the subcategory listings. Run every 15 minutes from the '
+            'scheduler.')
+
+    def handle(self, *args, **options):
+        for model in (WebsiteRecommendation, BookRecommendation,
+                      VideoRecommendation):
+            updated = refresh_hot_scores(model)
+            self.stdout.write('%d %s hot scores refreshed.'
+                              % (updated, model._meta.verbose_name))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from website.leaderboards import refresh_leaderboard
+from website.models import (WebsiteRecommendation, BookRecommendation,
+                            VideoRecommendation, LeaderboardEntry)
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the best-of-year and best-of-month leaderboards for '
+            'the current year and month, dropping earlier periods and '
+            'picking up bulk inserted rows. Run daily from the scheduler.')
+
+    def handle(self, *args, **options):
+        for model in (WebsiteRecommendation, BookRecommendation,
+                      VideoRecommendation):
+            for window, name in LeaderboardEntry.WINDOW_CHOICES:
+                entries = refresh_leaderboard(model, window)
+                self.stdout.write('%d %s rows in the %s leaderboard.'
+                                  % (entries, model._meta.verbose_name,
+                                     window))
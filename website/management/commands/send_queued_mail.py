@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from website.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = ('Sends the mail waiting in the outbox. Run with --loop as a '
+            'worker process.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new mail.')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--sleep', type=float, default=10,
+                            help='Seconds to wait when nothing is due.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_queued_mail(options['batch_size'])
+            if sent:
+                self.stdout.write('Tried %d queued mails.' % sent)
+            if not options['loop']:
+                break
+            if not sent:
+                time.sleep(options['sleep'])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from website.reports import send_report_digest
+
+
+class Command(BaseCommand):
+    help = ('Queues one mail summarising the recommendation reports made '
+            'since the last digest. Run periodically from the scheduler.')
+
+    def handle(self, *args, **options):
+        reported = send_report_digest()
+        self.stdout.write('%d reported recommendations in the digest.'
+                          % reported)
@@ -0,0 +1,245 @@
+import codecs
+from datetime import timedelta
+from html.parser import HTMLParser
+from http.client import HTTPException
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.request import urlopen, Request
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from website.models import UrlMetadata, WebsiteRecommendation
+
+
+# errors that mean a website or image could not be fetched
+FETCH_ERRORS = (OSError, ValueError, HTTPException)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def open_url(url, method='GET', headers=None):
+    # User-Agent header used as some websites dont let you use urlopen on them
+    request_headers = {'User-Agent': 'Mozilla'}
+    request_headers.update(headers or {})
+    return urlopen(Request(url, headers=request_headers, method=method),
+                   timeout=settings.WEBSITE_FETCH_TIMEOUT)
+
+
+class OpenGraphParser(HTMLParser):
+    """
+    Collects the og:image, og:title and og:description meta tags of a page
+    as it is fed, and marks itself finished once the head has ended so the
+    rest of the page never needs to be read.
+    """
+    PROPERTIES = {'og:image': 'image',
+                  'og:title': 'title',
+                  'og:description': 'description'}
+
+    def __init__(self):
+        super(OpenGraphParser, self).__init__(convert_charrefs=True)
+        self.metadata = {}
+        self.finished = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            key = self.PROPERTIES.get(attrs.get('property') or
+                                      attrs.get('name'))
+            if key and attrs.get('content') and key not in self.metadata:
+                self.metadata[key] = attrs['content'].strip()
+        elif tag == 'body':
+            self.finished = True
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.finished = True
+
+
+def read_metadata(response, max_bytes, chunk_size=8192, encoding='utf-8'):
+    """
+    Reads the open graph metadata from a file like response in chunks,
+    stopping at the end of the head or after max_bytes have been read.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parser = OpenGraphParser()
+    bytes_read = 0
+    while not parser.finished and bytes_read < max_bytes:
+        chunk = response.read(min(chunk_size, max_bytes - bytes_read))
+        if not chunk:
+            break
+        bytes_read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+    return parser.metadata
+
+
+def image_works(image_url):
+    """
+    Checks an image can be downloaded without downloading it, using a HEAD
+    request or a one byte range request for servers that refuse HEAD.
+    """
+    try:
+        try:
+            response = open_url(image_url, method='HEAD')
+        except HTTPError as error:
+            if error.code not in (403, 405, 501):
+                return False
+            response = open_url(image_url, headers={'Range': 'bytes=0-0'})
+        with response:
+            content_type = response.headers.get('Content-Type', 'image/')
+            return content_type.startswith('image/')
+    except FETCH_ERRORS:
+        return False
+
+
+def normalize_url(url):
+    """
+    Returns the form of url used as the UrlMetadata key. The scheme and
+    host are lowercased, default ports and fragments removed and an empty
+    path becomes '/'.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = '%s:%s' % (host, parts.port)
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def cached_url_metadata(url):
+    # the stored details of url if they are still fresh, without any request
+    max_age = timedelta(seconds=settings.URL_METADATA_TTL)
+    fresh_since = timezone.now() - max_age
+    return (UrlMetadata.objects
+                       .filter(url=normalize_url(url),
+                               fetched_date__gte=fresh_since)
+                       .first())
+
+
+def get_url_metadata(url):
+    """
+    Returns the UrlMetadata of the website at url. Fresh entries are
+    returned without a request, stale ones are revalidated with their ETag
+    and Last-Modified values and only fetched again if the page changed.
+    Raises one of FETCH_ERRORS if the website cannot be fetched.
+    """
+    entry = cached_url_metadata(url)
+    if entry is not None:
+        return entry
+
+    key = normalize_url(url)
+    entry = UrlMetadata.objects.filter(url=key).first()
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    try:
+        with open_url(url, headers=headers) as response:
+            encoding = response.headers.get_content_charset() or 'utf-8'
+            metadata = read_metadata(response,
+                                     settings.WEBSITE_FETCH_MAX_BYTES,
+                                     encoding=encoding)
+            etag = response.headers.get('ETag', '')
+            last_modified = response.headers.get('Last-Modified', '')
+    except HTTPError as error:
+        if error.code == 304 and entry is not None:
+            entry.fetched_date = timezone.now()
+            entry.save(update_fields=['fetched_date'])
+            return entry
+        raise
+
+    image_url = None
+    if metadata.get('image'):
+        image_url = urljoin(url, metadata['image'])
+        if not image_works(image_url):
+            image_url = None
+
+    entry, created = UrlMetadata.objects.update_or_create(
+        url=key,
+        defaults={'image_url': image_url,
+                  'title': metadata.get('title', '')[:500],
+                  'description': metadata.get('description', '')[:2000],
+                  'etag': etag[:500],
+                  'last_modified': last_modified[:100],
+                  'fetched_date': timezone.now()})
+    return entry
+
+
+def fitting_image_url(image_url):
+    # og:image urls longer than WebsiteRecommendation.image_url allows are
+    # dropped rather than cut short into a broken link
+    max_length = WebsiteRecommendation._meta.get_field('image_url').max_length
+    if image_url and len(image_url) > max_length:
+        return None
+    return image_url
+
+
+def claim_pending_websites(batch_size):
+    """
+    Claims up to batch_size websites waiting for their og:image, fewest
+    attempts first, and counts the attempt in the same statement. Rows
+    locked by another worker or claimed within WEBSITE_IMAGE_CLAIM_TIMEOUT
+    are skipped, so two workers never fetch the same website and one that
+    died mid fetch only holds its rows until the claim runs out. Websites
+    whose last allowed attempt was claimed by a worker that died are given
+    up on here, as no claim would pick them up again.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.WEBSITE_IMAGE_CLAIM_TIMEOUT)
+    WebsiteRecommendation.objects.filter(
+        image_pending=True,
+        image_fetch_attempts__gte=settings.WEBSITE_IMAGE_MAX_ATTEMPTS,
+        image_claimed_date__lt=expired).update(image_pending=False,
+                                               image_claimed_date=None)
+    table = connection.ops.quote_name(WebsiteRecommendation._meta.db_table)
+    sql = """
+        UPDATE {table}
+        SET image_fetch_attempts = image_fetch_attempts + 1,
+            image_claimed_date = %s
+        WHERE id IN (
+            SELECT id FROM {table}
+            WHERE image_pending AND image_fetch_attempts < %s
+              AND (image_claimed_date IS NULL OR image_claimed_date < %s)
+            ORDER BY image_fetch_attempts, created_date
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id
+    """.format(table=table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [now, settings.WEBSITE_IMAGE_MAX_ATTEMPTS,
+                             expired, batch_size])
+        ids = [row[0] for row in cursor.fetchall()]
+    return list(WebsiteRecommendation.objects
+                                     .filter(id__in=ids)
+                                     .order_by('image_fetch_attempts',
+                                               'created_date'))
+
+
+def update_website_image(website):
+    """
+    Fetches the og:image of a website claimed by claim_pending_websites and
+    releases the claim. A website that cannot be reached stays pending
+    until it has been tried WEBSITE_IMAGE_MAX_ATTEMPTS times.
+    """
+    try:
+        metadata = get_url_metadata(website.url)
+    except FETCH_ERRORS:
+        metadata = None
+    if metadata is not None:
+        website.image_url = fitting_image_url(metadata.image_url)
+        website.image_pending = False
+    elif (website.image_fetch_attempts >=
+            settings.WEBSITE_IMAGE_MAX_ATTEMPTS):
+        website.image_pending = False
+    # an update rather than save() so a website deleted while it was being
+    # fetched is skipped instead of raising
+    WebsiteRecommendation.objects.filter(pk=website.pk).update(
+        image_url=website.image_url,
+        image_pending=website.image_pending,
+        image_claimed_date=None)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def populate_vote_counts(apps, schema_editor):
+    qn = schema_editor.quote_name
+    for model_name in ('WebsiteRecommendation', 'BookRecommendation',
+                       'VideoRecommendation'):
+        model = apps.get_model('website', model_name)
+        table = qn(model._meta.db_table)
+        counts = []
+        for field_name in ('upvote', 'downvote'):
+            field = model._meta.get_field(field_name)
+            through = qn(field.remote_field.through._meta.db_table)
+            counts.append('(SELECT COUNT(*) FROM %s WHERE %s.%s = %s.id)' % (
+                through, through, qn(field.m2m_column_name()), table))
+        schema_editor.execute(
+            'UPDATE %s SET upvote_count = %s, downvote_count = %s, '
+            'score = %s - %s' % (table, counts[0], counts[1], counts[0],
+                                 counts[1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0035_auto_20180228_1121'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='score',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='videorecommendation',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='videorecommendation',
+            name='score',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='videorecommendation',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='score',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_vote_counts,
+                             migrations.RunPython.noop),
+    ]
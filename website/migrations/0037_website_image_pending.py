@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0036_vote_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='image_fetch_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='image_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
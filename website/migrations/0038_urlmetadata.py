@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0037_website_image_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UrlMetadata',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2000, unique=True)),
+                ('image_url', models.URLField(blank=True, max_length=2000, null=True)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('description', models.CharField(blank=True, max_length=2000)),
+                ('etag', models.CharField(blank=True, max_length=500)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('fetched_date', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
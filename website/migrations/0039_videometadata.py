@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0038_urlmetadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoMetadata',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=128, unique=True)),
+                ('title', models.CharField(max_length=128)),
+                ('description', models.CharField(max_length=10000)),
+                ('thumbnail_url', models.URLField(max_length=500)),
+                ('publish_date', models.DateTimeField()),
+                ('fetched_date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
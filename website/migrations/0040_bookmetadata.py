@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0039_videometadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookMetadata',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isbn', models.CharField(max_length=32, unique=True)),
+                ('found', models.BooleanField(default=True)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('author', models.CharField(blank=True, max_length=128)),
+                ('description', models.CharField(blank=True, max_length=10000)),
+                ('url', models.URLField(blank=True, max_length=2000)),
+                ('image_url', models.URLField(blank=True, max_length=500)),
+                ('publish_date', models.DateField(blank=True, null=True)),
+                ('fetched_date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# table, text columns of the search vector
+SEARCH_TABLES = (
+    ('website_websiterecommendation', ('title', 'description')),
+    ('website_bookrecommendation', ('title', 'book_description')),
+    ('website_videorecommendation', ('title', 'video_description')),
+)
+
+
+def vector_sql(columns, prefix=''):
+    # matches SearchVector(*columns) with the default search configuration
+    return "to_tsvector(%s)" % " || ' ' || ".join(
+        "COALESCE(%s%s, '')" % (prefix, column) for column in columns)
+
+
+def search_sql(table, columns):
+    return """
+        CREATE INDEX {table}_search_vector_gin ON {table}
+            USING gin(search_vector);
+
+        CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {new_vector};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER {table}_search_vector_update
+            BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_update();
+
+        UPDATE {table} SET search_vector = {vector};
+    """.format(table=table, columns=', '.join(columns),
+               new_vector=vector_sql(columns, 'NEW.'),
+               vector=vector_sql(columns))
+
+
+def reverse_search_sql(table):
+    return """
+        DROP TRIGGER {table}_search_vector_update ON {table};
+        DROP FUNCTION {table}_search_vector_update();
+        DROP INDEX {table}_search_vector_gin;
+    """.format(table=table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0042_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videorecommendation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+    ] + [
+        migrations.RunSQL(search_sql(table, columns),
+                          reverse_search_sql(table))
+        for table, columns in SEARCH_TABLES
+    ]
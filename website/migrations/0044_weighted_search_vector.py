@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# table, title column, description column
+SEARCH_TABLES = (
+    ('website_websiterecommendation', 'title', 'description'),
+    ('website_bookrecommendation', 'title', 'book_description'),
+    ('website_videorecommendation', 'title', 'video_description'),
+)
+
+
+def weighted_vector_sql(title, description, prefix=''):
+    # matches SearchVector(title, weight='A') +
+    # SearchVector(description, weight='B')
+    return ("setweight(to_tsvector(COALESCE({p}{title}, '')), 'A') || "
+            "setweight(to_tsvector(COALESCE({p}{description}, '')), 'B')"
+            .format(p=prefix, title=title, description=description))
+
+
+def plain_vector_sql(title, description, prefix=''):
+    return ("to_tsvector(COALESCE({p}{title}, '') || ' ' || "
+            "COALESCE({p}{description}, ''))"
+            .format(p=prefix, title=title, description=description))
+
+
+def update_sql(vector_sql, table, title, description):
+    return """
+        CREATE OR REPLACE FUNCTION {table}_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {new_vector};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        UPDATE {table} SET search_vector = {vector};
+    """.format(table=table,
+               new_vector=vector_sql(title, description, 'NEW.'),
+               vector=vector_sql(title, description))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0043_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(update_sql(weighted_vector_sql, *columns),
+                          update_sql(plain_vector_sql, *columns))
+        for columns in SEARCH_TABLES
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# table, column of each trigram index. The indexes are on UPPER(column)
+# because that is what Django's icontains lookup compares.
+TRIGRAM_COLUMNS = (
+    ('website_websiterecommendation', 'title'),
+    ('website_bookrecommendation', 'title'),
+    ('website_videorecommendation', 'title'),
+    ('website_subcategory', 'name'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0044_weighted_search_vector'),
+    ]
+
+    operations = [TrigramExtension()] + [
+        migrations.RunSQL(
+            'CREATE INDEX {table}_{column}_trgm ON {table} '
+            'USING gin (UPPER({column}::text) gin_trgm_ops);'.format(
+                table=table, column=column),
+            'DROP INDEX {table}_{column}_trgm;'.format(
+                table=table, column=column))
+        for table, column in TRIGRAM_COLUMNS
+    ]
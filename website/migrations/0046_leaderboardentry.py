@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import date, datetime, time
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def populate_leaderboards(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    LeaderboardEntry = apps.get_model('website', 'LeaderboardEntry')
+    today = date.today()
+    periods = (('year', date(today.year, 1, 1)),
+               ('month', date(today.year, today.month, 1)))
+    for model_name in ('WebsiteRecommendation', 'BookRecommendation',
+                       'VideoRecommendation'):
+        model = apps.get_model('website', model_name)
+        content_type, created = ContentType.objects.get_or_create(
+            app_label='website', model=model_name.lower())
+        for window, start in periods:
+            since = timezone.make_aware(datetime.combine(start, time()))
+            LeaderboardEntry.objects.bulk_create([
+                LeaderboardEntry(window=window,
+                                 period_start=start,
+                                 content_type=content_type,
+                                 object_id=pk,
+                                 subcategory_id=subcategory_id,
+                                 score=score,
+                                 created_date=created_date)
+                for pk, subcategory_id, score, created_date in (
+                    model.objects.filter(created_date__gte=since)
+                                 .values_list('id', 'subcategory_id',
+                                              'score', 'created_date'))
+            ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('website', '0045_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('year', 'Year'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('score', models.IntegerField(default=0)),
+                ('created_date', models.DateTimeField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='website.SubCategory')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together=set([('content_type', 'object_id', 'window')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='leaderboardentry',
+            index_together=set([('content_type', 'subcategory', 'window', 'period_start', 'score')]),
+        ),
+        migrations.RunPython(populate_leaderboards,
+                             migrations.RunPython.noop),
+    ]
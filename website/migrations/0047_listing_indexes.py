@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# index name, table, columns. Written as SQL because index_together cannot
+# express the descending orderings the listings use.
+LISTING_INDEXES = (
+    ('website_websiterecommendation_subcategory_newest',
+     'website_websiterecommendation', 'subcategory_id, created_date DESC'),
+    ('website_websiterecommendation_subcategory_score',
+     'website_websiterecommendation',
+     'subcategory_id, score DESC, created_date DESC'),
+    ('website_bookrecommendation_subcategory_newest',
+     'website_bookrecommendation', 'subcategory_id, created_date DESC'),
+    ('website_bookrecommendation_subcategory_score',
+     'website_bookrecommendation',
+     'subcategory_id, score DESC, created_date DESC'),
+    ('website_videorecommendation_subcategory_newest',
+     'website_videorecommendation', 'subcategory_id, created_date DESC'),
+    ('website_videorecommendation_subcategory_score',
+     'website_videorecommendation',
+     'subcategory_id, score DESC, created_date DESC'),
+    ('website_websitecomment_website_newest',
+     'website_websitecomment', 'website_id, created_date DESC'),
+    ('website_bookcomment_book_newest',
+     'website_bookcomment', 'book_id, created_date DESC'),
+    ('website_videocomment_video_newest',
+     'website_videocomment', 'video_id, created_date DESC'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0046_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX %s ON %s (%s);' % (name, table, columns),
+            'DROP INDEX %s;' % name)
+        for name, table, columns in LISTING_INDEXES
+    ]
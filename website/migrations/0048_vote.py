@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+RECOMMENDATION_MODELS = ('WebsiteRecommendation', 'BookRecommendation',
+                         'VideoRecommendation')
+VOTE_FIELDS = (('upvote', 1), ('downvote', -1))
+
+
+def vote_tables(apps, schema_editor):
+    # yields the recommendation table, its content type id and the through
+    # table, user and recommendation columns and vote value of each m2m
+    qn = schema_editor.quote_name
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    for model_name in RECOMMENDATION_MODELS:
+        model = apps.get_model('website', model_name)
+        content_type, created = ContentType.objects.get_or_create(
+            app_label='website', model=model_name.lower())
+        for field_name, value in VOTE_FIELDS:
+            field = model._meta.get_field(field_name)
+            yield (qn(model._meta.db_table), content_type.pk,
+                   qn(field.remote_field.through._meta.db_table),
+                   qn(field.m2m_reverse_name()), qn(field.m2m_column_name()),
+                   value)
+
+
+def move_votes(apps, schema_editor):
+    qn = schema_editor.quote_name
+    votes = qn(apps.get_model('website', 'Vote')._meta.db_table)
+    tables = set()
+    for (table, content_type, through, user_column, object_column,
+         value) in vote_tables(apps, schema_editor):
+        tables.add((table, content_type))
+        # a user found in both the upvote and downvote tables of a
+        # recommendation adds up to 0, which cancels out as it did in score
+        schema_editor.execute(
+            'INSERT INTO {votes} '
+            '(user_id, content_type_id, object_id, value, created_date) '
+            'SELECT {user}, %s, {object}, %s, NOW() FROM {through} '
+            'ON CONFLICT (user_id, content_type_id, object_id) '
+            'DO UPDATE SET value = {votes}.value + EXCLUDED.value'.format(
+                votes=votes, user=user_column, object=object_column,
+                through=through),
+            [content_type, value])
+    schema_editor.execute('DELETE FROM %s WHERE value = 0' % votes)
+    for table, content_type in tables:
+        counts = [
+            '(SELECT COUNT(*) FROM {votes} WHERE {votes}.content_type_id = '
+            '{content_type} AND {votes}.object_id = {table}.id AND '
+            '{votes}.value = {value})'.format(
+                votes=votes, content_type=content_type, table=table,
+                value=value)
+            for field_name, value in VOTE_FIELDS]
+        schema_editor.execute(
+            'UPDATE %s SET upvote_count = %s, downvote_count = %s, '
+            'score = %s - %s' % (table, counts[0], counts[1], counts[0],
+                                 counts[1]))
+
+
+def restore_votes(apps, schema_editor):
+    qn = schema_editor.quote_name
+    votes = qn(apps.get_model('website', 'Vote')._meta.db_table)
+    for (table, content_type, through, user_column, object_column,
+         value) in vote_tables(apps, schema_editor):
+        schema_editor.execute(
+            'INSERT INTO {through} ({user}, {object}) '
+            'SELECT user_id, object_id FROM {votes} '
+            'WHERE content_type_id = %s AND value = %s'.format(
+                through=through, user=user_column, object=object_column,
+                votes=votes),
+            [content_type, value])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('website', '0047_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('value', models.SmallIntegerField(choices=[(1, 'Upvote'), (-1, 'Downvote')])),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='vote',
+            unique_together=set([('user', 'content_type', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='vote',
+            index_together=set([('content_type', 'object_id', 'value')]),
+        ),
+        migrations.RunPython(move_votes, restore_votes),
+        migrations.RemoveField(
+            model_name='bookrecommendation',
+            name='downvote',
+        ),
+        migrations.RemoveField(
+            model_name='bookrecommendation',
+            name='upvote',
+        ),
+        migrations.RemoveField(
+            model_name='videorecommendation',
+            name='downvote',
+        ),
+        migrations.RemoveField(
+            model_name='videorecommendation',
+            name='upvote',
+        ),
+        migrations.RemoveField(
+            model_name='websiterecommendation',
+            name='downvote',
+        ),
+        migrations.RemoveField(
+            model_name='websiterecommendation',
+            name='upvote',
+        ),
+    ]
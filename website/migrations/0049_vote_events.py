@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('website', '0048_vote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('upvotes', models.SmallIntegerField()),
+                ('downvotes', models.SmallIntegerField()),
+                ('created_date', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('upvotes', models.IntegerField(default=0)),
+                ('downvotes', models.IntegerField(default=0)),
+                ('score', models.IntegerField(default=0)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='votesnapshot',
+            unique_together=set([('content_type', 'object_id', 'period', 'period_start')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='votesnapshot',
+            index_together=set([('content_type', 'period', 'period_start')]),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# index name, table. Written as SQL because index_together cannot express
+# the descending ordering of the hot listing.
+HOT_INDEXES = (
+    ('website_websiterecommendation_subcategory_hot',
+     'website_websiterecommendation'),
+    ('website_bookrecommendation_subcategory_hot',
+     'website_bookrecommendation'),
+    ('website_videorecommendation_subcategory_hot',
+     'website_videorecommendation'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0049_vote_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='videorecommendation',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+    ] + [
+        # the same decay as website.ranking.refresh_hot_scores, so the hot
+        # listing is ordered before the first refresh_hot_scores run. Rows
+        # older than HOT_SCORE_WINDOW keep the default of 0.
+        migrations.RunSQL(
+            [('UPDATE %s SET hot_score = score / POWER(GREATEST(EXTRACT('
+              'EPOCH FROM NOW() - created_date), 0) / 3600 + %%s, %%s) '
+              'WHERE created_date >= NOW() - %%s * INTERVAL \'1 second\';'
+              % table, [settings.HOT_AGE_OFFSET, settings.HOT_GRAVITY,
+                        settings.HOT_SCORE_WINDOW])],
+            migrations.RunSQL.noop)
+        for name, table in HOT_INDEXES
+    ] + [
+        migrations.RunSQL(
+            'CREATE INDEX %s ON %s '
+            '(subcategory_id, hot_score DESC, created_date DESC);'
+            % (name, table),
+            'DROP INDEX %s;' % name)
+        for name, table in HOT_INDEXES
+    ]
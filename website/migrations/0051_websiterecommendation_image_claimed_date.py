@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0050_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websiterecommendation',
+            name='image_claimed_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
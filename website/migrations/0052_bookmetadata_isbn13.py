@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from stdnum import isbn as stdnum_isbn
+
+
+def key_by_isbn13(apps, schema_editor):
+    # stored lookups are now keyed on the ISBN-13. An ISBN-10 row is moved
+    # to its ISBN-13 unless that book was looked up under both already.
+    BookMetadata = apps.get_model('website', 'BookMetadata')
+    for metadata in BookMetadata.objects.exclude(isbn__regex=r'^\d{13}$'):
+        if not stdnum_isbn.is_valid(metadata.isbn):
+            continue
+        isbn13 = stdnum_isbn.to_isbn13(metadata.isbn)
+        if BookMetadata.objects.filter(isbn=isbn13).exists():
+            metadata.delete()
+        else:
+            metadata.isbn = isbn13
+            metadata.save(update_fields=['isbn'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0051_websiterecommendation_image_claimed_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_by_isbn13, migrations.RunPython.noop),
+    ]
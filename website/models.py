@@ -1,5 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import (GenericForeignKey,
+                                                GenericRelation)
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.template.defaultfilters import slugify
 from django.utils import timezone
 from isbn_field import ISBNField
@@ -47,21 +51,38 @@ class WebsiteRecommendation(models.Model):
     description = models.CharField(max_length=300)  # length may need changing
     url = models.URLField()
     image_url = models.URLField(null=True, blank=True)
+    # set when a new recommendation is waiting for the
+    # process_website_images worker to look up its og:image
+    image_pending = models.BooleanField(default=False, db_index=True)
+    image_fetch_attempts = models.PositiveSmallIntegerField(default=0)
+    # set while a worker is fetching the og:image, so other workers skip it
+    image_claimed_date = models.DateTimeField(null=True, blank=True)
     created_date = models.DateTimeField(
             default=timezone.now)
-    upvote = models.ManyToManyField(User, related_name='website_upvote',
-                                    blank=True)
-    downvote = models.ManyToManyField(User, related_name='website_downvote',
-                                      blank=True)
     bookmark = models.ManyToManyField(User, related_name='bookmark',
                                       blank=True)
+    votes = GenericRelation('Vote')
+    reports = GenericRelation('Report')
+    leaderboard_entries = GenericRelation('LeaderboardEntry')
+    vote_events = GenericRelation('VoteEvent')
+    vote_snapshots = GenericRelation('VoteSnapshot')
+
+    # denormalised vote counters, kept in step with the votes by
+    # website.votes.toggle_vote and the Vote receivers in website/signals.py
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0, db_index=True)
+    # score decayed by age for the hot ordering, recomputed periodically by
+    # the refresh_hot_scores command, see website/ranking.py
+    hot_score = models.FloatField(default=0)
+
+    # full text search vector, filled in by a database trigger on insert and
+    # update, see website/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     @property
     def total_votes(self):
-        total_upvotes = self.upvote.count()
-        total_downvotes = self.downvote.count()
-
-        return total_upvotes - total_downvotes
+        return self.score
 
     class Meta:
         unique_together = (("category", "subcategory", "url"),)
@@ -93,16 +114,29 @@ class BookRecommendation(models.Model):
     book_url = models.URLField(max_length=2000)
     book_image_url = models.URLField(max_length=500)  # check length is ok
     book_publish_date = models.DateField()
-    upvote = models.ManyToManyField(User, related_name='book_upvote')
-    downvote = models.ManyToManyField(User, related_name='book_downvote')
     bookmark = models.ManyToManyField(User, related_name='book_bookmark')
+    votes = GenericRelation('Vote')
+    reports = GenericRelation('Report')
+    leaderboard_entries = GenericRelation('LeaderboardEntry')
+    vote_events = GenericRelation('VoteEvent')
+    vote_snapshots = GenericRelation('VoteSnapshot')
+
+    # denormalised vote counters, kept in step with the votes by
+    # website.votes.toggle_vote and the Vote receivers in website/signals.py
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0, db_index=True)
+    # score decayed by age for the hot ordering, recomputed periodically by
+    # the refresh_hot_scores command, see website/ranking.py
+    hot_score = models.FloatField(default=0)
+
+    # full text search vector, filled in by a database trigger on insert and
+    # update, see website/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     @property
     def total_votes(self):
-        total_upvotes = self.upvote.count()
-        total_downvotes = self.downvote.count()
-
-        return total_upvotes - total_downvotes
+        return self.score
 
     class Meta:
         unique_together = (("category", "subcategory", "isbn"),)
@@ -132,16 +166,29 @@ class VideoRecommendation(models.Model):
     video_url = models.URLField(max_length=2000)  # change length?
     video_image_url = models.URLField(max_length=500)  # check length is ok
     video_id = models.CharField(max_length=128)  # change length?
-    upvote = models.ManyToManyField(User, related_name='video_upvote')
-    downvote = models.ManyToManyField(User, related_name='video_downvote')
     bookmark = models.ManyToManyField(User, related_name='video_bookmark')
+    votes = GenericRelation('Vote')
+    reports = GenericRelation('Report')
+    leaderboard_entries = GenericRelation('LeaderboardEntry')
+    vote_events = GenericRelation('VoteEvent')
+    vote_snapshots = GenericRelation('VoteSnapshot')
+
+    # denormalised vote counters, kept in step with the votes by
+    # website.votes.toggle_vote and the Vote receivers in website/signals.py
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0, db_index=True)
+    # score decayed by age for the hot ordering, recomputed periodically by
+    # the refresh_hot_scores command, see website/ranking.py
+    hot_score = models.FloatField(default=0)
+
+    # full text search vector, filled in by a database trigger on insert and
+    # update, see website/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     @property
     def total_votes(self):
-        total_upvotes = self.upvote.count()
-        total_downvotes = self.downvote.count()
-
-        return total_upvotes - total_downvotes
+        return self.score
 
     class Meta:
         unique_together = (("category", "subcategory", "video_id"),)
@@ -159,3 +206,201 @@ class VideoComment(models.Model):
 
     def __str__(self):
         return self.text
+
+
+class UrlMetadata(models.Model):
+    # open graph details fetched from a website, shared by every
+    # recommendation of the same url. url holds the normalised url.
+    url = models.URLField(max_length=2000, unique=True)
+    image_url = models.URLField(max_length=2000, null=True, blank=True)
+    title = models.CharField(max_length=500, blank=True)
+    description = models.CharField(max_length=2000, blank=True)
+    # validators used to revalidate the entry once it is stale
+    etag = models.CharField(max_length=500, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    fetched_date = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.url
+
+
+class VideoMetadata(models.Model):
+    # YouTube snippet details shared by every recommendation of a video
+    video_id = models.CharField(max_length=128, unique=True)
+    title = models.CharField(max_length=128)
+    description = models.CharField(max_length=10000)
+    thumbnail_url = models.URLField(max_length=500)
+    publish_date = models.DateTimeField()
+    fetched_date = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.video_id
+
+
+class BookMetadata(models.Model):
+    # Amazon details of a book shared by every recommendation of the ISBN.
+    # found is False when Amazon did not know the ISBN.
+    isbn = models.CharField(max_length=32, unique=True)
+    found = models.BooleanField(default=True)
+    title = models.CharField(max_length=500, blank=True)
+    author = models.CharField(max_length=128, blank=True)
+    description = models.CharField(max_length=10000, blank=True)
+    url = models.URLField(max_length=2000, blank=True)
+    image_url = models.URLField(max_length=500, blank=True)
+    publish_date = models.DateField(null=True, blank=True)
+    fetched_date = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.isbn
+
+
+class QueuedEmail(models.Model):
+    # outbox of mail waiting to be sent by the send_queued_mail worker.
+    # sent_date is set once the mail has gone, next_attempt_date is pushed
+    # back each time sending fails.
+    subject = models.CharField(max_length=500)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    # comma separated recipient addresses
+    to = models.TextField()
+    created_date = models.DateTimeField(default=timezone.now)
+    next_attempt_date = models.DateTimeField(default=timezone.now,
+                                             db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_date = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return self.subject
+
+
+class Report(models.Model):
+    # a user's report of a problem with a recommendation, worked through by
+    # moderators in the admin. digested is set once the report has been
+    # included in a send_report_digest mail.
+    OPEN = 'open'
+    RESOLVED = 'resolved'
+    DISMISSED = 'dismissed'
+    STATUS_CHOICES = (
+        (OPEN, 'Open'),
+        (RESOLVED, 'Resolved'),
+        (DISMISSED, 'Dismissed'),
+    )
+
+    reported_by = models.ForeignKey(User)
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=OPEN, db_index=True)
+    created_date = models.DateTimeField(default=timezone.now)
+    digested = models.BooleanField(default=False, db_index=True)
+
+    class Meta:
+        index_together = (("content_type", "object_id"),)
+
+    def __str__(self):
+        return '%s: %s' % (self.content_type, self.object_id)
+
+
+class LeaderboardEntry(models.Model):
+    # a recommendation's place in the best-of-year or best-of-month
+    # leaderboard of its subcategory, see website/leaderboards.py. score is
+    # a copy of the recommendation's score kept in step when votes change.
+    YEAR = 'year'
+    MONTH = 'month'
+    WINDOW_CHOICES = (
+        (YEAR, 'Year'),
+        (MONTH, 'Month'),
+    )
+
+    window = models.CharField(max_length=5, choices=WINDOW_CHOICES)
+    # first day of the year or month the entry belongs to
+    period_start = models.DateField()
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    subcategory = models.ForeignKey(SubCategory)
+    score = models.IntegerField(default=0)
+    created_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = (("content_type", "object_id", "window"),)
+        index_together = (("content_type", "subcategory", "window",
+                           "period_start", "score"),)
+
+
+class Vote(models.Model):
+    # one user's upvote or downvote of a website, book or video
+    # recommendation. A user has at most one vote per recommendation.
+    UP = 1
+    DOWN = -1
+    VALUE_CHOICES = (
+        (UP, 'Upvote'),
+        (DOWN, 'Downvote'),
+    )
+
+    user = models.ForeignKey(User)
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    value = models.SmallIntegerField(choices=VALUE_CHOICES)
+    created_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = (("user", "content_type", "object_id"),)
+        # covers the per recommendation counts without reading the table
+        index_together = (("content_type", "object_id", "value"),)
+
+    def __str__(self):
+        return '%s: %s %s' % (self.user, self.content_type, self.object_id)
+
+
+class VoteEvent(models.Model):
+    # append-only record of a change to a recommendation's votes made by
+    # the vote views. upvotes and downvotes are the changes to its counters,
+    # so replacing a downvote with an upvote is +1 and -1. Rolled into
+    # VoteSnapshot rows by compact_vote_events and deleted once older than
+    # VOTE_EVENT_RETENTION, see website/vote_events.py.
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    upvotes = models.SmallIntegerField()
+    downvotes = models.SmallIntegerField()
+    created_date = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return '%s: %s' % (self.content_type, self.object_id)
+
+
+class VoteSnapshot(models.Model):
+    # the net change to a recommendation's votes during one hour or day,
+    # summed from its VoteEvent rows. Hourly snapshots are deleted once
+    # older than VOTE_SNAPSHOT_HOURLY_RETENTION, daily ones are kept.
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateTimeField()
+    upvotes = models.IntegerField(default=0)
+    downvotes = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (("content_type", "object_id", "period",
+                            "period_start"),)
+        # covers the recent snapshots of every recommendation of a type
+        index_together = (("content_type", "period", "period_start"),)
+
+    def __str__(self):
+        return '%s: %s %s %s' % (self.content_type, self.object_id,
+                                 self.period, self.period_start)
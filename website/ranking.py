@@ -0,0 +1,59 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from website.leaderboards import TIME_FILTER_WINDOWS, period_start
+
+
+def ranked_recommendations(model, subcategory, time_filter=None):
+    """
+    Returns the recommendations of model in subcategory ordered for the
+    DateFilterForm time_filter. Vote orderings read the stored score column
+    rather than aggregating over the vote table. The best of year and month
+    orderings read the leaderboard of the window instead of filtering every
+    recommendation by date, and the hot ordering reads the hot_score column
+    kept by refresh_hot_scores.
+    """
+    queryset = model.objects.filter(subcategory=subcategory)
+
+    if time_filter == 'newest':
+        return queryset.order_by('-created_date')
+    if time_filter == 'hot':
+        return queryset.order_by('-hot_score', '-created_date')
+
+    window = TIME_FILTER_WINDOWS.get(time_filter)
+    if window is not None:
+        return (queryset.filter(
+                    leaderboard_entries__subcategory=subcategory,
+                    leaderboard_entries__window=window,
+                    leaderboard_entries__period_start=period_start(window))
+                .order_by('-leaderboard_entries__score', '-created_date'))
+    return queryset.order_by('-score', '-created_date')
+
+
+def refresh_hot_scores(model, now=None):
+    """
+    Recomputes the hot_score column of the recommendations of model created
+    in the last HOT_SCORE_WINDOW seconds as their score decayed by their
+    age at now, the way Hacker News ranks stories. Older recommendations
+    are dropped out of the ordering by setting their hot_score to 0, as a
+    heavily voted one would otherwise keep outranking new ones. Scores only
+    decay with time, so this is run periodically rather than on each
+    request. Returns the number of rows updated.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.HOT_SCORE_WINDOW)
+    hot_score = RawSQL(
+        'score / POWER(GREATEST(EXTRACT(EPOCH FROM %s - created_date), 0) '
+        '/ 3600 + %s, %s)',
+        [now, settings.HOT_AGE_OFFSET, settings.HOT_GRAVITY],
+        output_field=FloatField())
+    recommendations = model._default_manager.all()
+    updated = (recommendations.filter(created_date__gte=cutoff)
+                              .update(hot_score=hot_score))
+    # rows that left the window since the last run
+    updated += (recommendations.filter(created_date__lt=cutoff)
+                               .exclude(hot_score=0)
+                               .update(hot_score=0))
+    return updated
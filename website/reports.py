@@ -0,0 +1,86 @@
+from itertools import groupby
+from django.conf import settings
+from django.db import transaction
+from website.mail import queue_mail
+from website.models import (Report, WebsiteRecommendation,
+                            BookRecommendation, VideoRecommendation)
+
+
+# the heading and author field of each kind of recommendation in a digest
+REPORT_TARGETS = {
+    WebsiteRecommendation: ('Website', 'website_author'),
+    BookRecommendation: ('Book', 'recommended_by'),
+    VideoRecommendation: ('Video', 'recommended_by'),
+}
+
+
+def load_targets(reports):
+    # returns {(content_type_id, object_id): recommendation} using one query
+    # per kind of recommendation
+    ids = {}
+    for report in reports:
+        ids.setdefault(report.content_type, set()).add(report.object_id)
+    targets = {}
+    for content_type, object_ids in ids.items():
+        model = content_type.model_class()
+        author_field = REPORT_TARGETS[model][1]
+        objects = (model.objects
+                        .select_related('category', 'subcategory',
+                                        author_field)
+                        .in_bulk(object_ids))
+        for pk, target in objects.items():
+            targets[(content_type.id, pk)] = target
+    return targets
+
+
+def digest_section(target, reports):
+    heading, author_field = REPORT_TARGETS[type(target)]
+    lines = ['Type: ' + heading,
+             'Category: ' + str(target.category),
+             'Subcategory: ' + str(target.subcategory),
+             'Recommended by: ' + str(getattr(target, author_field)),
+             'Title: ' + str(target.title),
+             'Reports: %d' % len(reports)]
+    for report in reports:
+        lines.append('Issue reported by %s: %s' % (report.reported_by,
+                                                   report.message))
+    return '\n'.join(lines)
+
+
+def send_report_digest():
+    """
+    Queues one mail summarising every report not yet digested, with the
+    reports of each recommendation collapsed into a single section.
+    Returns the number of recommendations in the digest.
+    """
+    with transaction.atomic():
+        # only the report rows are locked, a FOR UPDATE over the
+        # select_related join would lock the reporting users and content
+        # types too for as long as the digest takes
+        pks = list(Report.objects
+                         .select_for_update()
+                         .filter(digested=False)
+                         .values_list('pk', flat=True))
+        if not pks:
+            return 0
+        reports = list(Report.objects
+                             .filter(pk__in=pks)
+                             .select_related('reported_by', 'content_type')
+                             .order_by('content_type', 'object_id',
+                                       'created_date'))
+        targets = load_targets(reports)
+
+        sections = []
+        for key, target_reports in groupby(
+                reports, lambda r: (r.content_type_id, r.object_id)):
+            if key in targets:
+                sections.append(digest_section(targets[key],
+                                               list(target_reports)))
+        if sections:
+            queue_mail('Noobhub recommendation reports: %d reported'
+                       % len(sections),
+                       '\n\n'.join(sections),
+                       settings.REPORT_DIGEST_FROM_EMAIL,
+                       settings.REPORT_DIGEST_RECIPIENTS)
+        Report.objects.filter(pk__in=pks).update(digested=True)
+    return len(sections)
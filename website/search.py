@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction, OperationalError
+from django.db.models import F
+from website.models import (SubCategory, WebsiteRecommendation,
+                            BookRecommendation, VideoRecommendation)
+
+
+logger = logging.getLogger(__name__)
+
+
+# the title and description columns making up each recommendation's
+# search_vector, weighted A and B so title matches rank higher. The
+# database triggers from migrations 0043 and 0044 build the same vector on
+# every insert and update, so keep the two in step.
+SEARCH_FIELDS = {
+    WebsiteRecommendation: ('title', 'description'),
+    BookRecommendation: ('title', 'book_description'),
+    VideoRecommendation: ('title', 'video_description'),
+}
+
+# the kinds of recommendation in a site search, with their link and image
+# columns. The position of each kind is its item_type in the search SQL.
+SITE_SEARCH_TYPES = (
+    ('website', WebsiteRecommendation, 'url', 'image_url'),
+    ('book', BookRecommendation, 'book_url', 'book_image_url'),
+    ('video', VideoRecommendation, 'video_url', 'video_image_url'),
+)
+
+SearchResult = namedtuple('SearchResult', [
+    'type', 'id', 'title', 'description', 'url', 'image_url',
+    'category_name', 'category_slug', 'subcategory_name',
+    'subcategory_slug', 'rank', 'cursor'])
+
+
+def search_vector(model):
+    title, description = SEARCH_FIELDS[model]
+    return (SearchVector(title, weight='A')
+            + SearchVector(description, weight='B'))
+
+
+def ranked_matches(queryset, query):
+    """
+    Returns the rows of queryset matching query annotated with their rank.
+    Only the SEARCH_CANDIDATE_LIMIT highest ranked matches are kept, so a
+    broad query does not join and sort every matching row.
+    """
+    candidates = (queryset.filter(search_vector=query)
+                          .annotate(rank=SearchRank(F('search_vector'),
+                                                    query))
+                          .order_by('-rank', '-score')
+                          .values('id')[:settings.SEARCH_CANDIDATE_LIMIT])
+    return (queryset.model.objects
+                    .filter(id__in=candidates)
+                    .annotate(rank=SearchRank(F('search_vector'), query)))
+
+
+def search_recommendations(model, subcategory, keywords):
+    """
+    Returns the recommendations in subcategory matching keywords, most
+    relevant first, using the stored search_vector column and its GIN index.
+    """
+    return (ranked_matches(model.objects.filter(subcategory=subcategory),
+                           SearchQuery(keywords))
+            .order_by('-rank', '-score', '-created_date'))
+
+
+def parse_cursor(cursor):
+    # returns the (rank, item_type, id) a cursor string was made from, or
+    # None if it is not a valid cursor
+    try:
+        rank, item_type, pk = cursor.split(':')
+        return Decimal(rank), int(item_type), int(pk)
+    except (AttributeError, ValueError, InvalidOperation):
+        return None
+
+
+def search_site(keywords, after=None, limit=20):
+    """
+    Searches websites, books and videos in every category with a single
+    query, merging them most relevant first. Returns a page of up to limit
+    SearchResults and the cursor to pass as after for the next page, or
+    None on the last page.
+
+    Pages are keyed on (rank, item_type, id) of the last result instead of
+    an offset, so later pages cost the same as the first. Ranks are rounded
+    in the database so a cursor compares exactly.
+    """
+    query = SearchQuery(keywords)
+    parts = []
+    params = []
+    for item_type, (name, model, url, image_url) in enumerate(
+            SITE_SEARCH_TYPES):
+        title, description = SEARCH_FIELDS[model]
+        queryset = (ranked_matches(model.objects.all(), query)
+                    .annotate(result_title=F(title),
+                              result_description=F(description),
+                              result_url=F(url),
+                              result_image_url=F(image_url),
+                              category_name=F('category__name'),
+                              category_slug=F('category__slug'),
+                              subcategory_name=F('subcategory__name'),
+                              subcategory_slug=F('subcategory__slug'))
+                    .order_by()
+                    .values_list('id', 'result_title', 'result_description',
+                                 'result_url', 'result_image_url',
+                                 'category_name', 'category_slug',
+                                 'subcategory_name', 'subcategory_slug',
+                                 'rank'))
+        sql, queryset_params = queryset.query.sql_with_params()
+        alias = 'search_%d' % item_type
+        parts.append(
+            'SELECT %%s AS item_type, {a}.id, {a}.result_title, '
+            '{a}.result_description, {a}.result_url, {a}.result_image_url, '
+            '{a}.category_name, {a}.category_slug, {a}.subcategory_name, '
+            '{a}.subcategory_slug, ROUND({a}.rank::numeric, 6) AS rank '
+            'FROM (%s) AS {a}'.format(a=alias) % sql)
+        params.append(item_type)
+        params.extend(queryset_params)
+
+    sql = 'SELECT * FROM (%s) AS results' % ' UNION ALL '.join(parts)
+    after = parse_cursor(after)
+    if after is not None:
+        sql += ' WHERE (rank, item_type, id) < (%s, %s, %s)'
+        params.extend(after)
+    sql += ' ORDER BY rank DESC, item_type DESC, id DESC LIMIT %s'
+    params.append(limit + 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = []
+    for row in rows[:limit]:
+        item_type, pk, rank = row[0], row[1], row[-1]
+        results.append(SearchResult(SITE_SEARCH_TYPES[item_type][0],
+                                    *row[1:],
+                                    cursor='%s:%d:%d' % (rank, item_type,
+                                                         pk)))
+    next_cursor = results[-1].cursor if len(rows) > limit else None
+    return results, next_cursor
+
+
+def suggestion_queries(prefix, limit):
+    # (type, queryset of (title, category slug, subcategory slug)) for each
+    # kind of suggestion, in the order they are tried. icontains is served
+    # by the trigram indexes from migration 0045.
+    queries = [('subcategory', SubCategory.objects
+                .filter(name__icontains=prefix)
+                .annotate(similarity=TrigramSimilarity('name', prefix))
+                .order_by('-similarity')
+                .values_list('name', 'category__slug', 'slug'))]
+    for name, model, url, image_url in SITE_SEARCH_TYPES:
+        queries.append((name, model.objects
+                        .filter(title__icontains=prefix)
+                        .annotate(similarity=TrigramSimilarity('title',
+                                                               prefix))
+                        .order_by('-similarity', '-score')
+                        .values_list('title', 'category__slug',
+                                     'subcategory__slug')))
+    return [(name, queryset[:limit]) for name, queryset in queries]
+
+
+def suggest(prefix, limit=5):
+    """
+    Returns typeahead suggestions of subcategory names and recommendation
+    titles containing prefix, as dicts of type, title and the url of the
+    subcategory. Complete answers are cached per prefix.
+
+    The lookups share a budget of TYPEAHEAD_TIME_BUDGET milliseconds,
+    enforced by the database with statement_timeout. Once it is spent the
+    suggestions found so far are returned and not cached.
+    """
+    prefix = ' '.join(prefix.split()).lower()
+    if len(prefix) < settings.TYPEAHEAD_MIN_LENGTH:
+        return []
+    cache_key = 'typeahead:%s' % hashlib.md5(
+        prefix.encode('utf-8')).hexdigest()
+    suggestions = cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    suggestions = []
+    complete = True
+    deadline = time.time() + settings.TYPEAHEAD_TIME_BUDGET / 1000
+    for name, queryset in suggestion_queries(prefix, limit):
+        remaining = int((deadline - time.time()) * 1000)
+        if remaining <= 0:
+            complete = False
+            break
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SHOW statement_timeout')
+                    previous = cursor.fetchone()[0]
+                    cursor.execute('SET LOCAL statement_timeout = %s',
+                                   [remaining])
+                rows = list(queryset)
+                # releasing the savepoint keeps SET LOCAL in force for the
+                # rest of an outer transaction, so the timeout is put back.
+                # A cancelled lookup rolls the savepoint back, which undoes
+                # it already.
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT set_config('statement_timeout', "
+                                   "%s, true)", [previous])
+        except OperationalError:
+            # statement_timeout cancelled the lookup
+            logger.info('typeahead lookup for %r ran out of time', prefix)
+            complete = False
+            break
+        for title, category_slug, subcategory_slug in rows:
+            suggestions.append({
+                'type': name,
+                'title': title,
+                'url': reverse('subcategory', args=(category_slug,
+                                                    subcategory_slug)),
+            })
+
+    if complete:
+        cache.set(cache_key, suggestions, settings.TYPEAHEAD_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,42 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from website.context_processor import clear_category_cache
+from website.leaderboards import add_to_leaderboards, sync_leaderboard_scores
+from website.models import (Category, WebsiteRecommendation,
+                            BookRecommendation, VideoRecommendation, Vote)
+from website.votes import refresh_vote_counts
+
+
+def refresh_votes(model, pks):
+    refresh_vote_counts(model, pks)
+    sync_leaderboard_scores(model, pks)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def vote_changed(sender, instance, raw=False, **kwargs):
+    # votes saved or deleted through the ORM, toggle_vote keeps the
+    # counters in step itself
+    if raw:
+        return
+    model = ContentType.objects.get_for_id(
+        instance.content_type_id).model_class()
+    refresh_votes(model, [instance.object_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    clear_category_cache()
+
+
+def recommendation_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        add_to_leaderboards(instance)
+
+
+for model in (WebsiteRecommendation, BookRecommendation, VideoRecommendation):
+    post_save.connect(recommendation_created, sender=model,
+                      dispatch_uid='recommendation_created_%s'
+                                   % model.__name__)
@@ -0,0 +1,264 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from website import amazon
+from website.models import (BookMetadata, BookRecommendation, Category,
+                            LeaderboardEntry, SubCategory)
+
+
+ITEM_LOOKUP_RESPONSE = """<?xml version="1.0" ?>
+<ItemLookupResponse><Items><Item>
+<DetailPageURL>https://www.amazon.co.uk/dp/0000000000</DetailPageURL>
+<LargeImage><URL>https://images.amazon.com/test.jpg</URL>
+<Height>500</Height><Width>300</Width></LargeImage>
+<ItemAttributes><Author>test author</Author>
+<PublicationDate>2018</PublicationDate><Title>test title</Title>
+</ItemAttributes>
+<EditorialReviews><EditorialReview><Content>test description</Content>
+</EditorialReview></EditorialReviews>
+</Item></Items></ItemLookupResponse>"""
+
+BATCH_RESPONSE = """<?xml version="1.0" ?>
+<ItemLookupResponse><Items>
+<Item><ASIN>1593276036</ASIN>
+<DetailPageURL>https://www.amazon.co.uk/dp/1593276036</DetailPageURL>
+<LargeImage><URL>https://images.amazon.com/first.jpg</URL></LargeImage>
+<ItemAttributes><Author>first author</Author><EAN>9781593276034</EAN>
+<PublicationDate>2015-04-01</PublicationDate><Title>first title</Title>
+</ItemAttributes>
+<EditorialReviews><EditorialReview><Content>first description</Content>
+</EditorialReview></EditorialReviews></Item>
+<Item><ASIN>0306406152</ASIN>
+<ItemAttributes><Title>no author or image</Title></ItemAttributes></Item>
+</Items></ItemLookupResponse>"""
+
+EMPTY_RESPONSE = """<?xml version="1.0" ?>
+<ItemLookupResponse><Items><Request><Errors><Error>
+<Code>AWS.InvalidParameterValue</Code></Error></Errors></Request></Items>
+</ItemLookupResponse>"""
+
+
+IMPORT_BOOKS = 'website.management.commands.import_books'
+
+
+def isbn10(number):
+    # a valid made up ISBN-10 for number
+    digits = '%09d' % number
+    check = -sum((10 - i) * int(d) for i, d in enumerate(digits)) % 11
+    return digits + ('X' if check == 10 else str(check))
+
+
+@patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'key',
+                         'AWS_SECRET_ACCESS_KEY': 'secret',
+                         'AWS_ASSOCIATE_TAG': 'tag'})
+class AmazonClientTests(SimpleTestCase):
+
+    def setUp(self):
+        amazon._amazon = None
+
+    def tearDown(self):
+        amazon._amazon = None
+
+    def test_client_is_built_once(self):
+        client = amazon.get_amazon_client()
+        self.assertIs(amazon.get_amazon_client(), client)
+
+    def test_fetch_book_details(self):
+        with patch('website.amazon.get_amazon_client') as client:
+            client.return_value.ItemLookup.return_value = BeautifulSoup(
+                ITEM_LOOKUP_RESPONSE, 'xml')
+            details = amazon.fetch_book_details('0000000000')
+        client.return_value.ItemLookup.assert_called_once_with(
+            ItemId='0000000000', ResponseGroup="Medium", SearchIndex="Books",
+            IdType="ISBN")
+        self.assertEqual(details['title'], 'test title')
+        self.assertEqual(details['author'], 'test author')
+        self.assertEqual(details['description'], 'test description')
+        self.assertEqual(details['image_url'],
+                         'https://images.amazon.com/test.jpg')
+        self.assertEqual(details['publish_date'], '2018-01-01')
+
+    def test_fetch_book_details_for_missing_book(self):
+        with patch('website.amazon.get_amazon_client') as client:
+            client.return_value.ItemLookup.return_value = BeautifulSoup(
+                EMPTY_RESPONSE, 'xml')
+            self.assertIsNone(amazon.fetch_book_details('0000000000'))
+
+    def test_fetch_books_details(self):
+        with patch('website.amazon.get_amazon_client') as client:
+            client.return_value.ItemLookup.return_value = BeautifulSoup(
+                BATCH_RESPONSE, 'xml')
+            books = amazon.fetch_books_details(
+                ['9781593276034', '0306406152', '0000000000'])
+        self.assertEqual(client.return_value.ItemLookup.call_args[1]['ItemId'],
+                         '9781593276034,0306406152,0000000000')
+        self.assertEqual(books['9781593276034']['title'], 'first title')
+        self.assertIsNone(books['0306406152'])
+        self.assertIsNone(books['0000000000'])
+
+    def test_isbn_forms(self):
+        self.assertEqual(amazon.to_isbn13('1593276036'), '9781593276034')
+        self.assertEqual(amazon.to_isbn13('9781593276034'), '9781593276034')
+        self.assertEqual(amazon.isbn_forms('1593276036'),
+                         {'9781593276034', '1593276036'})
+        # 979 ISBNs have no ISBN-10
+        self.assertEqual(amazon.isbn_forms('9791032300824'),
+                         {'9791032300824'})
+
+
+class BookMetadataStoreTests(TestCase):
+
+    details = {
+        'title': 'test title',
+        'author': 'test author',
+        'description': 'test description',
+        'url': 'https://www.amazon.co.uk/dp/0000000000',
+        'image_url': 'https://images.amazon.com/test.jpg',
+        'publish_date': '2018-01-01',
+    }
+
+    @patch('website.amazon.fetch_book_details')
+    def test_details_are_only_fetched_once(self, fetch_book_details):
+        fetch_book_details.return_value = self.details
+        amazon.get_book_details('0000000000')
+        details = amazon.get_book_details('0000000000')
+        self.assertEqual(fetch_book_details.call_count, 1)
+        self.assertEqual(details['title'], 'test title')
+        self.assertEqual(details['author'], 'test author')
+
+    @patch('website.amazon.fetch_book_details')
+    def test_isbn10_and_isbn13_share_one_lookup(self, fetch_book_details):
+        fetch_book_details.return_value = self.details
+        amazon.get_book_details('1593276036')
+        amazon.get_book_details('9781593276034')
+        self.assertEqual(fetch_book_details.call_count, 1)
+        self.assertEqual(BookMetadata.objects.get().isbn, '9781593276034')
+
+    @patch('website.amazon.fetch_book_details')
+    def test_expired_details_are_fetched_again(self, fetch_book_details):
+        BookMetadata.objects.create(
+            isbn='9780000000002',
+            title='old title',
+            fetched_date=timezone.now() - timedelta(days=365))
+        fetch_book_details.return_value = self.details
+        details = amazon.get_book_details('0000000000')
+        self.assertEqual(details['title'], 'test title')
+        self.assertEqual(BookMetadata.objects.get().title, 'test title')
+
+    @patch('website.amazon.fetch_book_details', return_value=None)
+    def test_missing_books_are_remembered(self, fetch_book_details):
+        self.assertIsNone(amazon.get_book_details('0000000000'))
+        self.assertIsNone(amazon.get_book_details('0000000000'))
+        self.assertEqual(fetch_book_details.call_count, 1)
+        self.assertFalse(BookMetadata.objects.get().found)
+
+    @patch('website.amazon.fetch_book_details', return_value=None)
+    def test_missing_books_are_looked_up_again_sooner(self,
+                                                      fetch_book_details):
+        BookMetadata.objects.create(
+            isbn='9780000000002',
+            found=False,
+            fetched_date=timezone.now() - timedelta(days=2))
+        amazon.get_book_details('0000000000')
+        self.assertEqual(fetch_book_details.call_count, 1)
+
+
+class ImportBooksCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser1',
+                                             password='12345')
+        category = Category.objects.create(name='python')
+        self.subcategory = SubCategory.objects.create(name='django',
+                                                      category=category)
+        BookRecommendation.objects.create(
+            isbn='0306406152',
+            title='test title',
+            recommended_by=self.user,
+            category=category,
+            subcategory=self.subcategory,
+            book_author='Test Author',
+            book_description='Test Description',
+            book_url='http://www.test.com',
+            book_image_url='http://www.testimage.com',
+            book_publish_date=timezone.now())
+
+    def import_books(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('\n'.join(rows))
+            f.flush()
+            out, err = StringIO(), StringIO()
+            call_command('import_books', f.name, 'python', 'django',
+                         '--user=testuser1', '--sleep=0', stdout=out,
+                         stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    @patch('website.amazon.get_amazon_client')
+    def test_books_are_looked_up_in_batches(self, client):
+        client.return_value.ItemLookup.return_value = BeautifulSoup(
+            BATCH_RESPONSE, 'xml')
+        rows = ['isbn', '978-1593276034', '1593276036', '0306406152',
+                '1234567890', '9781593276034']
+        rows += [isbn10(1), isbn10(2), isbn10(3)]
+        out, err = self.import_books(rows)
+
+        # the ISBN-10 and ISBN-13 forms of a book are one recommendation
+        book = BookRecommendation.objects.get(subcategory=self.subcategory,
+                                              title='first title')
+        self.assertEqual(book.isbn, '9781593276034')
+        self.assertEqual(book.book_author, 'first author')
+        self.assertEqual(book.recommended_by, self.user)
+        # 1 new isbn and 3 made up ones are looked up in one request
+        self.assertEqual(client.return_value.ItemLookup.call_count, 1)
+        self.assertEqual(
+            client.return_value.ItemLookup.call_args[1]['ItemId'],
+            ','.join(['9781593276034'] +
+                     [amazon.to_isbn13(isbn10(i)) for i in (1, 2, 3)]))
+        self.assertIn('Recommended 1 books, 5 failed.', out)
+        self.assertIn('1234567890: not a valid ISBN', err)
+        # stored as an ISBN-10 by the site
+        self.assertIn('9780306406157: already recommended', err)
+        self.assertIn('%s: not found on Amazon'
+                      % amazon.to_isbn13(isbn10(1)), err)
+
+    @patch(IMPORT_BOOKS + '.fetch_books_details')
+    def test_imported_books_are_ranked_and_searchable(self,
+                                                      fetch_books_details):
+        fetch_books_details.return_value = {'9781593276034': {
+            'title': 'first title',
+            'author': 'first author',
+            'description': 'first description',
+            'url': 'https://www.amazon.co.uk/dp/1593276036',
+            'image_url': 'https://images.amazon.com/first.jpg',
+            'publish_date': '2015-04-01'}}
+        self.import_books(['1593276036'])
+        book = BookRecommendation.objects.get(isbn='9781593276034')
+        entries = LeaderboardEntry.objects.filter(object_id=book.pk)
+        self.assertEqual(
+            sorted(entries.values_list('window', flat=True)),
+            sorted(window for window, name in
+                   LeaderboardEntry.WINDOW_CHOICES))
+        self.assertEqual(list(BookRecommendation.objects.filter(
+            search_vector='first')), [book])
+
+    @patch(IMPORT_BOOKS + '.fetch_books_details')
+    def test_lookups_are_batched_and_cached(self, fetch_books_details):
+        fetch_books_details.side_effect = lambda isbns: dict.fromkeys(isbns)
+        # ISBN-10s with an X check digit are not accepted
+        rows = [isbn for isbn in map(isbn10, range(1, 40))
+                if isbn.isdigit()][:28]
+        self.import_books(rows)
+        self.assertEqual([len(call[0][0]) for call in
+                          fetch_books_details.call_args_list], [10, 10, 8])
+        # books Amazon did not know are not looked up again straight away
+        self.import_books(rows)
+        self.assertEqual(fetch_books_details.call_count, 3)
@@ -0,0 +1,254 @@
+import hashlib
+import json
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from website.models import (Category, SubCategory, WebsiteRecommendation,
+                            BookRecommendation, VideoRecommendation,
+                            WebsiteComment, BookComment, VideoComment)
+from website.ranking import ranked_recommendations, refresh_hot_scores
+from website.search import suggestion_queries
+
+
+class ListingIndexTests(TestCase):
+    # seeds enough rows for the planner to prefer an index, then checks the
+    # listing queries never read a whole table
+
+    subcategories = 50
+    per_subcategory = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='12345')
+        category = Category.objects.create(name='python')
+        subcategories = [
+            SubCategory.objects.create(name='subcategory %d' % num,
+                                       category=category)
+            for num in range(cls.subcategories)]
+        now = timezone.now()
+        websites, books, videos = [], [], []
+        for subcategory in subcategories:
+            for num in range(cls.per_subcategory):
+                created_date = now - timezone.timedelta(hours=num)
+                websites.append(WebsiteRecommendation(
+                    website_author=user, category=category,
+                    subcategory=subcategory, title='test_website',
+                    description='test description',
+                    url='http://www.test%d.com' % num, score=num % 7,
+                    created_date=created_date))
+                books.append(BookRecommendation(
+                    isbn='%010d' % num, title='test_book',
+                    recommended_by=user, category=category,
+                    subcategory=subcategory, book_author='Test Author',
+                    book_description='Test Description',
+                    book_url='http://www.test.com',
+                    book_image_url='http://www.testimage.com',
+                    book_publish_date=now, score=num % 7,
+                    created_date=created_date))
+                videos.append(VideoRecommendation(
+                    title='test_video', recommended_by=user,
+                    category=category, subcategory=subcategory,
+                    video_description='test description',
+                    video_publish_date=now, video_url='http://www.test.com',
+                    video_image_url='http://www.testimage.com',
+                    video_id='video%d' % num, score=num % 7,
+                    created_date=created_date))
+        WebsiteRecommendation.objects.bulk_create(websites)
+        BookRecommendation.objects.bulk_create(books)
+        VideoRecommendation.objects.bulk_create(videos)
+
+        cls.website = WebsiteRecommendation.objects.first()
+        cls.book = BookRecommendation.objects.first()
+        cls.video = VideoRecommendation.objects.first()
+        for model, field, targets in (
+                (WebsiteComment, 'website',
+                 WebsiteRecommendation.objects.all()[:200]),
+                (BookComment, 'book', BookRecommendation.objects.all()[:200]),
+                (VideoComment, 'video',
+                 VideoRecommendation.objects.all()[:200])):
+            model.objects.bulk_create(
+                model(author=user, text='test comment',
+                      **{field: target})
+                for target in targets for num in range(10))
+
+        with connection.cursor() as cursor:
+            for model in (WebsiteRecommendation, BookRecommendation,
+                          VideoRecommendation, WebsiteComment, BookComment,
+                          VideoComment):
+                cursor.execute('ANALYZE %s' % model._meta.db_table)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assertNoSeqScan(self, queryset):
+        plan = self.explain(queryset)
+        table = queryset.model._meta.db_table
+        self.assertNotIn('Seq Scan on %s' % table, plan, plan)
+
+    def test_listings_use_an_index(self):
+        subcategory = SubCategory.objects.get(name='subcategory 25')
+        for model in (WebsiteRecommendation, BookRecommendation,
+                      VideoRecommendation):
+            for time_filter in (None, 'hot', 'newest'):
+                # el_pagination only reads the first page
+                self.assertNoSeqScan(ranked_recommendations(
+                    model, subcategory, time_filter)[:10])
+
+    def test_comment_pages_use_an_index(self):
+        self.assertNoSeqScan(WebsiteComment.objects
+                                           .filter(website=self.website)
+                                           .order_by('-created_date')[:100])
+        self.assertNoSeqScan(BookComment.objects
+                                        .filter(book=self.book)
+                                        .order_by('-created_date')[:100])
+        self.assertNoSeqScan(VideoComment.objects
+                                         .filter(video=self.video)
+                                         .order_by('-created_date')[:100])
+
+
+class TypeaheadIndexTests(TestCase):
+    # pg_trgm can only use its index for a LIKE pattern holding a whole
+    # trigram, so the shortest prefix suggested must still be served by the
+    # trigram indexes
+
+    items = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='12345')
+        category = Category.objects.create(name='python')
+        SubCategory.objects.bulk_create(
+            SubCategory(name=cls.title(num), slug='subcategory-%d' % num,
+                        category=category)
+            for num in range(cls.items))
+        subcategory = SubCategory.objects.first()
+        now = timezone.now()
+        WebsiteRecommendation.objects.bulk_create(
+            (WebsiteRecommendation(
+                website_author=user, category=category,
+                subcategory=subcategory, title=cls.title(num),
+                description='test description',
+                url='http://www.test%d.com' % num)
+             for num in range(cls.items)), batch_size=1000)
+        BookRecommendation.objects.bulk_create(
+            (BookRecommendation(
+                isbn='%010d' % num, title=cls.title(num),
+                recommended_by=user, category=category,
+                subcategory=subcategory, book_author='Test Author',
+                book_description='Test Description',
+                book_url='http://www.test.com',
+                book_image_url='http://www.testimage.com',
+                book_publish_date=now)
+             for num in range(cls.items)), batch_size=1000)
+        VideoRecommendation.objects.bulk_create(
+            (VideoRecommendation(
+                title=cls.title(num), recommended_by=user,
+                category=category, subcategory=subcategory,
+                video_description='test description',
+                video_publish_date=now, video_url='http://www.test.com',
+                video_image_url='http://www.testimage.com',
+                video_id='video%d' % num)
+             for num in range(cls.items)), batch_size=1000)
+        with connection.cursor() as cursor:
+            for model in (SubCategory, WebsiteRecommendation,
+                          BookRecommendation, VideoRecommendation):
+                table = model._meta.db_table
+                cursor.execute('ANALYZE %s' % table)
+                # autovacuum moves new rows out of the GIN pending list,
+                # which the planner costs as a full read, but it cannot
+                # reach rows inside the test's transaction
+                cursor.execute(
+                    "SELECT gin_clean_pending_list(indexrelid) FROM pg_index "
+                    "WHERE indrelid = %s::regclass "
+                    "AND indexrelid::regclass::text LIKE '%%_trgm'", [table])
+
+    @staticmethod
+    def title(num):
+        # two made up words, so a short prefix matches a few rows
+        digest = hashlib.md5(str(num).encode()).hexdigest()
+        return '%s %s' % (digest[:6], digest[6:12])
+
+    def test_shortest_prefix_uses_the_trigram_indexes(self):
+        prefix = 'c0ffee'[:settings.TYPEAHEAD_MIN_LENGTH]
+        for name, queryset in suggestion_queries(prefix, 5):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + sql, params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.assertIn('_trgm', plan, (name, plan))
+            self.assertNotIn('Seq Scan on %s'
+                             % queryset.model._meta.db_table, plan, plan)
+
+
+class HotListingBenchmarkTests(TestCase):
+    # one subcategory of 10k+ websites. The first page of the hot listing
+    # must be read off its index like the newest listing's, not sorted
+    # after scoring every row, so the two cost about the same however
+    # large the subcategory grows.
+
+    items = 12000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='12345')
+        category = Category.objects.create(name='python')
+        cls.subcategory = SubCategory.objects.create(name='django',
+                                                     category=category)
+        now = timezone.now()
+        WebsiteRecommendation.objects.bulk_create(
+            [WebsiteRecommendation(
+                website_author=user, category=category,
+                subcategory=cls.subcategory, title='test_website',
+                description='test description',
+                url='http://www.test%d.com' % num, score=num % 50,
+                created_date=now - timezone.timedelta(minutes=num))
+             for num in range(cls.items)],
+            batch_size=1000)
+        refresh_hot_scores(WebsiteRecommendation, now)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE %s'
+                           % WebsiteRecommendation._meta.db_table)
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def node_types(self, plan):
+        yield plan['Node Type']
+        for child in plan.get('Plans', []):
+            yield from self.node_types(child)
+
+    def test_hot_listing_costs_the_same_as_newest(self):
+        plans = {
+            time_filter: self.plan(ranked_recommendations(
+                WebsiteRecommendation, self.subcategory, time_filter)[:10])
+            for time_filter in ('hot', 'newest')}
+        for time_filter, plan in plans.items():
+            node_types = list(self.node_types(plan))
+            self.assertNotIn('Sort', node_types, (time_filter, plan))
+            self.assertNotIn('Seq Scan', node_types, (time_filter, plan))
+        self.assertLessEqual(plans['hot']['Total Cost'],
+                             plans['newest']['Total Cost'] * 1.5)
+
+    def test_hot_listing_decays_score_by_age(self):
+        websites = ranked_recommendations(WebsiteRecommendation,
+                                          self.subcategory, 'hot')[:3]
+        # the newest rows have scores 0, 1 and 2. The rows scoring 49, 48
+        # and 47 from under an hour ago outrank them and the older rows
+        # with the same scores.
+        self.assertEqual([website.score for website in websites],
+                         [49, 48, 47])
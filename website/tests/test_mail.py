@@ -0,0 +1,104 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from website.mail import claim_queued_mail, queue_mail, send_queued_mail
+from website.models import QueuedEmail
+
+
+@override_settings(MAIL_OUTBOX_MAX_ATTEMPTS=3, MAIL_OUTBOX_RETRY_DELAY=60)
+class MailOutboxTests(TestCase):
+
+    def queue(self, count=1):
+        for i in range(count):
+            queue_mail('test subject %d' % i, 'test message',
+                       'from@test.com', ['to@test.com', 'cc@test.com'])
+
+    def test_queued_mail_is_not_sent_straight_away(self):
+        self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.get().to,
+                         'to@test.com,cc@test.com')
+
+    def test_send_queued_mail(self):
+        self.queue()
+        self.assertEqual(send_queued_mail(10), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'test subject 0')
+        self.assertEqual(mail.outbox[0].to, ['to@test.com', 'cc@test.com'])
+        self.assertIsNotNone(QueuedEmail.objects.get().sent_date)
+        # sent mail is not sent again
+        self.assertEqual(send_queued_mail(10), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.queue(5)
+        with patch('website.mail.get_connection',
+                   wraps=get_connection) as connection:
+            self.assertEqual(send_queued_mail(3), 3)
+        self.assertEqual(connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(QueuedEmail.objects.filter(
+            sent_date__isnull=True).count(), 2)
+
+    def test_failed_mail_is_retried_later(self):
+        self.queue()
+        with patch('django.core.mail.EmailMessage.send',
+                   side_effect=SMTPException('test error')):
+            send_queued_mail(10)
+        queued = QueuedEmail.objects.get()
+        self.assertIsNone(queued.sent_date)
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.last_error, 'test error')
+        self.assertGreater(queued.next_attempt_date,
+                           timezone.now() + timedelta(seconds=50))
+        # not due yet
+        self.assertEqual(send_queued_mail(10), 0)
+
+        QueuedEmail.objects.update(next_attempt_date=timezone.now())
+        self.assertEqual(send_queued_mail(10), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_retry_delay_doubles(self):
+        self.queue()
+        QueuedEmail.objects.update(attempts=1)
+        with patch('django.core.mail.EmailMessage.send',
+                   side_effect=SMTPException('test error')):
+            send_queued_mail(10)
+        self.assertGreater(QueuedEmail.objects.get().next_attempt_date,
+                           timezone.now() + timedelta(seconds=110))
+
+    def test_mail_is_given_up_on(self):
+        self.queue()
+        QueuedEmail.objects.update(attempts=3)
+        self.assertEqual(send_queued_mail(10), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_connection_failure_fails_whole_batch(self):
+        self.queue(2)
+        with patch('django.core.mail.backends.locmem.EmailBackend.open',
+                   side_effect=OSError('connection refused'), create=True):
+            self.assertEqual(send_queued_mail(10), 2)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(list(QueuedEmail.objects.values_list(
+            'attempts', flat=True)), [1, 1])
+
+    def test_claimed_mail_is_not_sent_twice(self):
+        self.queue(3)
+        claimed = claim_queued_mail(2)
+        self.assertEqual([queued.subject for queued in claimed],
+                         ['test subject 0', 'test subject 1'])
+        # another worker only gets the mail left over
+        self.assertEqual(send_queued_mail(10), 1)
+        self.assertEqual(mail.outbox[0].subject, 'test subject 2')
+        self.assertEqual(claim_queued_mail(10), [])
+
+        # the claim runs out if the worker holding it never sends
+        QueuedEmail.objects.filter(id__in=[queued.id for queued in claimed]
+                                   ).update(next_attempt_date=timezone.now())
+        self.assertEqual(send_queued_mail(10), 2)
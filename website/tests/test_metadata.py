@@ -0,0 +1,264 @@
+from datetime import timedelta
+from email.message import Message
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from urllib.error import HTTPError, URLError
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from website.metadata import (claim_pending_websites, get_url_metadata,
+                              normalize_url, read_metadata)
+from website.models import (Category, SubCategory, UrlMetadata,
+                            WebsiteRecommendation)
+
+
+class CountingResponse(BytesIO):
+    # records how much of the page has been read
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super(CountingResponse, self).read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def make_page(head, body_size=0):
+    return (b'<html><head>' + head + b'</head><body>'
+            + b'<p>filler text</p>' * body_size + b'</body></html>')
+
+
+class ReadMetadataTests(SimpleTestCase):
+
+    def test_reads_image_title_and_description(self):
+        page = make_page(
+            b'<meta property="og:title" content="Test &amp; Title">'
+            b'<meta property="og:description" content="test description">'
+            b'<meta property="og:image" content="http://test.com/img.png"/>')
+        metadata = read_metadata(BytesIO(page), max_bytes=10000)
+        self.assertEqual(metadata, {'title': 'Test & Title',
+                                    'description': 'test description',
+                                    'image': 'http://test.com/img.png'})
+
+    def test_missing_tags_are_left_out(self):
+        page = make_page(b'<title>no open graph</title>')
+        self.assertEqual(read_metadata(BytesIO(page), max_bytes=10000), {})
+
+    def test_stops_reading_at_the_end_of_the_head(self):
+        page = make_page(b'<meta property="og:image" content="/img.png">',
+                         body_size=100000)
+        response = CountingResponse(page)
+        metadata = read_metadata(response, max_bytes=len(page),
+                                 chunk_size=1024)
+        self.assertEqual(metadata, {'image': '/img.png'})
+        self.assertEqual(response.bytes_read, 1024)
+
+    def test_stops_reading_at_max_bytes(self):
+        # an og:image after the byte budget is never reached
+        page = (b'<html><head>' + b'<script></script>' * 1000
+                + b'<meta property="og:image" content="/img.png"></head>')
+        response = CountingResponse(page)
+        self.assertEqual(read_metadata(response, max_bytes=4096), {})
+        self.assertEqual(response.bytes_read, 4096)
+
+    def test_multibyte_characters_split_across_chunks(self):
+        page = make_page('<meta property="og:title" content="café">'
+                         .encode('utf-8'))
+        metadata = read_metadata(BytesIO(page), max_bytes=10000,
+                                 chunk_size=1)
+        self.assertEqual(metadata['title'], 'café')
+
+
+class NormalizeUrlTests(SimpleTestCase):
+
+    def test_scheme_and_host_are_lowercased(self):
+        self.assertEqual(normalize_url('HTTP://WWW.Test.com/Path'),
+                         'http://www.test.com/Path')
+
+    def test_default_port_and_fragment_are_removed(self):
+        self.assertEqual(normalize_url('https://test.com:443/a?b=1#top'),
+                         'https://test.com/a?b=1')
+        self.assertEqual(normalize_url('http://test.com:8000'),
+                         'http://test.com:8000/')
+
+
+class FakeResponse(BytesIO):
+
+    def __init__(self, body, headers=None):
+        super(FakeResponse, self).__init__(body)
+        self.headers = Message()
+        for name, value in (headers or {}).items():
+            self.headers[name] = value
+
+
+class UrlMetadataCacheTests(TestCase):
+
+    def setUp(self):
+        self.page = make_page(
+            b'<meta property="og:image" content="/img.png">')
+
+    @patch('website.metadata.image_works', return_value=True)
+    @patch('website.metadata.open_url')
+    def test_repeat_lookups_skip_the_network(self, open_url, image_works):
+        open_url.return_value = FakeResponse(self.page, {'ETag': '"v1"'})
+        entry = get_url_metadata('http://www.test.com')
+        self.assertEqual(entry.image_url, 'http://www.test.com/img.png')
+        self.assertEqual(entry.etag, '"v1"')
+        entry = get_url_metadata('HTTP://WWW.TEST.COM/')
+        self.assertEqual(entry.image_url, 'http://www.test.com/img.png')
+        self.assertEqual(open_url.call_count, 1)
+
+    @patch('website.metadata.open_url')
+    def test_stale_entry_is_revalidated(self, open_url):
+        UrlMetadata.objects.create(
+            url='http://www.test.com/',
+            image_url='http://www.test.com/img.png',
+            etag='"v1"',
+            fetched_date=timezone.now() - timedelta(days=30))
+        open_url.side_effect = HTTPError('http://www.test.com', 304,
+                                         'Not Modified', Message(), None)
+        entry = get_url_metadata('http://www.test.com')
+        self.assertEqual(entry.image_url, 'http://www.test.com/img.png')
+        self.assertGreater(entry.fetched_date,
+                           timezone.now() - timedelta(minutes=1))
+        self.assertEqual(open_url.call_args[1]['headers'],
+                         {'If-None-Match': '"v1"'})
+
+    def test_evict_url_metadata_command(self):
+        UrlMetadata.objects.create(url='http://old.com/',
+                                   fetched_date=timezone.now()
+                                   - timedelta(days=365))
+        UrlMetadata.objects.create(url='http://new.com/')
+        call_command('evict_url_metadata', stdout=StringIO())
+        self.assertEqual([str(entry) for entry in UrlMetadata.objects.all()],
+                         ['http://new.com/'])
+
+
+class ProcessWebsiteImagesTests(TestCase):
+    # open_url is patched throughout, the worker never touches the network
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser1',
+                                        password='12345')
+        category = Category.objects.create(name='python')
+        subcategory = SubCategory.objects.create(name='django',
+                                                 category=category)
+        for num, name in enumerate(('first', 'second')):
+            WebsiteRecommendation.objects.create(
+                website_author=user, category=category,
+                subcategory=subcategory, title=name,
+                description='test description',
+                url='http://www.%s.com' % name, image_pending=True,
+                created_date=timezone.now() - timedelta(minutes=2 - num))
+
+    def serve(self, pages):
+        # an open_url standing in for the network. GET requests are given
+        # the page for the url, HEAD requests on images say they are images
+        def open_url(url, method='GET', headers=None):
+            if method == 'HEAD':
+                return FakeResponse(b'', {'Content-Type': 'image/png'})
+            if url not in pages:
+                raise URLError('unreachable')
+            return FakeResponse(pages[url])
+        return patch('website.metadata.open_url', side_effect=open_url)
+
+    def process(self):
+        out, err = StringIO(), StringIO()
+        call_command('process_website_images', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def website(self, title):
+        return WebsiteRecommendation.objects.get(title=title)
+
+    def test_image_is_fetched(self):
+        with self.serve({
+                'http://www.first.com': make_page(
+                    b'<meta property="og:image" content="/img.png">'),
+                'http://www.second.com': make_page(b'<title>none</title>')}):
+            self.process()
+        first, second = self.website('first'), self.website('second')
+        self.assertEqual(first.image_url, 'http://www.first.com/img.png')
+        self.assertFalse(first.image_pending)
+        self.assertIsNone(first.image_claimed_date)
+        self.assertEqual(second.image_url, None)
+        self.assertFalse(second.image_pending)
+
+    def test_unreachable_website_is_retried(self):
+        # a website that cannot be fetched stays pending until it has been
+        # tried WEBSITE_IMAGE_MAX_ATTEMPTS times
+        with self.serve({'http://www.second.com': make_page(b'')}):
+            for attempt in range(1, 4):
+                self.process()
+                first = self.website('first')
+                self.assertEqual(first.image_fetch_attempts, attempt)
+                self.assertEqual(first.image_pending, attempt < 3)
+        self.assertEqual(first.image_url, None)
+
+    def test_overlong_image_url_is_dropped(self):
+        # WebsiteRecommendation.image_url holds 200 characters, a longer
+        # og:image must not stop the website leaving the queue
+        image = b'http://www.first.com/' + b'i' * 300 + b'.png'
+        with self.serve({
+                'http://www.first.com': make_page(
+                    b'<meta property="og:image" content="' + image + b'">'),
+                'http://www.second.com': make_page(b'')}):
+            out, err = self.process()
+        self.assertEqual(err, '')
+        first = self.website('first')
+        self.assertEqual(first.image_url, None)
+        self.assertFalse(first.image_pending)
+        self.assertFalse(self.website('second').image_pending)
+
+    def test_one_failing_website_does_not_stop_the_batch(self):
+        def get_url_metadata(url):
+            if url == 'http://www.first.com':
+                raise RuntimeError('broken row')
+            return UrlMetadata(url=url, image_url='http://www.test.com/i.png')
+        with patch('website.metadata.get_url_metadata',
+                   side_effect=get_url_metadata):
+            out, err = self.process()
+        self.assertIn('broken row', err)
+        first, second = self.website('first'), self.website('second')
+        # the attempt was counted before the fetch and the row stays
+        # claimed until the claim runs out
+        self.assertEqual(first.image_fetch_attempts, 1)
+        self.assertTrue(first.image_pending)
+        self.assertIsNotNone(first.image_claimed_date)
+        self.assertEqual(second.image_url, 'http://www.test.com/i.png')
+        self.assertFalse(second.image_pending)
+
+    def test_website_deleted_while_fetching_is_skipped(self):
+        def get_url_metadata(url):
+            WebsiteRecommendation.objects.filter(url=url).delete()
+            return UrlMetadata(url=url)
+        with patch('website.metadata.get_url_metadata',
+                   side_effect=get_url_metadata):
+            out, err = self.process()
+        self.assertEqual(err, '')
+        self.assertFalse(WebsiteRecommendation.objects.exists())
+
+    def test_claimed_websites_are_skipped(self):
+        WebsiteRecommendation.objects.filter(title='first').update(
+            image_claimed_date=timezone.now())
+        WebsiteRecommendation.objects.filter(title='second').update(
+            image_claimed_date=timezone.now() - timedelta(hours=1))
+        claimed = claim_pending_websites(10)
+        self.assertEqual([website.title for website in claimed], ['second'])
+        self.assertEqual(claim_pending_websites(10), [])
+
+    def test_expired_claim_on_the_last_attempt_is_given_up_on(self):
+        # a worker died while fetching first for the last time
+        WebsiteRecommendation.objects.update(image_fetch_attempts=3)
+        WebsiteRecommendation.objects.filter(title='first').update(
+            image_claimed_date=timezone.now() - timedelta(hours=1))
+        WebsiteRecommendation.objects.filter(title='second').update(
+            image_claimed_date=timezone.now())
+        self.assertEqual(claim_pending_websites(10), [])
+        first, second = self.website('first'), self.website('second')
+        self.assertFalse(first.image_pending)
+        self.assertIsNone(first.image_claimed_date)
+        # second may still be being fetched
+        self.assertTrue(second.image_pending)
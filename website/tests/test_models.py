@@ -1,13 +1,21 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.db import IntegrityError
 from django.utils import timezone
+from django.core.management import call_command
+from io import StringIO
 
 from website.models import (Category, SubCategory, WebsiteRecommendation,
                             WebsiteComment, BookRecommendation, BookComment,
-                            VideoRecommendation, VideoComment)
+                            VideoRecommendation, VideoComment, Vote)
+from website.search import search_recommendations
 from django.contrib.auth.models import User
 
 
+def vote(recommendation, value, *users):
+    for user in users:
+        recommendation.votes.create(user=user, value=value)
+
+
 class CategoryModelTest(TestCase):
 
     @classmethod
@@ -120,8 +128,8 @@ class WebsiteRecommendationModelTest(TestCase):
             description='test description',
             url='http://www.test.com'
         )
-        website.upvote.add(test_user1,test_user2,test_user3)
-        website.downvote.add(test_user4)
+        vote(website, Vote.UP, test_user1, test_user2, test_user3)
+        vote(website, Vote.DOWN, test_user4)
 
     def test_title_label(self):
         website = WebsiteRecommendation.objects.get(title='Test Website')
@@ -158,6 +166,38 @@ class WebsiteRecommendationModelTest(TestCase):
         website = WebsiteRecommendation.objects.get(title='Test Website')
         self.assertEquals(website.total_votes, 2)
 
+    def test_vote_counts_are_stored(self):
+        website = WebsiteRecommendation.objects.get(title='Test Website')
+        self.assertEquals(website.upvote_count, 3)
+        self.assertEquals(website.downvote_count, 1)
+        self.assertEquals(website.score, 2)
+
+    def test_vote_counts_follow_changes_to_votes(self):
+        # votes changed or deleted outside toggle_vote must update the
+        # counters too.
+        website = WebsiteRecommendation.objects.get(title='Test Website')
+        test_user4 = User.objects.get(username='testuser4')
+        test_vote = website.votes.get(user=test_user4)
+        test_vote.value = Vote.UP
+        test_vote.save()
+        website.refresh_from_db()
+        self.assertEquals(website.upvote_count, 4)
+        self.assertEquals(website.downvote_count, 0)
+        self.assertEquals(website.score, 4)
+        test_vote.delete()
+        website.refresh_from_db()
+        self.assertEquals(website.score, 3)
+
+    def test_rebuild_vote_counts_command(self):
+        # counters that have drifted are rebuilt from the vote table
+        WebsiteRecommendation.objects.update(upvote_count=0, downvote_count=0,
+                                             score=0)
+        call_command('rebuild_vote_counts', stdout=StringIO())
+        website = WebsiteRecommendation.objects.get(title='Test Website')
+        self.assertEquals(website.upvote_count, 3)
+        self.assertEquals(website.downvote_count, 1)
+        self.assertEquals(website.score, 2)
+
     def test_unique_together(self):
         # ensure you don't get duplicate urls within a subcategory.
         user = User.objects.get(username='testuser3')
@@ -187,6 +227,59 @@ class WebsiteRecommendationModelTest(TestCase):
         )
         self.assertEquals(website.url, 'http://www.test.com')
 
+    def test_search_vector_is_kept_up_to_date(self):
+        subcategory = SubCategory.objects.get(name='Test Subcategory')
+        website = WebsiteRecommendation.objects.get(title='Test Website')
+        self.assertEqual(list(search_recommendations(
+            WebsiteRecommendation, subcategory, 'description')), [website])
+        website.description = 'renamed'
+        website.save()
+        self.assertFalse(search_recommendations(
+            WebsiteRecommendation, subcategory, 'description').exists())
+        self.assertTrue(search_recommendations(
+            WebsiteRecommendation, subcategory, 'renamed').exists())
+
+    def test_rebuild_search_vectors(self):
+        subcategory = SubCategory.objects.get(name='Test Subcategory')
+        WebsiteRecommendation.objects.update(search_vector=None)
+        out = StringIO()
+        call_command('rebuild_search_vectors', batch_size=1, stdout=out)
+        self.assertIn('Rebuilt search vectors for 1 website recommendation '
+                      'rows.', out.getvalue())
+        self.assertTrue(search_recommendations(
+            WebsiteRecommendation, subcategory, 'website').exists())
+
+    def test_search_ranks_title_matches_first(self):
+        user = User.objects.get(username='testuser3')
+        category = Category.objects.get(name='Test Category')
+        subcategory = SubCategory.objects.get(name='Test Subcategory')
+        description_match = WebsiteRecommendation.objects.create(
+            website_author=user, category=category, subcategory=subcategory,
+            title='Web framework', description='all about python',
+            url='http://www.test2.com')
+        title_match = WebsiteRecommendation.objects.create(
+            website_author=user, category=category, subcategory=subcategory,
+            title='Python tutorial', description='a tutorial',
+            url='http://www.test3.com')
+        self.assertEqual(list(search_recommendations(
+            WebsiteRecommendation, subcategory, 'python')),
+            [title_match, description_match])
+
+    @override_settings(SEARCH_CANDIDATE_LIMIT=1)
+    def test_search_ranks_a_limited_number_of_candidates(self):
+        user = User.objects.get(username='testuser3')
+        category = Category.objects.get(name='Test Category')
+        subcategory = SubCategory.objects.get(name='Test Subcategory')
+        WebsiteRecommendation.objects.create(
+            website_author=user, category=category, subcategory=subcategory,
+            title='Other Website', description='test description',
+            url='http://www.test2.com', score=100)
+        # the highest ranked match is kept, not the highest scored
+        website = WebsiteRecommendation.objects.get(title='Test Website')
+        self.assertEqual(list(search_recommendations(
+            WebsiteRecommendation, subcategory, 'test')), [website])
+
+
 class WebsiteCommentModelTest(TestCase):
 
     @classmethod
@@ -254,8 +347,8 @@ class BookRecommendationModelTest(TestCase):
             book_image_url='http://www.testimage.com',
             book_publish_date=timezone.now()
         )
-        book.upvote.add(test_user1,test_user2,test_user3)
-        book.downvote.add(test_user4)
+        vote(book, Vote.UP, test_user1, test_user2, test_user3)
+        vote(book, Vote.DOWN, test_user4)
 
     def test_isbn_label(self):
         book = BookRecommendation.objects.get(title='test title')
@@ -404,8 +497,8 @@ class VideoRecommendationModelTest(TestCase):
             video_image_url='https://img.youtube.com/vi/dQw4w9WgXcQ/0.jpg',
             video_id='dQw4w9WgXcQ',
         )
-        video.upvote.add(test_user1,test_user2,test_user3)
-        video.downvote.add(test_user4)
+        vote(video, Vote.UP, test_user1, test_user2, test_user3)
+        vote(video, Vote.DOWN, test_user4)
 
     def test_video_url_label(self):
         video = VideoRecommendation.objects.get(title='test title')
@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from website.mail import send_queued_mail
+from website.models import (Category, SubCategory, WebsiteRecommendation,
+                            BookRecommendation, Report)
+from website.reports import send_report_digest
+
+
+class ReportDigestTests(TestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1',
+                                              password='12345')
+        self.user2 = User.objects.create_user(username='testuser2',
+                                              password='12345')
+        category = Category.objects.create(name='python')
+        subcategory = SubCategory.objects.create(name='django',
+                                                 category=category)
+        self.website = WebsiteRecommendation.objects.create(
+            title='test_website',
+            description='test description',
+            website_author=self.user1,
+            url='http://www.test.com',
+            category=category,
+            subcategory=subcategory)
+        self.book = BookRecommendation.objects.create(
+            isbn='1593276036',
+            title='test title',
+            recommended_by=self.user2,
+            category=category,
+            subcategory=subcategory,
+            book_author='Test Author',
+            book_description='Test Description',
+            book_url='http://www.test.com',
+            book_image_url='http://www.testimage.com',
+            book_publish_date=timezone.now())
+
+    def report(self, target, user, message):
+        return Report.objects.create(reported_by=user, content_object=target,
+                                     message=message)
+
+    def test_duplicate_reports_are_collapsed(self):
+        for i in range(5):
+            self.report(self.website, self.user2, 'spam %d' % i)
+        self.report(self.book, self.user1, 'broken link')
+
+        with self.assertNumQueries(8) as queries:
+            self.assertEqual(send_report_digest(), 2)
+        # only the report rows are locked, not the users or content types
+        locking = [query['sql'] for query in queries.captured_queries
+                   if 'FOR UPDATE' in query['sql']]
+        self.assertEqual(len(locking), 1)
+        self.assertNotIn('JOIN', locking[0])
+        send_queued_mail(10)
+        self.assertEqual(len(mail.outbox), 1)
+        body = mail.outbox[0].body
+        self.assertEqual(body.count('Type: '), 2)
+        self.assertIn('Type: Website', body)
+        self.assertIn('Reports: 5', body)
+        self.assertIn('Issue reported by testuser2: spam 4', body)
+        self.assertIn('Recommended by: testuser2', body)
+        self.assertIn('Issue reported by testuser1: broken link', body)
+
+    def test_reports_are_only_digested_once(self):
+        self.report(self.website, self.user2, 'spam')
+        send_report_digest()
+        self.assertEqual(send_report_digest(), 0)
+        self.report(self.website, self.user2, 'more spam')
+        self.assertEqual(send_report_digest(), 1)
+        send_queued_mail(10)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertNotIn('Issue reported by testuser2: spam\n',
+                         mail.outbox[1].body)
+        self.assertTrue(Report.objects.filter(status=Report.OPEN).exists())
+
+    def test_reports_are_deleted_with_the_recommendation(self):
+        self.report(self.website, self.user2, 'spam')
+        self.website.delete()
+        self.assertFalse(Report.objects.exists())
@@ -1,13 +1,31 @@
-from django.test import TestCase, TransactionTestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from website.models import (Category, SubCategory, WebsiteRecommendation,
                             BookRecommendation, VideoRecommendation,
-                            WebsiteComment, BookComment, VideoComment)
+                            WebsiteComment, BookComment, VideoComment,
+                            UrlMetadata, Report, LeaderboardEntry, Vote)
+from website.ranking import ranked_recommendations
+from website.context_processor import get_categories
+from website.feeds import RecommendationFeed
+from website.search import search_site, suggest
+from website.votes import refresh_vote_counts, toggle_vote
+from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import date, datetime
 from django.core import mail
+from django.core.management import call_command
+from io import StringIO
+import json
+
+
+def vote(recommendation, value, *users):
+    for user in users:
+        recommendation.votes.create(user=user, value=value)
 
 
 class IndexViewTests(TestCase):
@@ -46,6 +64,33 @@ class IndexViewTests(TestCase):
         self.assertContains(resp, "There are no categories listed.")
 
 
+@override_settings(CATEGORY_CACHE_TIMEOUT=300)
+class CategoryContextCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name='python')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_categories_are_only_queried_once(self):
+        self.assertEqual([str(c) for c in get_categories()], ['python'])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_categories()), 1)
+
+    def test_saving_a_category_clears_the_cache(self):
+        get_categories()
+        Category.objects.create(name='django')
+        self.assertEqual([str(c) for c in get_categories()],
+                         ['django', 'python'])
+
+    def test_deleting_a_category_clears_the_cache(self):
+        get_categories()
+        Category.objects.get(name='python').delete()
+        self.assertEqual(get_categories(), [])
+
+
 class CategoryViewTests(TestCase):
 
     def setUp(self):
@@ -162,7 +207,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today,
         )
         # add upvotes
-        test_website1.upvote.add(test_user1)
+        vote(test_website1, Vote.UP, test_user1)
 
         test_website2 = WebsiteRecommendation.objects.create(
             website_author=test_user1,
@@ -175,7 +220,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=5)
         )
         # add upvotes
-        test_website2.upvote.add(test_user1, test_user2, test_user3)
+        vote(test_website2, Vote.UP, test_user1, test_user2, test_user3)
 
         test_website3 = WebsiteRecommendation.objects.create(
             website_author=test_user1,
@@ -188,7 +233,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=60)
         )
         # add upvotes
-        test_website3.upvote.add(test_user1, test_user2)
+        vote(test_website3, Vote.UP, test_user1, test_user2)
 
         test_website4 = WebsiteRecommendation.objects.create(
             website_author=test_user1,
@@ -201,8 +246,8 @@ class SubCategoryViewTests(TestCase):
             created_date=today
         )
         # add upvotes
-        test_website4.upvote.add(test_user1, test_user2, test_user3,
-                                 test_user4)
+        vote(test_website4, Vote.UP, test_user1, test_user2, test_user3,
+             test_user4)
 
         test_website5 = WebsiteRecommendation.objects.create(
             website_author=test_user1,
@@ -253,7 +298,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today
         )
         # add upvotes
-        test_book1.upvote.add(test_user1)
+        vote(test_book1, Vote.UP, test_user1)
 
         test_book2 = BookRecommendation.objects.create(
             isbn=1491912057,
@@ -269,7 +314,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=5)
         )
         # add upvotes
-        test_book2.upvote.add(test_user1, test_user2, test_user3)
+        vote(test_book2, Vote.UP, test_user1, test_user2, test_user3)
 
         test_book3 = BookRecommendation.objects.create(
             isbn=1491933178,
@@ -285,7 +330,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=60)
         )
         # add upvotes
-        test_book3.upvote.add(test_user1, test_user2)
+        vote(test_book3, Vote.UP, test_user1, test_user2)
 
         test_book4 = BookRecommendation.objects.create(
             isbn=1785881116,
@@ -301,8 +346,8 @@ class SubCategoryViewTests(TestCase):
             created_date=today
         )
         # add upvotes
-        test_book4.upvote.add(test_user1, test_user2, test_user3,
-                                 test_user4)
+        vote(test_book4, Vote.UP, test_user1, test_user2, test_user3,
+             test_user4)
 
         test_book5 = BookRecommendation.objects.create(
             isbn=1784391913,
@@ -360,7 +405,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today
         )
         # add upvotes
-        test_video1.upvote.add(test_user1)
+        vote(test_video1, Vote.UP, test_user1)
 
         test_video2 = VideoRecommendation.objects.create(
             title='test_video2',
@@ -375,7 +420,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=5)
         )
         # add upvotes
-        test_video2.upvote.add(test_user1, test_user2, test_user3)
+        vote(test_video2, Vote.UP, test_user1, test_user2, test_user3)
 
         test_video3 = VideoRecommendation.objects.create(
             title='test_video3',
@@ -390,7 +435,7 @@ class SubCategoryViewTests(TestCase):
             created_date=today - timezone.timedelta(weeks=60)
         )
         # add upvotes
-        test_video3.upvote.add(test_user1, test_user2)
+        vote(test_video3, Vote.UP, test_user1, test_user2)
 
         test_video4 = VideoRecommendation.objects.create(
             title='test_video4',
@@ -405,8 +450,8 @@ class SubCategoryViewTests(TestCase):
             created_date=today
         )
         # add upvotes
-        test_video4.upvote.add(test_user1, test_user2, test_user3,
-                               test_user4)
+        vote(test_video4, Vote.UP, test_user1, test_user2, test_user3,
+             test_user4)
 
         test_video5 = VideoRecommendation.objects.create(
             title='test_video5',
@@ -585,8 +630,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(website.created_date.year, timezone.now().year)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(website.upvote.count(), website_upvote_total)
-            website_upvote_total = website.upvote.count()
+            self.assertLessEqual(website.upvote_count, website_upvote_total)
+            website_upvote_total = website.upvote_count
 
     def test_best_of_month_ordering_of_websites(self):
         # best of month ordering of websites should only show websites
@@ -606,8 +651,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(website.created_date.month, timezone.now().month)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(website.upvote.count(), website_upvote_total)
-            website_upvote_total = website.upvote.count()
+            self.assertLessEqual(website.upvote_count, website_upvote_total)
+            website_upvote_total = website.upvote_count
 
 
     def test_newest_ordering_of_websites(self):
@@ -652,8 +697,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(book.created_date.year, timezone.now().year)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(book.upvote.count(), book_upvote_total)
-            book_upvote_total = book.upvote.count()
+            self.assertLessEqual(book.upvote_count, book_upvote_total)
+            book_upvote_total = book.upvote_count
 
     def test_best_of_month_ordering_of_books(self):
         # best of month ordering of books should only show books
@@ -673,8 +718,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(book.created_date.month, timezone.now().month)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(book.upvote.count(), book_upvote_total)
-            book_upvote_total = book.upvote.count()
+            self.assertLessEqual(book.upvote_count, book_upvote_total)
+            book_upvote_total = book.upvote_count
 
     def test_newest_ordering_of_books(self):
         # order by newest should only order by newest date first. There is
@@ -718,8 +763,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(video.created_date.year, timezone.now().year)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(video.upvote.count(), video_upvote_total)
-            video_upvote_total = video.upvote.count()
+            self.assertLessEqual(video.upvote_count, video_upvote_total)
+            video_upvote_total = video.upvote_count
 
     def test_best_of_month_ordering_of_videos(self):
         # best of month ordering of videos should only show videos
@@ -739,8 +784,8 @@ class SubCategoryViewTests(TestCase):
             # today
             self.assertEqual(video.created_date.month, timezone.now().month)
             # check the order of votes - should be highest to lowest
-            self.assertLessEqual(video.upvote.count(), video_upvote_total)
-            video_upvote_total = video.upvote.count()
+            self.assertLessEqual(video.upvote_count, video_upvote_total)
+            video_upvote_total = video.upvote_count
 
     def test_newest_ordering_of_videos(self):
         # order by newest should only order by newest date first. There is
@@ -845,6 +890,172 @@ class SubCategoryViewTests(TestCase):
         self.assertEqual(len(resp.context['books']), 0)
 
 
+
+class SubCategoryRankingTests(TestCase):
+
+    def setUp(self):
+        users = [User.objects.create_user(username='testuser%s' % num,
+                                          password='12345')
+                 for num in range(1, 6)]
+        test_category1 = Category.objects.create(name='python')
+        test_subcategory1 = SubCategory.objects.create(name='django',
+                                                       category=test_category1)
+        today = timezone.now()
+        votes = {
+            # title: (upvoters, downvoters)
+            'test_website1': (users[:4], users[4:]),
+            'test_website2': (users[:2], []),
+            'test_website3': ([], users[:1]),
+        }
+        for num, (title, (upvoters, downvoters)) in enumerate(
+                sorted(votes.items())):
+            website = WebsiteRecommendation.objects.create(
+                website_author=users[0],
+                category=test_category1,
+                subcategory=test_subcategory1,
+                title=title,
+                description='test description',
+                url='www.testurl%s.com' % num,
+                created_date=today,
+            )
+            vote(website, Vote.UP, *upvoters)
+            vote(website, Vote.DOWN, *downvoters)
+            book = BookRecommendation.objects.create(
+                isbn='978159327603%s' % num,
+                title=title.replace('website', 'book'),
+                recommended_by=users[0],
+                category=test_category1,
+                subcategory=test_subcategory1,
+                book_author='Test Author',
+                book_description='Test Description',
+                book_url='http://www.test.com',
+                book_image_url='http://www.testimage.com',
+                book_publish_date=today,
+                created_date=today,
+            )
+            vote(book, Vote.UP, *upvoters)
+            vote(book, Vote.DOWN, *downvoters)
+
+    def test_scores_match_hand_computed_totals(self):
+        # 4 up 1 down, 2 up 0 down and 0 up 1 down. Joining the upvotes and
+        # downvotes in one query would have given test_website1 a score of 0.
+        resp = self.client.get(reverse('subcategory',
+                                       args=('python', 'django',)))
+        self.assertEqual(resp.status_code, 200)
+        scores = [(website.title, website.total_votes)
+                  for website in resp.context['websites']]
+        self.assertEqual(scores, [('test_website1', 3),
+                                  ('test_website2', 2),
+                                  ('test_website3', -1)])
+
+    def test_viewer_vote_state(self):
+        # the logged in user's votes are passed to the templates as sets of
+        # ids so each card does not load its voters
+        login = self.client.login(username='testuser5', password='12345')
+        resp = self.client.get(reverse('subcategory',
+                                       args=('python', 'django',)))
+        self.assertEqual(resp.status_code, 200)
+        website1 = WebsiteRecommendation.objects.get(title='test_website1')
+        self.assertEqual(resp.context['viewer_websites']['upvoted'], set())
+        self.assertEqual(resp.context['viewer_websites']['downvoted'],
+                         {website1.id})
+        self.assertContains(
+            resp, 'class="fa fa-arrow-down downvote_website clicked-button" '
+                  'data-websiteid="%s"' % website1.id)
+
+    def test_viewer_vote_state_is_empty_when_logged_out(self):
+        resp = self.client.get(reverse('subcategory',
+                                       args=('python', 'django',)))
+        self.assertEqual(resp.status_code, 200)
+        for key in ('viewer_websites', 'viewer_books', 'viewer_videos'):
+            self.assertEqual(resp.context[key],
+                             {'upvoted': set(), 'downvoted': set(),
+                              'bookmarked': set()})
+
+    def test_books_share_the_same_ranking(self):
+        subcategory = SubCategory.objects.get(name='django')
+        books = ranked_recommendations(BookRecommendation, subcategory)
+        self.assertEqual([(book.title, book.score) for book in books],
+                         [('test_book1', 3),
+                          ('test_book2', 2),
+                          ('test_book3', -1)])
+
+    def test_ranking_does_not_duplicate_rows(self):
+        subcategory = SubCategory.objects.get(name='django')
+        for time_filter in (None, 'best-of-year', 'best-of-month', 'newest'):
+            websites = ranked_recommendations(WebsiteRecommendation,
+                                              subcategory, time_filter)
+            self.assertEqual(len(websites), 3)
+
+    def test_best_of_month_reads_the_leaderboard(self):
+        subcategory = SubCategory.objects.get(name='django')
+        self.assertEqual(LeaderboardEntry.objects.filter(
+            window=LeaderboardEntry.MONTH).count(), 6)
+        websites = ranked_recommendations(WebsiteRecommendation, subcategory,
+                                          'best-of-month')
+        self.assertEqual([website.title for website in websites],
+                         ['test_website1', 'test_website2', 'test_website3'])
+
+    def test_leaderboard_follows_votes(self):
+        subcategory = SubCategory.objects.get(name='django')
+        website3 = WebsiteRecommendation.objects.get(title='test_website3')
+        website3.votes.all().delete()
+        vote(website3, Vote.UP, *User.objects.all())
+        websites = ranked_recommendations(WebsiteRecommendation, subcategory,
+                                          'best-of-year')
+        self.assertEqual([website.title for website in websites],
+                         ['test_website3', 'test_website1', 'test_website2'])
+
+    def test_refresh_leaderboards(self):
+        subcategory = SubCategory.objects.get(name='django')
+        LeaderboardEntry.objects.update(period_start=date(2000, 1, 1))
+        self.assertFalse(ranked_recommendations(
+            WebsiteRecommendation, subcategory, 'best-of-month').exists())
+        call_command('refresh_leaderboards', stdout=StringIO())
+        self.assertEqual(LeaderboardEntry.objects.count(), 12)
+        self.assertEqual(len(ranked_recommendations(
+            WebsiteRecommendation, subcategory, 'best-of-month')), 3)
+
+    def test_hot_ordering(self):
+        # test_website1 has the best score but is a month old, so the newer
+        # test_website2 is hotter
+        WebsiteRecommendation.objects.filter(title='test_website1').update(
+            created_date=timezone.now() - timezone.timedelta(days=30))
+        call_command('refresh_hot_scores', stdout=StringIO())
+        resp = self.client.get(reverse('subcategory',
+                                       args=('python', 'django',)),
+                               {'time_filter': 'hot'})
+        self.assertEqual(resp.status_code, 200)
+        websites = resp.context['websites']
+        self.assertEqual([website.title for website in websites],
+                         ['test_website2', 'test_website1', 'test_website3'])
+
+    @override_settings(HOT_SCORE_WINDOW=60 * 60 * 24 * 7)
+    def test_old_recommendations_leave_the_hot_ordering(self):
+        # a heavily voted website refreshed while it was new must not stay
+        # above new websites once it is older than the window
+        old = WebsiteRecommendation.objects.get(title='test_website1')
+        WebsiteRecommendation.objects.filter(pk=old.pk).update(
+            score=10000,
+            created_date=timezone.now() - timezone.timedelta(days=6, hours=23,
+                                                             minutes=55))
+        call_command('refresh_hot_scores', stdout=StringIO())
+        subcategory = SubCategory.objects.get(name='django')
+        websites = ranked_recommendations(WebsiteRecommendation, subcategory,
+                                          'hot')
+        self.assertEqual(websites[0], old)
+
+        WebsiteRecommendation.objects.filter(pk=old.pk).update(
+            created_date=timezone.now() - timezone.timedelta(days=8))
+        call_command('refresh_hot_scores', stdout=StringIO())
+        old.refresh_from_db()
+        self.assertEqual(old.hot_score, 0)
+        websites = ranked_recommendations(WebsiteRecommendation, subcategory,
+                                          'hot')
+        self.assertEqual([website.title for website in websites],
+                         ['test_website2', 'test_website1', 'test_website3'])
+
+
 class CreateWebsiteRecommendationViewTests(TestCase):
 
     def setUp(self):
@@ -956,9 +1167,9 @@ class CreateWebsiteRecommendationViewTests(TestCase):
                                            args=(test_category1.slug,
                                                  test_subcategory1.slug,)))
 
-    def test_get_image_url_is_successful(self):
-        # test grabbing the og:image from meta
-        # pinterest image can change so if this fails check image link first
+    def test_image_is_left_to_the_worker(self):
+        # the og:image is fetched later by the process_website_images
+        # worker, not during the request
         login = self.client.login(username='testuser1', password='12345')
         test_category1 = Category.objects.get(name='python')
         test_subcategory1 = SubCategory.objects.get(name='django')
@@ -968,22 +1179,25 @@ class CreateWebsiteRecommendationViewTests(TestCase):
                                       'description': 'test',
                                       'url': 'www.pinterest.com'})
         pinterest = WebsiteRecommendation.objects.get(title='pinterest')
-        self.assertEqual(pinterest.image_url,
-            'https://s.pinimg.com/images/facebook_share_image.png')
+        self.assertEqual(pinterest.image_url, None)
+        self.assertTrue(pinterest.image_pending)
 
-    def test_get_image_url_is_unsuccessful(self):
-        # if there is no og:image in the meta tags, it should set the url
-        # as None.
+    def test_recently_fetched_url_is_not_queued(self):
+        # a url whose details were fetched recently gets its image straight
+        # away instead of waiting for the worker
+        UrlMetadata.objects.create(url='http://www.cached.com/',
+                                   image_url='http://www.cached.com/img.png')
         login = self.client.login(username='testuser1', password='12345')
         test_category1 = Category.objects.get(name='python')
         test_subcategory1 = SubCategory.objects.get(name='django')
         url = reverse('create_website', args=(test_category1.slug,
                                               test_subcategory1.slug))
-        resp = self.client.post(url, {'title': 'django',
+        resp = self.client.post(url, {'title': 'cached',
                                       'description': 'test',
-                                      'url': 'www.djangoproject.com'})
-        django = WebsiteRecommendation.objects.get(title='django')
-        self.assertEqual(django.image_url, None)
+                                      'url': 'http://www.cached.com'})
+        website = WebsiteRecommendation.objects.get(title='cached')
+        self.assertFalse(website.image_pending)
+        self.assertEqual(website.image_url, 'http://www.cached.com/img.png')
 
 
 class DeleteWebsiteRecommendationViewTests(TestCase):
@@ -1211,6 +1425,45 @@ class ProfilePageViewTests(TestCase):
         self.assertContains(resp, "test_website_bookmark")
         self.assertEqual(len(resp.context['recommendations_list']), 1)
 
+    def test_recommendations_feed_is_merged_and_sliced_in_the_database(self):
+        # the feed must give the same order as merging every recommendation
+        # in python, with only the requested slice loaded
+        user = User.objects.get(username='testuser1')
+        feed = RecommendationFeed([
+            WebsiteRecommendation.objects.filter(website_author=user),
+            BookRecommendation.objects.filter(recommended_by=user),
+            VideoRecommendation.objects.filter(recommended_by=user),
+        ])
+        expected = sorted(
+            list(WebsiteRecommendation.objects.filter(website_author=user)) +
+            list(BookRecommendation.objects.filter(recommended_by=user)) +
+            list(VideoRecommendation.objects.filter(recommended_by=user)),
+            key=lambda item: item.created_date, reverse=True)
+        self.assertEqual(len(feed), 15)
+        self.assertEqual(
+            [item.created_date for item in feed[4:9]],
+            [item.created_date for item in expected[4:9]])
+        # one query for the page of ids and one per model on the page
+        feed = RecommendationFeed(feed.querysets)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(feed[0:10]), 10)
+
+    def test_viewer_state_only_covers_items_on_the_profile(self):
+        # testuser2 viewing testuser1's profile should see their own
+        # bookmark on testuser1's website but not on their own website,
+        # which is not on this profile.
+        test_user2 = User.objects.get(username='testuser2')
+        website = WebsiteRecommendation.objects.get(title='test_website0')
+        website.bookmark.add(test_user2)
+        vote(website, Vote.UP, test_user2)
+        login = self.client.login(username='testuser2', password='12345')
+        resp = self.client.get(reverse('user_profile', args=('testuser1',)))
+        self.assertEqual(resp.status_code, 200)
+        viewer_websites = resp.context['viewer_websites']
+        self.assertEqual(viewer_websites['bookmarked'], {website.id})
+        self.assertEqual(viewer_websites['upvoted'], {website.id})
+        self.assertEqual(viewer_websites['downvoted'], set())
+
 
 class UpvoteWebsiteViewTests(TestCase):
 
@@ -1267,6 +1520,7 @@ class UpvoteWebsiteViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        website.refresh_from_db()
         self.assertEqual(website.total_votes, 1)
 
     def test_upvote_website_view_decreases_if_pressed_again(self):
@@ -1275,15 +1529,64 @@ class UpvoteWebsiteViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         website = WebsiteRecommendation.objects.get(title='test_website')
         test_user1 = User.objects.get(username='testuser1')
-        website.upvote.add(test_user1)
+        vote(website, Vote.UP, test_user1)
         resp = self.client.post(
             reverse('upvote_website'),
             {'websiteid': website.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        website.refresh_from_db()
         self.assertEqual(website.total_votes, 0)
 
+    def test_upvote_replaces_downvote(self):
+        login = self.client.login(username='testuser1', password='12345')
+        website = WebsiteRecommendation.objects.get(title='test_website')
+        test_user1 = User.objects.get(username='testuser1')
+        vote(website, Vote.DOWN, test_user1)
+        resp = self.client.post(
+            reverse('upvote_website'),
+            {'websiteid': website.id},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(resp.content, b'1')
+        website.refresh_from_db()
+        self.assertEqual(website.upvote_count, 1)
+        self.assertEqual(website.downvote_count, 0)
+        self.assertFalse(website.votes.filter(value=Vote.DOWN).exists())
+        self.assertEqual(LeaderboardEntry.objects.get(
+            object_id=website.id, window=LeaderboardEntry.MONTH).score, 1)
+
+    def test_toggle_vote_counters_match_the_vote_table(self):
+        website = WebsiteRecommendation.objects.get(title='test_website')
+        users = [User.objects.get(username='testuser1')] + [
+            User.objects.create_user(username='voter%d' % num,
+                                     password='12345')
+            for num in range(3)]
+        ContentType.objects.get_for_model(WebsiteRecommendation)
+        for user, value in ((users[0], Vote.UP), (users[1], Vote.UP),
+                            (users[2], Vote.DOWN), (users[3], Vote.UP),
+                            (users[1], Vote.DOWN), (users[0], Vote.UP),
+                            (users[2], Vote.UP)):
+            # the row lock and the toggle, inside the test's savepoint
+            with self.assertNumQueries(4):
+                score = toggle_vote(WebsiteRecommendation, website.id, user,
+                                    value)
+        website.refresh_from_db()
+        self.assertEqual(score, website.score)
+        refresh_vote_counts(WebsiteRecommendation)
+        recounted = WebsiteRecommendation.objects.get(id=website.id)
+        self.assertEqual(
+            (website.upvote_count, website.downvote_count, website.score),
+            (recounted.upvote_count, recounted.downvote_count,
+             recounted.score))
+        self.assertEqual(website.score, 1)
+
+    def test_vote_on_missing_recommendation_is_404(self):
+        login = self.client.login(username='testuser1', password='12345')
+        resp = self.client.post(reverse('upvote_website'), {'websiteid': 0})
+        self.assertEqual(resp.status_code, 404)
+
 
 class DownvoteWebsiteViewTests(TestCase):
 
@@ -1340,6 +1643,7 @@ class DownvoteWebsiteViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        website.refresh_from_db()
         self.assertEqual(website.total_votes, -1)
 
     def test_downvote_website_view_increases_if_pressed_again(self):
@@ -1348,13 +1652,14 @@ class DownvoteWebsiteViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         website = WebsiteRecommendation.objects.get(title='test_website')
         test_user1 = User.objects.get(username='testuser1')
-        website.downvote.add(test_user1)
+        vote(website, Vote.DOWN, test_user1)
         resp = self.client.post(
             reverse('downvote_website'),
             {'websiteid': website.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        website.refresh_from_db()
         self.assertEqual(website.total_votes, 0)
 
 
@@ -1581,6 +1886,18 @@ class WebsiteCommentViewTests(TestCase):
                          User.objects.get(username='testuser1'))
         self.assertEqual(comment.website, website)
 
+    def test_bookmark_is_shown_from_the_viewer_state(self):
+        login = self.client.login(username='testuser1', password='12345')
+        website = WebsiteRecommendation.objects.get(title='test_website')
+        website.bookmark.add(User.objects.get(username='testuser1'))
+        url = reverse('website_comment', args=('python', 'django', website.pk))
+        resp = self.client.get(url)
+        self.assertEqual(resp.context['viewer_websites']['bookmarked'],
+                         {website.id})
+        self.assertContains(
+            resp, 'class="fa fa-bookmark-o pull-right bookmark_website '
+                  'clicked-button" data-websiteid="%s"' % website.id)
+
 
 class EditWebsiteCommentViewTests(TestCase):
 
@@ -1781,6 +2098,11 @@ class CreateBookRecommendationViewTests(TransactionTestCase):
             book_publish_date=timezone.now()
         )
 
+    def tearDown(self):
+        # the flush after each test truncates django_content_type, so the
+        # ids the leaderboard signal cached would be stale for the next one
+        ContentType.objects.clear_cache()
+
     def test_redirect_if_not_logged_in(self):
         test_category1 = Category.objects.get(name='python')
         test_subcategory1 = SubCategory.objects.get(name='django')
@@ -2089,6 +2411,7 @@ class UpvoteBookViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        book.refresh_from_db()
         self.assertEqual(book.total_votes, 1)
 
     def test_upvote_book_view_decreases_if_pressed_again(self):
@@ -2097,13 +2420,14 @@ class UpvoteBookViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         book = BookRecommendation.objects.get(title='test title')
         test_user1 = User.objects.get(username='testuser1')
-        book.upvote.add(test_user1)
+        vote(book, Vote.UP, test_user1)
         resp = self.client.post(
             reverse('upvote_book'),
             {'bookid': book.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        book.refresh_from_db()
         self.assertEqual(book.total_votes, 0)
 
 class DownvoteBookViewTests(TestCase):
@@ -2163,6 +2487,7 @@ class DownvoteBookViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        book.refresh_from_db()
         self.assertEqual(book.total_votes, -1)
 
     def test_downvote_book_view_increases_if_pressed_again(self):
@@ -2171,13 +2496,14 @@ class DownvoteBookViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         book = BookRecommendation.objects.get(title='test title')
         test_user1 = User.objects.get(username='testuser1')
-        book.downvote.add(test_user1)
+        vote(book, Vote.DOWN, test_user1)
         resp = self.client.post(
             reverse('downvote_book'),
             {'bookid': book.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        book.refresh_from_db()
         self.assertEqual(book.total_votes, 0)
 
 class BookmarkBookViewTests(TestCase):
@@ -2407,6 +2733,19 @@ class BookCommentViewTests(TestCase):
                          User.objects.get(username='testuser1'))
         self.assertEqual(comment.book, book)
 
+    def test_bookmark_is_shown_from_the_viewer_state(self):
+        login = self.client.login(username='testuser1', password='12345')
+        book = BookRecommendation.objects.get(title='test title')
+        book.bookmark.add(User.objects.get(username='testuser1'))
+        url = reverse('book_comment', args=('python', 'django', book.pk))
+        resp = self.client.get(url)
+        self.assertEqual(resp.context['viewer_books']['bookmarked'],
+                         {book.id})
+        self.assertContains(
+            resp, 'class="fa fa-bookmark-o pull-right bookmark_book '
+                  'clicked-button" data-bookid="%s"' % book.id)
+
+
 class EditBookCommentViewTests(TestCase):
 
     def setUp(self):
@@ -2609,6 +2948,11 @@ class CreateVideoRecommendationViewTests(TransactionTestCase):
             video_id='dQw4w9WgXcQ',
         )
 
+    def tearDown(self):
+        # the flush after each test truncates django_content_type, so the
+        # ids the leaderboard signal cached would be stale for the next one
+        ContentType.objects.clear_cache()
+
     def test_redirect_if_not_logged_in(self):
         test_category1 = Category.objects.get(name='python')
         test_subcategory1 = SubCategory.objects.get(name='django')
@@ -2895,6 +3239,7 @@ class UpvoteVideoViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        video.refresh_from_db()
         self.assertEqual(video.total_votes, 1)
 
     def test_upvote_video_view_decreases_if_pressed_again(self):
@@ -2903,13 +3248,14 @@ class UpvoteVideoViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         video = VideoRecommendation.objects.get(title='test title')
         test_user1 = User.objects.get(username='testuser1')
-        video.upvote.add(test_user1)
+        vote(video, Vote.UP, test_user1)
         resp = self.client.post(
             reverse('upvote_video'),
             {'videoid': video.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        video.refresh_from_db()
         self.assertEqual(video.total_votes, 0)
 
 class DownvoteVideoViewTests(TestCase):
@@ -2968,6 +3314,7 @@ class DownvoteVideoViewTests(TestCase):
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        video.refresh_from_db()
         self.assertEqual(video.total_votes, -1)
 
     def test_downvote_video_view_increases_if_pressed_again(self):
@@ -2976,13 +3323,14 @@ class DownvoteVideoViewTests(TestCase):
         login = self.client.login(username='testuser1', password='12345')
         video = VideoRecommendation.objects.get(title='test title')
         test_user1 = User.objects.get(username='testuser1')
-        video.downvote.add(test_user1)
+        vote(video, Vote.DOWN, test_user1)
         resp = self.client.post(
             reverse('downvote_video'),
             {'videoid': video.id},
             HTTP_X_REQUESTED_WITH='XMLHttpRequest'
         )
         self.assertEqual(resp.status_code, 200)
+        video.refresh_from_db()
         self.assertEqual(video.total_votes, 0)
 
 class BookmarkVideoViewTests(TestCase):
@@ -3062,6 +3410,165 @@ class BookmarkVideoViewTests(TestCase):
         self.assertEqual(resp.status_code, 204)
         self.assertEqual(video.bookmark.count(), 0)
 
+class VoteBatchViewTests(TestCase):
+
+    def setUp(self):
+        test_user1 = User.objects.create_user(username='testuser1',
+                                              password='12345')
+        test_user2 = User.objects.create_user(username='testuser2',
+                                              password='12345')
+        test_category1 = Category.objects.create(name='python')
+        test_subcategory1 = SubCategory.objects.create(name='django',
+                                                       category=test_category1)
+        for num in range(10):
+            WebsiteRecommendation.objects.create(
+                website_author=test_user1,
+                category=test_category1,
+                subcategory=test_subcategory1,
+                title='test_website%s' % num,
+                description='test description',
+                url='www.testurl%s.com' % num,
+            )
+        BookRecommendation.objects.create(
+            isbn='9781593276034',
+            title='test_book',
+            recommended_by=test_user1,
+            category=test_category1,
+            subcategory=test_subcategory1,
+            book_author='Test Author',
+            book_description='Test Description',
+            book_url='http://www.test.com',
+            book_image_url='http://www.testimage.com',
+            book_publish_date=timezone.now(),
+        )
+        VideoRecommendation.objects.create(
+            title='test_video',
+            recommended_by=test_user1,
+            category=test_category1,
+            subcategory=test_subcategory1,
+            video_description='Test Description',
+            video_publish_date=timezone.now(),
+            video_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            video_image_url='https://img.youtube.com/vi/dQw4w9WgXcQ/0.jpg',
+            video_id='dQw4w9WgXcQ',
+        )
+
+    def post_batch(self, operations):
+        return self.client.post(reverse('vote_batch'),
+                                json.dumps({'operations': operations}),
+                                content_type='application/json')
+
+    def test_redirect_if_not_logged_in(self):
+        resp = self.post_batch([])
+        self.assertRedirects(resp, '/accounts/login/?next=/votes/batch/')
+
+    def test_405_if_get_request_attempted(self):
+        login = self.client.login(username='testuser1', password='12345')
+        resp = self.client.get(reverse('vote_batch'))
+        self.assertEqual(resp.status_code, 405)
+
+    def test_operations_toggle_in_order(self):
+        login = self.client.login(username='testuser2', password='12345')
+        test_user2 = User.objects.get(username='testuser2')
+        website = WebsiteRecommendation.objects.get(title='test_website0')
+        book = BookRecommendation.objects.get(title='test_book')
+        video = VideoRecommendation.objects.get(title='test_video')
+        vote(book, Vote.UP, test_user2)
+        video.bookmark.add(test_user2)
+        resp = self.post_batch([
+            {'type': 'website', 'id': website.id, 'action': 'upvote'},
+            {'type': 'website', 'id': website.id, 'action': 'downvote'},
+            {'type': 'website', 'id': website.id, 'action': 'bookmark'},
+            {'type': 'book', 'id': book.id, 'action': 'upvote'},
+            {'type': 'video', 'id': video.id, 'action': 'upvote'},
+            {'type': 'video', 'id': video.id, 'action': 'bookmark'},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {'scores': [
+            {'type': 'book', 'id': book.id, 'score': 0},
+            {'type': 'video', 'id': video.id, 'score': 1},
+            {'type': 'website', 'id': website.id, 'score': -1},
+        ]})
+        website.refresh_from_db()
+        self.assertEqual((website.upvote_count, website.downvote_count),
+                         (0, 1))
+        self.assertEqual(website.votes.get().value, Vote.DOWN)
+        self.assertTrue(website.bookmark.filter(id=test_user2.id).exists())
+        self.assertFalse(book.votes.exists())
+        self.assertFalse(video.bookmark.exists())
+        self.assertEqual(LeaderboardEntry.objects.get(
+            object_id=website.id, window=LeaderboardEntry.MONTH).score, -1)
+
+    def test_counters_match_a_recount(self):
+        login = self.client.login(username='testuser2', password='12345')
+        test_user1 = User.objects.get(username='testuser1')
+        websites = list(WebsiteRecommendation.objects.order_by('id'))
+        vote(websites[0], Vote.UP, test_user1)
+        vote(websites[1], Vote.DOWN, test_user1)
+        resp = self.post_batch([
+            {'type': 'website', 'id': website.id, 'action': action}
+            for website in websites[:4]
+            for action in ('upvote', 'downvote', 'upvote')])
+        self.assertEqual(resp.status_code, 200)
+        stored = list(WebsiteRecommendation.objects.order_by('id')
+                      .values_list('upvote_count', 'downvote_count', 'score'))
+        refresh_vote_counts(WebsiteRecommendation)
+        recounted = list(WebsiteRecommendation.objects.order_by('id')
+                         .values_list('upvote_count', 'downvote_count',
+                                      'score'))
+        self.assertEqual(stored, recounted)
+        self.assertEqual([score for up, down, score in stored[:4]],
+                         [2, 0, 1, 1])
+
+    def test_queries_do_not_grow_with_the_operations(self):
+        login = self.client.login(username='testuser2', password='12345')
+        websites = list(WebsiteRecommendation.objects.order_by('id'))
+        ContentType.objects.get_for_model(WebsiteRecommendation)
+        with CaptureQueriesContext(connection) as one:
+            self.post_batch([{'type': 'website', 'id': websites[0].id,
+                              'action': 'upvote'}])
+        with CaptureQueriesContext(connection) as many:
+            resp = self.post_batch([
+                {'type': 'website', 'id': website.id, 'action': 'upvote'}
+                for website in websites[1:]])
+        self.assertEqual(len(resp.json()['scores']), 9)
+        self.assertEqual(len(many), len(one))
+
+    def test_missing_recommendations_are_skipped(self):
+        login = self.client.login(username='testuser2', password='12345')
+        website = WebsiteRecommendation.objects.get(title='test_website0')
+        resp = self.post_batch([
+            {'type': 'website', 'id': 0, 'action': 'upvote'},
+            {'type': 'website', 'id': website.id, 'action': 'upvote'},
+        ])
+        self.assertEqual(resp.json(), {'scores': [
+            {'type': 'website', 'id': website.id, 'score': 1}]})
+
+    def test_malformed_operations_are_rejected(self):
+        login = self.client.login(username='testuser2', password='12345')
+        website = WebsiteRecommendation.objects.get(title='test_website0')
+        for operations in ({'type': 'website'},
+                           [{'type': 'website', 'id': website.id}],
+                           [{'type': 'comment', 'id': website.id,
+                             'action': 'upvote'}],
+                           [{'type': 'website', 'id': 'x',
+                             'action': 'upvote'}]):
+            resp = self.post_batch(operations)
+            self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(reverse('vote_batch'), 'not json',
+                                content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+    @override_settings(VOTE_BATCH_MAX_OPERATIONS=2)
+    def test_too_many_operations_are_rejected(self):
+        login = self.client.login(username='testuser2', password='12345')
+        website = WebsiteRecommendation.objects.get(title='test_website0')
+        resp = self.post_batch(
+            [{'type': 'website', 'id': website.id, 'action': 'upvote'}] * 3)
+        self.assertEqual(resp.status_code, 400)
+
+
 class VideoCommentViewTests(TestCase):
 
     def setUp(self):
@@ -3210,6 +3717,19 @@ class VideoCommentViewTests(TestCase):
                          User.objects.get(username='testuser1'))
         self.assertEqual(comment.video, video)
 
+    def test_bookmark_is_shown_from_the_viewer_state(self):
+        login = self.client.login(username='testuser1', password='12345')
+        video = VideoRecommendation.objects.get(title='test title')
+        video.bookmark.add(User.objects.get(username='testuser1'))
+        url = reverse('video_comment', args=('python', 'django', video.pk))
+        resp = self.client.get(url)
+        self.assertEqual(resp.context['viewer_videos']['bookmarked'],
+                         {video.id})
+        self.assertContains(
+            resp, 'class="fa fa-bookmark-o pull-right bookmark_video '
+                  'clicked-button" data-videoid="%s"' % video.id)
+
+
 class EditVideoCommentViewTests(TestCase):
 
     def setUp(self):
@@ -3475,9 +3995,14 @@ class ReportWebsiteRecommendationViewTests(TestCase):
             test_category1.slug, test_subcategory1.slug, website.pk))
         resp = self.client.get(url, {'message_box': 'test report message'})
         self.assertEqual(resp.status_code, 302)
+        # reports are stored and mailed in the next digest
+        self.assertEqual(Report.objects.get().message, 'test report message')
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_report_digest', stdout=StringIO())
+        call_command('send_queued_mail', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
-            'Noobhub recommendation report!')
+            'Noobhub recommendation reports: 1 reported')
 
     def test_redirect_after_report_email_is_sent(self):
         login = self.client.login(username='testuser1', password='12345')
@@ -3587,9 +4112,14 @@ class ReportBookRecommendationViewTests(TestCase):
             test_category1.slug, test_subcategory1.slug, book.pk))
         resp = self.client.get(url, {'message_box': 'test report message'})
         self.assertEqual(resp.status_code, 302)
+        # reports are stored and mailed in the next digest
+        self.assertEqual(Report.objects.get().message, 'test report message')
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_report_digest', stdout=StringIO())
+        call_command('send_queued_mail', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
-            'Noobhub recommendation report!')
+            'Noobhub recommendation reports: 1 reported')
 
     def test_redirect_after_report_email_is_sent(self):
         login = self.client.login(username='testuser1', password='12345')
@@ -3697,9 +4227,14 @@ class ReportVideoRecommendationViewTests(TestCase):
             test_category1.slug, test_subcategory1.slug, video.pk))
         resp = self.client.get(url, {'message_box': 'test report message'})
         self.assertEqual(resp.status_code, 302)
+        # reports are stored and mailed in the next digest
+        self.assertEqual(Report.objects.get().message, 'test report message')
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_report_digest', stdout=StringIO())
+        call_command('send_queued_mail', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject,
-            'Noobhub recommendation report!')
+            'Noobhub recommendation reports: 1 reported')
 
     def test_redirect_after_report_email_is_sent(self):
         login = self.client.login(username='testuser1', password='12345')
@@ -3712,3 +4247,116 @@ class ReportVideoRecommendationViewTests(TestCase):
         self.assertRedirects(resp, reverse('subcategory',
                                            args=(test_category1.slug,
                                                  test_subcategory1.slug,)))
+
+
+class SiteSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='12345')
+        python = Category.objects.create(name='python')
+        django = SubCategory.objects.create(name='django', category=python)
+        ruby = Category.objects.create(name='ruby')
+        rails = SubCategory.objects.create(name='rails', category=ruby)
+        WebsiteRecommendation.objects.create(
+            website_author=user, category=python, subcategory=django,
+            title='Testing tutorial', description='about tests',
+            url='http://www.test.com')
+        BookRecommendation.objects.create(
+            isbn='1593276036', title='Test book', recommended_by=user,
+            category=ruby, subcategory=rails, book_author='Test Author',
+            book_description='<p>a book about testing</p>',
+            book_url='http://www.test.com',
+            book_image_url='http://www.test.com',
+            book_publish_date=timezone.now())
+        VideoRecommendation.objects.create(
+            title='Unrelated video', recommended_by=user, category=ruby,
+            subcategory=rails, video_description='a video about tests',
+            video_publish_date=timezone.now(), video_url='http://www.test.com',
+            video_image_url='http://www.test.com', video_id='abc123')
+        VideoRecommendation.objects.create(
+            title='Cooking video', recommended_by=user, category=ruby,
+            subcategory=rails, video_description='nothing to see',
+            video_publish_date=timezone.now(), video_url='http://www.test.com',
+            video_image_url='http://www.test.com', video_id='def456')
+
+    def test_search_covers_every_category_in_one_query(self):
+        with self.assertNumQueries(1):
+            results, next_cursor = search_site('test')
+        self.assertEqual(sorted(result.type for result in results),
+                         ['book', 'video', 'website'])
+        self.assertIsNone(next_cursor)
+        # title matches rank above description matches
+        self.assertEqual(results[-1].title, 'Unrelated video')
+        self.assertEqual(results[-1].category_slug, 'ruby')
+        self.assertEqual(results[-1].subcategory_slug, 'rails')
+
+    def test_search_pages_with_cursors(self):
+        everything, next_cursor = search_site('test')
+        pages = []
+        cursor = None
+        while True:
+            results, cursor = search_site('test', after=cursor, limit=1)
+            pages.extend(results)
+            if cursor is None:
+                break
+        self.assertEqual(pages, everything)
+
+    def test_search_ignores_an_invalid_cursor(self):
+        results, next_cursor = search_site('test', after='nonsense')
+        self.assertEqual(len(results), 3)
+
+    def test_search_view(self):
+        resp = self.client.get(reverse('search'), {'search_box': 'test'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'website/search.html')
+        self.assertEqual(len(resp.context['results']), 3)
+        self.assertContains(resp, 'a book about testing')
+        self.assertContains(resp, '/category/ruby/rails/')
+
+    def test_search_view_with_no_matches(self):
+        resp = self.client.get(reverse('search'), {'search_box': 'zzzz'})
+        self.assertContains(resp, 'Nothing matched your search - "zzzz"')
+
+    def test_suggestions(self):
+        cache.clear()
+        self.assertEqual(suggest('RAI'), [
+            {'type': 'subcategory', 'title': 'rails',
+             'url': '/category/ruby/rails/'}])
+        self.assertEqual(suggest('tutor'), [
+            {'type': 'website', 'title': 'Testing tutorial',
+             'url': '/category/python/django/'}])
+        # too short for the trigram indexes
+        self.assertEqual(suggest('ra'), [])
+
+    def test_suggestions_are_cached_per_prefix(self):
+        cache.clear()
+        suggestions = suggest('test')
+        with self.assertNumQueries(0):
+            self.assertEqual(suggest(' Test '), suggestions)
+
+    def test_suggestions_restore_the_statement_timeout(self):
+        # TestCase wraps the test in a transaction, as ATOMIC_REQUESTS would
+        cache.clear()
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            before = cursor.fetchone()[0]
+            suggest('test')
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], before)
+
+    @override_settings(TYPEAHEAD_TIME_BUDGET=0)
+    def test_suggestions_over_budget_are_not_cached(self):
+        cache.clear()
+        self.assertEqual(suggest('test'), [])
+        with override_settings(TYPEAHEAD_TIME_BUDGET=1000):
+            self.assertEqual(len(suggest('test')), 2)
+
+    def test_search_suggestions_view(self):
+        cache.clear()
+        resp = self.client.get(reverse('search_suggestions'), {'q': 'book'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {'suggestions': [
+            {'type': 'book', 'title': 'Test book',
+             'url': '/category/ruby/rails/'}]})
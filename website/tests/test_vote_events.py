@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from io import StringIO
+
+from website.models import (Category, SubCategory, WebsiteRecommendation,
+                            Vote, VoteEvent, VoteSnapshot)
+from website.vote_events import compact_vote_events
+from website.votes import apply_vote_batch, toggle_vote
+
+
+class VoteEventTests(TestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='testuser1',
+                                              password='12345')
+        self.user2 = User.objects.create_user(username='testuser2',
+                                              password='12345')
+        category = Category.objects.create(name='python')
+        subcategory = SubCategory.objects.create(name='django',
+                                                 category=category)
+        self.website = WebsiteRecommendation.objects.create(
+            title='test_website',
+            description='test description',
+            website_author=self.user1,
+            url='http://www.test.com',
+            category=category,
+            subcategory=subcategory)
+        self.content_type = ContentType.objects.get_for_model(
+            WebsiteRecommendation)
+        self.now = timezone.make_aware(datetime(2018, 3, 2, 10, 30))
+
+    def event(self, hours_ago, upvotes, downvotes):
+        return VoteEvent.objects.create(
+            user=self.user1, content_type=self.content_type,
+            object_id=self.website.id, upvotes=upvotes, downvotes=downvotes,
+            created_date=self.now - timedelta(hours=hours_ago))
+
+    def snapshots(self, period):
+        return list(VoteSnapshot.objects
+                                .filter(period=period)
+                                .order_by('period_start')
+                                .values_list('period_start', 'upvotes',
+                                             'downvotes', 'score'))
+
+    def test_toggle_vote_logs_the_change(self):
+        toggle_vote(WebsiteRecommendation, self.website.id, self.user1,
+                    Vote.UP)
+        toggle_vote(WebsiteRecommendation, self.website.id, self.user1,
+                    Vote.DOWN)
+        toggle_vote(WebsiteRecommendation, self.website.id, self.user1,
+                    Vote.DOWN)
+        self.assertEqual(list(VoteEvent.objects
+                                       .order_by('id')
+                                       .values_list('user', 'object_id',
+                                                    'upvotes', 'downvotes')),
+                         [(self.user1.id, self.website.id, 1, 0),
+                          (self.user1.id, self.website.id, -1, 1),
+                          (self.user1.id, self.website.id, 0, -1)])
+
+    def test_vote_batch_logs_only_the_net_change(self):
+        Vote.objects.create(user=self.user2, content_type=self.content_type,
+                            object_id=self.website.id, value=Vote.DOWN)
+        apply_vote_batch(self.user2, [
+            ('website', self.website.id, 'upvote'),
+            ('website', self.website.id, 'downvote'),
+            ('website', self.website.id, 'upvote'),
+        ])
+        self.assertEqual(list(VoteEvent.objects.values_list(
+            'user', 'upvotes', 'downvotes')), [(self.user2.id, 1, -1)])
+
+    def test_events_are_rolled_into_hourly_and_daily_snapshots(self):
+        self.event(0, 1, 0)     # 10:30, the current hour is left alone
+        self.event(1, 1, 0)     # 09:30
+        self.event(1.5, 0, 1)   # 09:00
+        self.event(3, -1, 1)    # 07:30
+        self.event(12, 1, 0)    # 22:30 the day before
+        self.assertEqual(compact_vote_events(self.now), (3, 2, 0))
+        hour = timezone.make_aware(datetime(2018, 3, 2, 9))
+        self.assertEqual(self.snapshots(VoteSnapshot.HOUR), [
+            (hour - timedelta(hours=11), 1, 0, 1),
+            (hour - timedelta(hours=2), -1, 1, -2),
+            (hour, 1, 1, 0),
+        ])
+        day = timezone.make_aware(datetime(2018, 3, 2))
+        self.assertEqual(self.snapshots(VoteSnapshot.DAY), [
+            (day - timedelta(days=1), 1, 0, 1),
+            (day, 0, 2, -2),
+        ])
+
+    def test_compacting_again_picks_up_new_events_only(self):
+        self.event(1, 1, 0)
+        compact_vote_events(self.now)
+        # an event committed late into the last compacted hour and one in
+        # the hour that has since ended
+        self.event(1, 1, 0)
+        self.event(0, 0, 1)
+        compact_vote_events(self.now + timedelta(hours=1))
+        compact_vote_events(self.now + timedelta(hours=1))
+        hour = timezone.make_aware(datetime(2018, 3, 2, 9))
+        self.assertEqual(self.snapshots(VoteSnapshot.HOUR), [
+            (hour, 2, 0, 2),
+            (hour + timedelta(hours=1), 0, 1, -1),
+        ])
+        self.assertEqual(self.snapshots(VoteSnapshot.DAY), [
+            (timezone.make_aware(datetime(2018, 3, 2)), 2, 1, 1),
+        ])
+
+    @override_settings(VOTE_EVENT_RETENTION=60 * 60 * 24,
+                       VOTE_SNAPSHOT_HOURLY_RETENTION=60 * 60 * 48)
+    def test_old_events_and_hourly_snapshots_are_deleted(self):
+        self.event(72, 1, 0)
+        self.event(30, 1, 0)
+        self.event(2, 1, 0)
+        hourly, daily, deleted = compact_vote_events(self.now)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(VoteEvent.objects.count(), 1)
+        self.assertEqual(len(self.snapshots(VoteSnapshot.HOUR)), 2)
+        self.assertEqual(sum(score for start, up, down, score
+                             in self.snapshots(VoteSnapshot.DAY)), 3)
+
+    def test_compact_vote_events_command(self):
+        self.event(1, 1, 0)
+        out = StringIO()
+        call_command('compact_vote_events', stdout=out)
+        self.assertIn('1 hourly and 1 daily vote snapshots written',
+                      out.getvalue())
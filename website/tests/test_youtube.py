@@ -0,0 +1,107 @@
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from website import youtube
+from website.models import VideoMetadata
+
+
+FIXTURE = os.path.join(settings.BASE_DIR, 'website', 'tests', 'fixtures',
+                       'youtube_v3_discovery.json')
+
+
+@override_settings(YOUTUBE_DISCOVERY_DOCUMENT=FIXTURE)
+@patch.dict(os.environ, {'YOUTUBE_DEVELOPER_KEY': 'testkey'})
+class YouTubeClientTests(SimpleTestCase):
+
+    def setUp(self):
+        youtube._local.__dict__.clear()
+
+    def tearDown(self):
+        youtube._local.__dict__.clear()
+
+    def test_client_is_built_once(self):
+        with patch('website.youtube.build_youtube_client',
+                   wraps=youtube.build_youtube_client) as build:
+            client = youtube.get_youtube_client()
+            self.assertIs(youtube.get_youtube_client(), client)
+        self.assertEqual(build.call_count, 1)
+
+    def test_client_is_built_from_the_local_discovery_document(self):
+        # no request is made to the discovery service
+        with patch('httplib2.Http.request') as request:
+            client = youtube.get_youtube_client()
+            self.assertFalse(request.called)
+        video_request = client.videos().list(id='abc123', part='snippet')
+        self.assertTrue(video_request.uri.startswith(
+            'https://www.googleapis.com/youtube/v3/videos?'))
+        self.assertIn('id=abc123', video_request.uri)
+        self.assertIn('key=testkey', video_request.uri)
+
+    def test_fetch_video_details(self):
+        response = {
+            'pageInfo': {'totalResults': 1},
+            'items': [{'snippet': {
+                'title': 'test title',
+                'description': 'test description',
+                'publishedAt': '2018-01-01T00:00:00.000Z',
+                'thumbnails': {'high': {'url': 'http://test.com/high.jpg'}},
+            }}],
+        }
+        with patch('apiclient.http.HttpRequest.execute',
+                   return_value=response):
+            details = youtube.fetch_video_details('abc123')
+        self.assertEqual(details, {
+            'title': 'test title',
+            'description': 'test description',
+            'thumbnail': 'http://test.com/high.jpg',
+            'publish_date': '2018-01-01T00:00:00.000Z',
+        })
+
+    def test_fetch_video_details_for_missing_video(self):
+        with patch('apiclient.http.HttpRequest.execute',
+                   return_value={'pageInfo': {'totalResults': 0},
+                                 'items': []}):
+            self.assertIsNone(youtube.fetch_video_details('abc123'))
+
+
+class VideoMetadataStoreTests(TestCase):
+
+    details = {
+        'title': 'test title',
+        'description': 'test description',
+        'thumbnail': 'http://test.com/high.jpg',
+        'publish_date': '2018-01-01T00:00:00Z',
+    }
+
+    @patch('website.youtube.fetch_video_details')
+    def test_details_are_only_fetched_once(self, fetch_video_details):
+        fetch_video_details.return_value = self.details
+        youtube.get_video_details('abc123')
+        details = youtube.get_video_details('abc123')
+        self.assertEqual(fetch_video_details.call_count, 1)
+        self.assertEqual(details['title'], 'test title')
+        self.assertEqual(details['thumbnail'], 'http://test.com/high.jpg')
+
+    @patch('website.youtube.fetch_video_details')
+    def test_expired_details_are_fetched_again(self, fetch_video_details):
+        VideoMetadata.objects.create(
+            video_id='abc123',
+            title='old title',
+            description='old description',
+            thumbnail_url='http://test.com/old.jpg',
+            publish_date=timezone.now(),
+            fetched_date=timezone.now() - timedelta(days=365))
+        fetch_video_details.return_value = self.details
+        details = youtube.get_video_details('abc123')
+        self.assertEqual(details['title'], 'test title')
+        self.assertEqual(VideoMetadata.objects.get().title, 'test title')
+
+    @patch('website.youtube.fetch_video_details', return_value=None)
+    def test_missing_videos_are_not_stored(self, fetch_video_details):
+        self.assertIsNone(youtube.get_video_details('abc123'))
+        self.assertFalse(VideoMetadata.objects.exists())
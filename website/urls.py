@@ -4,6 +4,10 @@ from django.contrib.auth.decorators import login_required
 
 urlpatterns = [
     url(r'^$', views.index, name='index'),
+    url(r'^search/$', views.search, name='search'),
+    url(r'^search/suggest/$', views.search_suggestions,
+        name='search_suggestions'),
+    url(r'^votes/batch/$', views.vote_batch, name='vote_batch'),
     url(r'^user/(?P<username>[\w.@+-]+)/$', views.profile_page, name='user_profile'),
     url(r'^category/(?P<category_name_slug>[\w\-]+)/$', views.category,
         name='category'),
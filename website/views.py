@@ -1,34 +1,28 @@
 from django.shortcuts import render
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, JsonResponse
 from website.models import (Category, SubCategory, WebsiteRecommendation,
                             WebsiteComment, BookRecommendation, BookComment,
-                            VideoRecommendation, VideoComment)
+                            VideoRecommendation, VideoComment, Report, Vote)
 from website.forms import (WebsiteForm, WebsiteCommentForm, BookForm,
                            BookCommentForm, VideoForm, VideoCommentForm,
                            DateFilterForm, SearchForm, ReportForm)
+from website.ranking import ranked_recommendations
+from website.search import search_recommendations, search_site, suggest
+from website.votes import (toggle_vote, viewer_vote_state,
+                           parse_vote_operations, apply_vote_batch)
+from website.feeds import RecommendationFeed
+from website.metadata import cached_url_metadata, fitting_image_url
+from website.youtube import get_video_details
+from website.amazon import get_book_details
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.core.urlresolvers import reverse
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.models import User
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
+from django.db.models import Q
 from django.contrib import messages
-from datetime import date, datetime
-from itertools import chain
-from operator import attrgetter
-from django.contrib.postgres.search import (SearchQuery, SearchRank,
-                                            SearchVector)
-from django.core.mail import send_mail
-from urllib.request import urlopen, Request
-# for amazon book info
-import os
-import bottlenose
-from bs4 import BeautifulSoup
-# for youtube api
-from apiclient.discovery import build
-from apiclient.errors import HttpError
-from urllib.parse import urlparse, parse_qs
+import json
 # for unlimted scroll pagination
 from el_pagination.decorators import page_templates, page_template
 
@@ -54,6 +48,25 @@ def category(request, category_name_slug):
     return render(request, 'website/category.html', context_dict)
 
 
+def search(request):
+    context_dict = {}
+    search_form = SearchForm(request.GET)
+    context_dict['search_form'] = search_form
+    if search_form.is_valid():
+        search_keywords = search_form.cleaned_data['search_box']
+        context_dict['search_keywords'] = search_keywords
+        if search_keywords != '':
+            results, next_cursor = search_site(
+                search_keywords, after=request.GET.get('after'))
+            context_dict['results'] = results
+            context_dict['next_cursor'] = next_cursor
+    return render(request, 'website/search.html', context_dict)
+
+
+def search_suggestions(request):
+    return JsonResponse({'suggestions': suggest(request.GET.get('q', ''))})
+
+
 @page_templates({
     'website/subcategory_website_page.html': None,
     'website/subcategory_book_page.html': 'other_entries_page',
@@ -67,8 +80,6 @@ def subcategory(request, category_name_slug, subcategory_name_slug,
     context_dict['form'] = form
     search_form = SearchForm(initial=request.GET)
     context_dict['search_form'] = search_form
-    # get todays date for filtering recommendations by
-    today = date.today()
 
     try:
         user = request.user
@@ -78,30 +89,6 @@ def subcategory(request, category_name_slug, subcategory_name_slug,
                                               category=category)
         context_dict['subcategory_name'] = subcategory.name
         context_dict['subcategory'] = subcategory
-        website_list = (
-            WebsiteRecommendation
-            .objects
-            .filter(subcategory=subcategory)
-            .annotate(totalvotes=Count('upvote') - Count('downvote'))
-            .order_by('-totalvotes')
-        )
-        context_dict['websites'] = website_list
-        book_list = (
-            BookRecommendation
-            .objects
-            .filter(subcategory=subcategory)
-            .annotate(totalvotes=Count('upvote') - Count('downvote'))
-            .order_by('-totalvotes')
-        )
-        context_dict['books'] = book_list
-        video_list = (
-            VideoRecommendation
-            .objects
-            .filter(subcategory=subcategory)
-            .annotate(totalvotes=Count('upvote') - Count('downvote'))
-            .order_by('-totalvotes')
-        )
-        context_dict['videos'] = video_list
 
     except SubCategory.DoesNotExist:
         raise Http404
@@ -109,127 +96,41 @@ def subcategory(request, category_name_slug, subcategory_name_slug,
     except Category.DoesNotExist:
         raise Http404
 
+    # all time best is shown unless another filter has been picked
+    time_filter = None
     if request.method == 'GET':
         form = DateFilterForm(request.GET)
-
         if form.is_valid():
-            filter_type = (form.cleaned_data['time_filter'])
-
-            if filter_type == 'newest':
-                website_list = (
-                    WebsiteRecommendation
-                    .objects
-                    .filter(subcategory=subcategory)
-                    .order_by('-created_date')
-                )
-                context_dict['websites'] = website_list
-                book_list = (
-                    BookRecommendation
-                    .objects
-                    .filter(subcategory=subcategory)
-                    .order_by('-created_date')
-                )
-                context_dict['books'] = book_list
-                video_list = (
-                    VideoRecommendation
-                    .objects
-                    .filter(subcategory=subcategory)
-                    .order_by('-created_date')
-                )
-                context_dict['videos'] = video_list
-            elif filter_type == 'best-of-year':
-                website_list = (
-                    WebsiteRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['websites'] = website_list
-                book_list = (
-                    BookRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['books'] = book_list
-                video_list = (
-                    VideoRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['videos'] = video_list
-            elif filter_type == 'best-of-month':
-                website_list = (
-                    WebsiteRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year,
-                            created_date__month=today.month)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['websites'] = website_list
-                book_list = (
-                    BookRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year,
-                            created_date__month=today.month)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['books'] = book_list
-                video_list = (
-                    VideoRecommendation
-                    .objects
-                    .filter(subcategory=subcategory,
-                            created_date__year=today.year,
-                            created_date__month=today.month)
-                    .annotate(totalvotes=Count('upvote') - Count('downvote'))
-                    .order_by('-totalvotes')
-                )
-                context_dict['videos'] = video_list
+            time_filter = (form.cleaned_data['time_filter'])
 
+    context_dict['websites'] = ranked_recommendations(
+        WebsiteRecommendation, subcategory, time_filter)
+    context_dict['books'] = ranked_recommendations(
+        BookRecommendation, subcategory, time_filter)
+    context_dict['videos'] = ranked_recommendations(
+        VideoRecommendation, subcategory, time_filter)
+
+    if request.method == 'GET':
         search_form = SearchForm(request.GET)
         if search_form.is_valid():
             search_keywords = (search_form.cleaned_data['search_box'])
             context_dict['search_keywords'] = search_keywords
 
             if search_keywords != '':
-                # add weighting to gear more towards title?
-                website_list = (
-                    WebsiteRecommendation
-                    .objects
-                    .annotate(search=SearchVector('title', 'description'),)
-                    .filter(subcategory=subcategory,
-                            search=SearchQuery(search_keywords))
-                )
-                context_dict['websites'] = website_list
-                book_list = (
-                    BookRecommendation
-                    .objects
-                    .annotate(search=SearchVector('title',
-                                                  'book_description'),)
-                    .filter(subcategory=subcategory,
-                            search=SearchQuery(search_keywords))
-                )
-                context_dict['books'] = book_list
-                video_list = (
-                    VideoRecommendation
-                    .objects
-                    .annotate(search=SearchVector('title',
-                                                  'video_description'),)
-                    .filter(subcategory=subcategory,
-                            search=SearchQuery(search_keywords))
-                )
-                context_dict['videos'] = video_list
+                context_dict['websites'] = search_recommendations(
+                    WebsiteRecommendation, subcategory, search_keywords)
+                context_dict['books'] = search_recommendations(
+                    BookRecommendation, subcategory, search_keywords)
+                context_dict['videos'] = search_recommendations(
+                    VideoRecommendation, subcategory, search_keywords)
+
+    # ids the current user has voted on or bookmarked in this subcategory
+    context_dict['viewer_websites'] = viewer_vote_state(
+        user, WebsiteRecommendation, subcategory=subcategory)
+    context_dict['viewer_books'] = viewer_vote_state(
+        user, BookRecommendation, subcategory=subcategory)
+    context_dict['viewer_videos'] = viewer_vote_state(
+        user, VideoRecommendation, subcategory=subcategory)
 
     if extra_context is not None:
         context_dict.update(extra_context)
@@ -268,22 +169,16 @@ class CreateWebsiteRecommendation(CreateView):
             .get(slug=self.kwargs["subcategory_name_slug"])
         )
         form.instance.website_author = self.request.user
-
-        try:
-            # headers used as some websites dont let you use urlopen on them
-            webpage = urlopen(Request(
-                website_url, headers={'User-Agent': 'Mozilla'})).read()
-            soup = BeautifulSoup(webpage, "lxml")
-            og_image_url = soup.find("meta", property="og:image", content=True)
-            image_url = og_image_url["content"]
-            try:
-                check_if_url_works = urlopen(Request(
-                    image_url, headers={'User-Agent': 'Mozilla'})).read()
-                form.instance.image_url = image_url
-            except:
-                form.instance.image_url = None
-        except:
+        # the og:image is looked up by the process_website_images worker so
+        # a slow website does not hold up the request, unless the same url
+        # has been fetched recently
+        metadata = cached_url_metadata(website_url)
+        if metadata is not None:
+            form.instance.image_url = fitting_image_url(metadata.image_url)
+            form.instance.image_pending = False
+        else:
             form.instance.image_url = None
+            form.instance.image_pending = True
         return super(CreateWebsiteRecommendation, self).form_valid(form)
 
     def get_success_url(self):
@@ -321,30 +216,50 @@ def profile_page(request, username, template='website/profile.html',
     context_dict = {}
     user = get_object_or_404(User, username=username)
     context_dict['profile_user'] = user
-    website_recommendations = (WebsiteRecommendation
-                               .objects
-                               .filter(website_author=user))
-    book_recommendations = (BookRecommendation
-                            .objects.filter(recommended_by=user))
-    video_recommendations = (VideoRecommendation
-                             .objects
-                             .filter(recommended_by=user))
-
-    recommendations_list = sorted(chain(website_recommendations,
-                                        book_recommendations,
-                                        video_recommendations),
-                                  key=attrgetter('created_date'),
-                                  reverse=True)
+    # the recommendations and bookmarks are merged newest first and
+    # paginated by the database, only the page being shown is loaded
+    recommendations_list = RecommendationFeed([
+        WebsiteRecommendation.objects
+                             .filter(website_author=user)
+                             .select_related('website_author', 'category',
+                                             'subcategory'),
+        BookRecommendation.objects
+                          .filter(recommended_by=user)
+                          .select_related('recommended_by', 'category',
+                                          'subcategory'),
+        VideoRecommendation.objects
+                           .filter(recommended_by=user)
+                           .select_related('recommended_by', 'category',
+                                           'subcategory'),
+    ])
     context_dict['recommendations_list'] = recommendations_list
-    website_bookmarks = WebsiteRecommendation.objects.filter(bookmark=user)
-    book_bookmarks = BookRecommendation.objects.filter(bookmark=user)
-    video_bookmarks = VideoRecommendation.objects.filter(bookmark=user)
-    bookmark_list = sorted(chain(website_bookmarks,
-                                 book_bookmarks,
-                                 video_bookmarks),
-                           key=attrgetter('created_date'),
-                           reverse=True)
+    bookmark_list = RecommendationFeed([
+        WebsiteRecommendation.objects
+                             .filter(bookmark=user)
+                             .select_related('website_author', 'category',
+                                             'subcategory'),
+        BookRecommendation.objects
+                          .filter(bookmark=user)
+                          .select_related('recommended_by', 'category',
+                                          'subcategory'),
+        VideoRecommendation.objects
+                           .filter(bookmark=user)
+                           .select_related('recommended_by', 'category',
+                                           'subcategory'),
+    ])
     context_dict['bookmark_list'] = bookmark_list
+    # ids the viewer has voted on or bookmarked among the recommendations
+    # and bookmarks shown on this profile
+    viewer = request.user
+    context_dict['viewer_websites'] = viewer_vote_state(
+        viewer, WebsiteRecommendation,
+        Q(website_author=user) | Q(bookmark=user))
+    context_dict['viewer_books'] = viewer_vote_state(
+        viewer, BookRecommendation,
+        Q(recommended_by=user) | Q(bookmark=user))
+    context_dict['viewer_videos'] = viewer_vote_state(
+        viewer, VideoRecommendation,
+        Q(recommended_by=user) | Q(bookmark=user))
     if extra_context is not None:
         context_dict.update(extra_context)
     return render(request, template, context_dict)
@@ -353,35 +268,23 @@ def profile_page(request, username, template='website/profile.html',
 @login_required
 @require_POST
 def upvote_website(request):
-    if request.method == 'POST':
-        user = request.user
-        websiteid = request.POST.get('websiteid')
-        website = WebsiteRecommendation.objects.get(id=int(websiteid))
-        if website.upvote.filter(id=user.id).exists():
-            website.upvote.remove(user)
-        else:
-            website.upvote.add(user)
-            if website.downvote.filter(id=user.id).exists():
-                website.downvote.remove(user)
-    ctx = {'total_website_votes': website.total_votes, }
-    return HttpResponse(website.total_votes)
+    websiteid = request.POST.get('websiteid')
+    score = toggle_vote(WebsiteRecommendation, int(websiteid), request.user,
+                        Vote.UP)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
 @require_POST
 def downvote_website(request):
-    if request.method == 'POST':
-        user = request.user
-        websiteid = request.POST.get('websiteid')
-        website = WebsiteRecommendation.objects.get(id=int(websiteid))
-        if website.downvote.filter(id=user.id).exists():
-            website.downvote.remove(user)
-        else:
-            website.downvote.add(user)
-            if website.upvote.filter(id=user.id).exists():
-                website.upvote.remove(user)
-    ctx = {'total_website_votes': website.total_votes}
-    return HttpResponse(website.total_votes)
+    websiteid = request.POST.get('websiteid')
+    score = toggle_vote(WebsiteRecommendation, int(websiteid), request.user,
+                        Vote.DOWN)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
@@ -400,6 +303,23 @@ def bookmark_website(request):
     return HttpResponse(status=204)
 
 
+@login_required
+@require_POST
+def vote_batch(request):
+    # applies a JSON list of {"type", "id", "action"} operations, as sent by
+    # clients queueing clicks, and returns the new score of each item
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        operations = parse_vote_operations(
+            data.get('operations') if isinstance(data, dict) else None)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    scores = apply_vote_batch(request.user, operations)
+    return JsonResponse({'scores': [
+        {'type': item_type, 'id': pk, 'score': score}
+        for (item_type, pk), score in sorted(scores.items())]})
+
+
 @page_template('website/website_comment_page.html')
 def website_comment(request, category_name_slug, subcategory_name_slug, pk,
                     template='website/website_comment.html',
@@ -413,6 +333,8 @@ def website_comment(request, category_name_slug, subcategory_name_slug, pk,
     context_dict['subcategory'] = subcategory
     website = get_object_or_404(WebsiteRecommendation, id=pk)
     context_dict['website'] = website
+    context_dict['viewer_websites'] = viewer_vote_state(
+        request.user, WebsiteRecommendation, id=website.id)
     comments = (WebsiteComment.objects
                               .filter(website=website)
                               .order_by('-created_date')[:100])
@@ -491,16 +413,6 @@ def create_book_recommendation(request, category_name_slug,
     context_dict['subcategory'] = subcategory
     form = BookForm(category=category, subcategory=subcategory)
 
-    AWS_ACCESS_KEY_ID = os.environ['AWS_ACCESS_KEY_ID']
-    AWS_SECRET_ACCESS_KEY = os.environ['AWS_SECRET_ACCESS_KEY']
-    AWS_ASSOCIATE_TAG = os.environ['AWS_ASSOCIATE_TAG']
-
-    amazon = bottlenose.Amazon(
-                               AWS_ACCESS_KEY_ID,
-                               AWS_SECRET_ACCESS_KEY,
-                               AWS_ASSOCIATE_TAG,
-                               Parser=lambda text: BeautifulSoup(text, 'xml')
-    )
     if request.method == "POST":
         form = BookForm(request.POST, category=category,
                         subcategory=subcategory)
@@ -509,22 +421,16 @@ def create_book_recommendation(request, category_name_slug,
             book = form.save(commit=False)
 
             try:
-                results = amazon.ItemLookup(ItemId=isbn, ResponseGroup="Medium",
-                                            SearchIndex="Books", IdType="ISBN")
-                date_published = results.find('PublicationDate').string
-                # some amazon books only return the year and not the full date
-                if len(date_published) == 4:
-                    date_published = "%s-01-01" % date_published
-                book.book_publish_date = date_published
-                # review line below - dont think it is a good way of doing it
-                book.book_image_url = results.find('LargeImage').text[:-6]
+                details = get_book_details(isbn)
+                book.book_publish_date = details['publish_date']
+                book.book_image_url = details['image_url']
                 book.recommended_by = user
                 book.category = category
                 book.subcategory = subcategory
-                book.title = results.find('Title').string
-                book.book_author = results.find('Author').string
-                book.book_description = results.find('Content').string
-                book.book_url = results.find('DetailPageURL').string
+                book.title = details['title']
+                book.book_author = details['author']
+                book.book_description = details['description']
+                book.book_url = details['url']
                 book.save()
                 return redirect('subcategory', category_name_slug=category.slug,
                                 subcategory_name_slug=subcategory.slug)
@@ -560,37 +466,23 @@ class DeleteBookRecommendation(DeleteView):
 @login_required
 @require_POST
 def upvote_book(request):
-    if request.method == 'POST':
-        user = request.user
-        bookid = request.POST.get('bookid')
-        book = BookRecommendation.objects.get(id=int(bookid))
-
-        if book.upvote.filter(id=user.id).exists():
-            book.upvote.remove(user)
-        else:
-            book.upvote.add(user)
-            if book.downvote.filter(id=user.id).exists():
-                book.downvote.remove(user)
-    ctx = {'total_book_votes': book.total_votes, }
-    return HttpResponse(book.total_votes)
+    bookid = request.POST.get('bookid')
+    score = toggle_vote(BookRecommendation, int(bookid), request.user,
+                        Vote.UP)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
 @require_POST
 def downvote_book(request):
-    if request.method == 'POST':
-        user = request.user
-        bookid = request.POST.get('bookid')
-        book = BookRecommendation.objects.get(id=int(bookid))
-
-        if book.downvote.filter(id=user.id).exists():
-            book.downvote.remove(user)
-        else:
-            book.downvote.add(user)
-            if book.upvote.filter(id=user.id).exists():
-                book.upvote.remove(user)
-    ctx = {'total_book_votes': book.total_votes}
-    return HttpResponse(book.total_votes)
+    bookid = request.POST.get('bookid')
+    score = toggle_vote(BookRecommendation, int(bookid), request.user,
+                        Vote.DOWN)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
@@ -622,6 +514,8 @@ def book_comment(request, category_name_slug, subcategory_name_slug, pk,
     context_dict['subcategory'] = subcategory
     book = get_object_or_404(BookRecommendation, id=pk)
     context_dict['book'] = book
+    context_dict['viewer_books'] = viewer_vote_state(
+        request.user, BookRecommendation, id=book.id)
     comments = (BookComment.objects
                            .filter(book=book)
                            .order_by('-created_date')[:100])
@@ -709,58 +603,17 @@ def create_video_recommendation(request, category_name_slug,
                          subcategory=subcategory)
         if form.is_valid():
             try:
-                url = (form.cleaned_data['video_url'])
                 video = form.save(commit=False)
-                if url.startswith(('youtu', 'www')):
-                    url = 'http://' + url
-                query = urlparse(url)
-                if 'youtube' in query.hostname:
-                    if query.path == '/watch':
-                        video_id = parse_qs(query.query)['v'][0]
-                    elif query.path.startswith(('/embed/', '/v/')):
-                        video_id = query.path.split('/')[2]
-                elif 'youtu.be' in query.hostname:
-                    video_id = query.path[1:]
-                else:
-                    raise ValueError
-
-                DEVELOPER_KEY = os.environ['YOUTUBE_DEVELOPER_KEY']
-                YOUTUBE_API_SERVICE_NAME = "youtube"
-                YOUTUBE_API_VERSION = "v3"
-
-                youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
-                                developerKey=DEVELOPER_KEY)
-
-                search_response = youtube.videos().list(
-                  id=video_id,
-                  part='snippet'
-                ).execute()
-
-                # check that a video has been found by seing if the results
-                # returned is greater than 0
-                if search_response["pageInfo"]["totalResults"] > 0:
-                    for item in search_response["items"]:
-                        title = item["snippet"]["title"]
-                        description = item["snippet"]["description"]
-                        # some videos do not have the standard thumbnail,
-                        # get high quality thumbnail if the standard one
-                        # is not available.
-                        try:
-                            thumbnail = (item["snippet"]["thumbnails"]
-                                         ["standard"]["url"])
-                        except:
-                            thumbnail = (item["snippet"]["thumbnails"]["high"]
-                                         ["url"])
-
-                        publish_date = item["snippet"]["publishedAt"]
-
+                video_id = form.video_id
+                details = get_video_details(video_id)
+                if details is not None:
                     video.category = category
                     video.subcategory = subcategory
-                    video.title = title
+                    video.title = details['title']
                     video.recommended_by = user
-                    video.video_description = description
-                    video.video_publish_date = publish_date
-                    video.video_image_url = thumbnail
+                    video.video_description = details['description']
+                    video.video_publish_date = details['publish_date']
+                    video.video_image_url = details['thumbnail']
                     video.video_id = video_id
                     video.save()
                     return redirect('subcategory',
@@ -799,37 +652,23 @@ class DeleteVideoRecommendation(DeleteView):
 @login_required
 @require_POST
 def upvote_video(request):
-    if request.method == 'POST':
-        user = request.user
-        videoid = request.POST.get('videoid')
-        video = VideoRecommendation.objects.get(id=int(videoid))
-        if video.upvote.filter(id=user.id).exists():
-            video.upvote.remove(user)
-        else:
-            video.upvote.add(user)
-            if video.downvote.filter(id=user.id).exists():
-                video.downvote.remove(user)
-
-    ctx = {'total_video_votes': video.total_votes, }
-    return HttpResponse(video.total_votes)
+    videoid = request.POST.get('videoid')
+    score = toggle_vote(VideoRecommendation, int(videoid), request.user,
+                        Vote.UP)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
 @require_POST
 def downvote_video(request):
-    if request.method == 'POST':
-        user = request.user
-        videoid = request.POST.get('videoid')
-        video = VideoRecommendation.objects.get(id=int(videoid))
-        if video.downvote.filter(id=user.id).exists():
-            video.downvote.remove(user)
-        else:
-            video.downvote.add(user)
-            if video.upvote.filter(id=user.id).exists():
-                video.upvote.remove(user)
-
-    ctx = {'total_video_votes': video.total_votes}
-    return HttpResponse(video.total_votes)
+    videoid = request.POST.get('videoid')
+    score = toggle_vote(VideoRecommendation, int(videoid), request.user,
+                        Vote.DOWN)
+    if score is None:
+        raise Http404
+    return HttpResponse(score)
 
 
 @login_required
@@ -860,6 +699,8 @@ def video_comment(request, category_name_slug, subcategory_name_slug, pk,
     context_dict['subcategory'] = subcategory
     video = get_object_or_404(VideoRecommendation, id=pk)
     context_dict['video'] = video
+    context_dict['viewer_videos'] = viewer_vote_state(
+        request.user, VideoRecommendation, id=video.id)
     comments = (VideoComment.objects
                             .filter(video=video)
                             .order_by('-created_date'))
@@ -946,17 +787,8 @@ def report_website_recommendation(request, category_name_slug,
         report_form = ReportForm(request.GET)
         if report_form.is_valid():
             report_message = (report_form.cleaned_data['message_box'])
-            email_message = ('Reported by: ' + str(user)
-                             + '\nType: Website'
-                             + '\nCategory: ' + str(category)
-                             + '\nSubcategory: ' + str(subcategory)
-                             + '\nRecommended by: '
-                             + str(website.website_author)
-                             + '\nTitle: ' + str(website.title)
-                             + '\nIssue reported: ' + report_message)
-            send_mail('Noobhub recommendation report!', email_message,
-                      'noobhubio@gmail.com', ['oliver@rotherfields.co.uk'],
-                      fail_silently=False,)
+            Report.objects.create(reported_by=user, content_object=website,
+                                  message=report_message)
             return redirect('subcategory', category_name_slug=category.slug,
                             subcategory_name_slug=subcategory.slug)
 
@@ -983,16 +815,8 @@ def report_book_recommendation(request, category_name_slug,
         report_form = ReportForm(request.GET)
         if report_form.is_valid():
             report_message = (report_form.cleaned_data['message_box'])
-            email_message = ('Reported by: ' + str(user)
-                             + '\nType: Book'
-                             + '\nCategory: ' + str(category)
-                             + '\nSubcategory: ' + str(subcategory)
-                             + '\nRecommended by: ' + str(book.recommended_by)
-                             + '\nTitle: ' + str(book.title)
-                             + '\nIssue reported: ' + report_message)
-            send_mail('Noobhub recommendation report!', email_message,
-                      'noobhubio@gmail.com', ['oliver@rotherfields.co.uk'],
-                      fail_silently=False,)
+            Report.objects.create(reported_by=user, content_object=book,
+                                  message=report_message)
             return redirect('subcategory', category_name_slug=category.slug,
                             subcategory_name_slug=subcategory.slug)
 
@@ -1019,16 +843,8 @@ def report_video_recommendation(request, category_name_slug,
         report_form = ReportForm(request.GET)
         if report_form.is_valid():
             report_message = (report_form.cleaned_data['message_box'])
-            email_message = ('Reported by: ' + str(user)
-                             + '\nType: Video'
-                             + '\nCategory: ' + str(category)
-                             + '\nSubcategory: ' + str(subcategory)
-                             + '\nRecommended by: ' + str(video.recommended_by)
-                             + '\nTitle: ' + str(video.title)
-                             + '\nIssue reported: ' + report_message)
-            send_mail('Noobhub recommendation report!', email_message,
-                      'noobhubio@gmail.com', ['oliver@rotherfields.co.uk'],
-                      fail_silently=False,)
+            Report.objects.create(reported_by=user, content_object=video,
+                                  message=report_message)
             return redirect('subcategory', category_name_slug=category.slug,
                             subcategory_name_slug=subcategory.slug)
 
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from website.models import VoteEvent, VoteSnapshot
+
+
+# sums the rows of source between start and end into one snapshot per
+# recommendation and period. Snapshots already there are overwritten, so
+# a period can be rolled up again once more rows have arrived.
+ROLLUP_SQL = """
+    INSERT INTO {snapshots}
+        (content_type_id, object_id, period, period_start, upvotes,
+         downvotes, score)
+    SELECT content_type_id, object_id, %(period)s,
+           date_trunc(%(period)s, {time}), SUM(upvotes), SUM(downvotes),
+           SUM(upvotes - downvotes)
+    FROM {source}
+    WHERE {time} >= %(start)s AND {time} < %(end)s {where}
+    GROUP BY 1, 2, 4
+    ON CONFLICT (content_type_id, object_id, period, period_start)
+    DO UPDATE SET upvotes = EXCLUDED.upvotes,
+                  downvotes = EXCLUDED.downvotes,
+                  score = EXCLUDED.score
+"""
+
+
+def rollup(cursor, source, time, period, start, end, where=''):
+    qn = connection.ops.quote_name
+    cursor.execute(
+        ROLLUP_SQL.format(snapshots=qn(VoteSnapshot._meta.db_table),
+                          source=qn(source), time=time, where=where),
+        {'period': period, 'start': start, 'end': end})
+    return cursor.rowcount
+
+
+def compact_vote_events(now=None):
+    """
+    Rolls the vote events of every hour that has ended into hourly
+    VoteSnapshot rows and those into daily ones, then deletes events older
+    than VOTE_EVENT_RETENTION and hourly snapshots older than
+    VOTE_SNAPSHOT_HOURLY_RETENTION. Returns the number of hourly and daily
+    snapshots written and of events deleted.
+
+    Compaction carries on from the latest hourly snapshot, which is rolled
+    up again along with its day in case events were committed after the
+    last run, so running it twice or after a missed run is harmless.
+    """
+    now = now or timezone.now()
+    end = now.replace(minute=0, second=0, microsecond=0)
+    start = (VoteSnapshot.objects
+                         .filter(period=VoteSnapshot.HOUR)
+                         .aggregate(start=Max('period_start'))['start'] or
+             VoteEvent.objects.aggregate(start=Min('created_date'))['start'])
+    hourly = daily = 0
+    with transaction.atomic():
+        if start is not None and start < end:
+            start = start.replace(minute=0, second=0, microsecond=0)
+            with connection.cursor() as cursor:
+                hourly = rollup(cursor, VoteEvent._meta.db_table,
+                                'created_date', VoteSnapshot.HOUR, start, end)
+                daily = rollup(cursor, VoteSnapshot._meta.db_table,
+                               'period_start', VoteSnapshot.DAY,
+                               start.replace(hour=0), end,
+                               "AND period = 'hour'")
+        # events are only deleted once their hour has been compacted
+        events_before = min(
+            end, now - timedelta(seconds=settings.VOTE_EVENT_RETENTION))
+        deleted, rows = VoteEvent.objects.filter(
+            created_date__lt=events_before).delete()
+        VoteSnapshot.objects.filter(
+            period=VoteSnapshot.HOUR,
+            period_start__lt=now - timedelta(
+                seconds=settings.VOTE_SNAPSHOT_HOURLY_RETENTION)).delete()
+    return hourly, daily, deleted
@@ -0,0 +1,307 @@
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import IntegerField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from website.leaderboards import sync_leaderboard_scores
+from website.models import (WebsiteRecommendation, BookRecommendation,
+                            VideoRecommendation, LeaderboardEntry, Vote,
+                            VoteEvent)
+
+
+# the types and actions accepted by /votes/batch/. Each action toggles
+# like the matching single click view, bookmark is not a vote.
+VOTE_BATCH_TYPES = {
+    'website': WebsiteRecommendation,
+    'book': BookRecommendation,
+    'video': VideoRecommendation,
+}
+VOTE_BATCH_ACTIONS = {
+    'upvote': Vote.UP,
+    'downvote': Vote.DOWN,
+    'bookmark': None,
+}
+
+
+def vote_count_sql(model, value):
+    # correlated COUNT(*) of the votes of one value on each row of model,
+    # read from the (content_type, object_id, value) index
+    qn = connection.ops.quote_name
+    votes = qn(Vote._meta.db_table)
+    sql = ('SELECT COUNT(*) FROM {votes} '
+           'WHERE {votes}.content_type_id = %s '
+           'AND {votes}.object_id = {table}.{pk} '
+           'AND {votes}.value = %s').format(
+        votes=votes, table=qn(model._meta.db_table),
+        pk=qn(model._meta.pk.column))
+    content_type = ContentType.objects.get_for_model(model)
+    return RawSQL(sql, [content_type.pk, value], output_field=IntegerField())
+
+
+def refresh_vote_counts(model, pks=None):
+    """
+    Rebuild the upvote_count, downvote_count and score columns of a
+    recommendation model from its rows in the vote table. Only the rows in
+    pks are updated if given, otherwise the whole table is.
+    """
+    queryset = model._default_manager.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    upvotes = vote_count_sql(model, Vote.UP)
+    downvotes = vote_count_sql(model, Vote.DOWN)
+    return queryset.update(upvote_count=upvotes,
+                           downvote_count=downvotes,
+                           score=upvotes - downvotes)
+
+
+def toggle_vote(model, pk, user, value):
+    """
+    Toggles user's Vote.UP or Vote.DOWN of the recommendation of model with
+    id pk, replacing any opposite vote, and returns its new score, or None
+    if there is no such recommendation.
+
+    The vote row, the upvote_count, downvote_count and score columns, the
+    leaderboard entries and the vote event log are all changed by one
+    statement, adjusting the counters by the vote it replaced rather than
+    recounting. The
+    recommendation row is locked by a statement before it, so clicks on the
+    same recommendation are applied one after another.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    sql = """
+        WITH previous AS (
+            SELECT value FROM {votes}
+            WHERE user_id = %(user)s AND content_type_id = %(content_type)s
+              AND object_id = %(pk)s
+        ), removed AS (
+            DELETE FROM {votes}
+            WHERE user_id = %(user)s AND content_type_id = %(content_type)s
+              AND object_id = %(pk)s AND value = %(value)s
+            RETURNING value
+        ), voted AS (
+            INSERT INTO {votes}
+                (user_id, content_type_id, object_id, value, created_date)
+            SELECT %(user)s, %(content_type)s, %(pk)s, %(value)s, %(now)s
+            WHERE NOT EXISTS (SELECT 1 FROM removed)
+            ON CONFLICT (user_id, content_type_id, object_id)
+            DO UPDATE SET value = EXCLUDED.value,
+                          created_date = EXCLUDED.created_date
+            RETURNING value
+        ), changes AS (
+            SELECT (SELECT COUNT(*) FROM voted WHERE value = 1)
+                   - (SELECT COUNT(*) FROM previous WHERE value = 1)
+                   AS upvotes,
+                   (SELECT COUNT(*) FROM voted WHERE value = -1)
+                   - (SELECT COUNT(*) FROM previous WHERE value = -1)
+                   AS downvotes
+        ), logged AS (
+            INSERT INTO {events}
+                (user_id, content_type_id, object_id, upvotes, downvotes,
+                 created_date)
+            SELECT %(user)s, %(content_type)s, %(pk)s, upvotes, downvotes,
+                   %(now)s
+            FROM changes
+        ), updated AS (
+            UPDATE {table}
+            SET upvote_count = upvote_count + changes.upvotes,
+                downvote_count = downvote_count + changes.downvotes,
+                score = score + changes.upvotes - changes.downvotes
+            FROM changes
+            WHERE {table}.id = %(pk)s
+            RETURNING {table}.id, {table}.score
+        ), synced AS (
+            UPDATE {leaderboard}
+            SET score = updated.score
+            FROM updated
+            WHERE {leaderboard}.content_type_id = %(content_type)s
+              AND {leaderboard}.object_id = updated.id
+        )
+        SELECT score FROM updated
+    """.format(
+        table=table,
+        votes=qn(Vote._meta.db_table),
+        events=qn(VoteEvent._meta.db_table),
+        leaderboard=qn(LeaderboardEntry._meta.db_table),
+    )
+    params = {
+        'pk': pk,
+        'user': user.pk,
+        'value': value,
+        'content_type': ContentType.objects.get_for_model(model).pk,
+        'now': timezone.now(),
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM %s WHERE id = %%s FOR UPDATE' % table,
+                       [pk])
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+def viewer_vote_state(user, model, *args, **kwargs):
+    """
+    Returns the ids of the recommendations of model that user has upvoted,
+    downvoted and bookmarked as sets, using one query for the votes and one
+    for the bookmarks. The recommendations can be narrowed with the same
+    arguments as filter(). Listing templates check membership in these sets
+    rather than loading every voter of every card.
+    """
+    state = {'upvoted': set(), 'downvoted': set(), 'bookmarked': set()}
+    if not user.is_authenticated:
+        return state
+
+    recommendations = model._default_manager.filter(*args, **kwargs)
+    content_type = ContentType.objects.get_for_model(model)
+    votes = (Vote.objects
+                 .filter(user=user, content_type=content_type,
+                         object_id__in=recommendations.values('pk'))
+                 .values_list('object_id', 'value'))
+    for object_id, value in votes:
+        state['upvoted' if value == Vote.UP else 'downvoted'].add(object_id)
+    # separate filter() call so a narrowing on bookmark does not share the
+    # join used for the user's own bookmarks
+    state['bookmarked'] = set(recommendations.filter(bookmark=user)
+                                             .values_list('pk', flat=True))
+    return state
+
+
+def parse_vote_operations(operations):
+    """
+    Checks a list of {'type', 'id', 'action'} operations sent to
+    /votes/batch/ and returns them as (type, id, action) tuples. Raises
+    ValueError if one is malformed or there are more than
+    VOTE_BATCH_MAX_OPERATIONS.
+    """
+    if not isinstance(operations, list):
+        raise ValueError('operations must be a list')
+    if len(operations) > settings.VOTE_BATCH_MAX_OPERATIONS:
+        raise ValueError('at most %d operations can be sent at once'
+                         % settings.VOTE_BATCH_MAX_OPERATIONS)
+    parsed = []
+    for operation in operations:
+        try:
+            item_type, pk, action = (operation['type'], int(operation['id']),
+                                     operation['action'])
+            valid = (item_type in VOTE_BATCH_TYPES and
+                     action in VOTE_BATCH_ACTIONS)
+        except (KeyError, TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValueError('each operation needs a type of website, book '
+                             'or video, an integer id and an action of '
+                             'upvote, downvote or bookmark')
+        parsed.append((item_type, pk, action))
+    return parsed
+
+
+def vote_change(votes, new_votes, pk, value):
+    # change to the count of value votes on pk between votes and new_votes
+    return (new_votes.get(pk) == value) - (votes.get(pk) == value)
+
+
+def apply_batch_to_model(model, user, operations):
+    # applies the (id, action) operations on recommendations of one model
+    # and returns the (id, score) of those that exist
+    found = set(model._default_manager
+                     .select_for_update()
+                     .filter(pk__in={pk for pk, action in operations})
+                     .order_by('pk')
+                     .values_list('pk', flat=True))
+    if not found:
+        return []
+
+    content_type = ContentType.objects.get_for_model(model)
+    votes = dict(Vote.objects
+                     .filter(user=user, content_type=content_type,
+                             object_id__in=found)
+                     .values_list('object_id', 'value'))
+    bookmark = model._meta.get_field('bookmark')
+    through = bookmark.remote_field.through
+    recommendation_field = bookmark.m2m_field_name()
+    user_bookmarks = through.objects.filter(**{
+        bookmark.m2m_reverse_field_name(): user,
+        recommendation_field + '__in': found,
+    })
+    bookmarks = set(user_bookmarks.values_list(recommendation_field,
+                                               flat=True))
+
+    new_votes = dict(votes)
+    new_bookmarks = set(bookmarks)
+    for pk, action in operations:
+        if pk not in found:
+            continue
+        value = VOTE_BATCH_ACTIONS[action]
+        if value is None:
+            new_bookmarks ^= {pk}
+        elif new_votes.get(pk) == value:
+            del new_votes[pk]
+        else:
+            new_votes[pk] = value
+
+    changed = sorted(pk for pk in found if votes.get(pk) != new_votes.get(pk))
+    if changed:
+        # deleted with SQL rather than the ORM so the Vote receivers do not
+        # recount each row, a replaced vote is inserted again
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM %s WHERE user_id = %%s AND content_type_id = %%s '
+                'AND object_id = ANY(%%s)' % connection.ops.quote_name(
+                    Vote._meta.db_table),
+                [user.pk, content_type.pk, changed])
+        Vote.objects.bulk_create([
+            Vote(user=user, content_type=content_type, object_id=pk,
+                 value=new_votes[pk])
+            for pk in changed if pk in new_votes])
+        VoteEvent.objects.bulk_create([
+            VoteEvent(user=user, content_type=content_type, object_id=pk,
+                      upvotes=vote_change(votes, new_votes, pk, Vote.UP),
+                      downvotes=vote_change(votes, new_votes, pk, Vote.DOWN))
+            for pk in changed])
+        refresh_vote_counts(model, changed)
+        sync_leaderboard_scores(model, changed)
+
+    removed = bookmarks - new_bookmarks
+    if removed:
+        user_bookmarks.filter(**{recommendation_field + '__in': removed}) \
+                      .delete()
+    added = new_bookmarks - bookmarks
+    if added:
+        through.objects.bulk_create([
+            through(**{recommendation_field + '_id': pk,
+                       bookmark.m2m_reverse_field_name() + '_id': user.pk})
+            for pk in sorted(added)])
+
+    return model._default_manager.filter(pk__in=found) \
+                                  .values_list('pk', 'score')
+
+
+def apply_vote_batch(user, operations):
+    """
+    Applies the (type, id, action) operations from parse_vote_operations
+    for user in one transaction and returns {(type, id): score} for every
+    recommendation they touched. Operations toggle in the order given, as
+    if the clicks had been sent one by one, and ones on recommendations
+    that no longer exist are skipped.
+
+    The user's votes and bookmarks on the touched recommendations are read
+    once per type, the operations are applied to them in memory and only
+    the differences are written with bulk inserts and deletes, so the
+    number of queries does not grow with the number of operations.
+    """
+    batches = defaultdict(list)
+    for item_type, pk, action in operations:
+        batches[item_type].append((pk, action))
+
+    scores = {}
+    with transaction.atomic():
+        # rows are locked a type at a time in id order, so batches that
+        # overlap wait on each other rather than deadlock
+        for item_type in sorted(batches):
+            for pk, score in apply_batch_to_model(VOTE_BATCH_TYPES[item_type],
+                                                  user, batches[item_type]):
+                scores[(item_type, pk)] = score
+    return scores
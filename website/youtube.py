@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+import httplib2
+from apiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache.base import Cache
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from website.models import VideoMetadata
+
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_SERVICE_NAME = "youtube"
+YOUTUBE_API_VERSION = "v3"
+
+# one client per thread, httplib2.Http is not thread safe
+_local = threading.local()
+
+
+class DiscoveryCache(Cache):
+    # keeps the discovery document in the django cache, the file cache that
+    # comes with google-api-python-client does not work with oauth2client 4
+
+    def get(self, url):
+        return cache.get('youtube_discovery:%s' % url)
+
+    def set(self, url, content):
+        cache.set('youtube_discovery:%s' % url, content,
+                  settings.YOUTUBE_DISCOVERY_CACHE_TIMEOUT)
+
+
+def build_youtube_client():
+    """
+    Builds a YouTube API client with its own keep-alive connection. The
+    discovery document is read from YOUTUBE_DISCOVERY_DOCUMENT if set,
+    otherwise it is downloaded once and kept in the cache.
+    """
+    developer_key = os.environ['YOUTUBE_DEVELOPER_KEY']
+    http = httplib2.Http(timeout=settings.YOUTUBE_API_TIMEOUT)
+    if settings.YOUTUBE_DISCOVERY_DOCUMENT:
+        with open(settings.YOUTUBE_DISCOVERY_DOCUMENT) as document:
+            return build_from_document(document.read(), http=http,
+                                       developerKey=developer_key)
+    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, http=http,
+                 developerKey=developer_key, cache=DiscoveryCache())
+
+
+def get_youtube_client():
+    # the client is built the first time it is needed and then reused
+    client = getattr(_local, 'client', None)
+    if client is None:
+        start = time.perf_counter()
+        client = build_youtube_client()
+        logger.info('YouTube client discovery took %.1fms',
+                    (time.perf_counter() - start) * 1000)
+        _local.client = client
+    return client
+
+
+def fetch_video_details(video_id):
+    """
+    Returns a dict of the title, description, thumbnail and publish_date
+    of a YouTube video, or None if no video has that id. Raises
+    apiclient.errors.HttpError if the API request fails.
+    """
+    youtube = get_youtube_client()
+    start = time.perf_counter()
+    search_response = youtube.videos().list(
+        id=video_id,
+        part='snippet'
+    ).execute()
+    logger.info('YouTube videos.list took %.1fms',
+                (time.perf_counter() - start) * 1000)
+
+    # check that a video has been found by seing if the results
+    # returned is greater than 0
+    if search_response["pageInfo"]["totalResults"] == 0:
+        return None
+
+    snippet = search_response["items"][0]["snippet"]
+    # some videos do not have the standard thumbnail, get high quality
+    # thumbnail if the standard one is not available.
+    thumbnails = snippet["thumbnails"]
+    thumbnail = thumbnails.get("standard", thumbnails.get("high"))["url"]
+    return {'title': snippet["title"],
+            'description': snippet["description"],
+            'thumbnail': thumbnail,
+            'publish_date': snippet["publishedAt"]}
+
+
+def get_video_details(video_id):
+    """
+    Returns the same dict as fetch_video_details, using the stored
+    VideoMetadata of the video if it was fetched within VIDEO_METADATA_TTL
+    seconds so a video recommended in several subcategories is only looked
+    up once.
+    """
+    max_age = timedelta(seconds=settings.VIDEO_METADATA_TTL)
+    fresh_since = timezone.now() - max_age
+    metadata = (VideoMetadata.objects
+                             .filter(video_id=video_id,
+                                     fetched_date__gte=fresh_since)
+                             .first())
+    if metadata is not None:
+        return {'title': metadata.title,
+                'description': metadata.description,
+                'thumbnail': metadata.thumbnail_url,
+                'publish_date': metadata.publish_date}
+
+    details = fetch_video_details(video_id)
+    if details is not None:
+        VideoMetadata.objects.update_or_create(
+            video_id=video_id,
+            defaults={'title': details['title'],
+                      'description': details['description'],
+                      'thumbnail_url': details['thumbnail'],
+                      'publish_date': details['publish_date'],
+                      'fetched_date': timezone.now()})
+    return details
@@ -140,6 +140,62 @@ STATICFILES_DIRS = (
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# seconds the category navigation list is cached for. Saving or deleting a
+# category clears it straight away, although with the default per-process
+# cache other processes keep their copy until it times out.
+CATEGORY_CACHE_TIMEOUT = 60 * 15
+
+# limits used when fetching the og:image of recommended websites
+WEBSITE_FETCH_TIMEOUT = 5  # seconds per request
+WEBSITE_FETCH_MAX_BYTES = 256 * 1024  # most of a page read for its head
+WEBSITE_IMAGE_MAX_ATTEMPTS = 3  # tries before a website is left without one
+WEBSITE_IMAGE_CLAIM_TIMEOUT = 60 * 10  # seconds before a claim is retried
+
+# fetched website details are reused for this many seconds before being
+# revalidated, and deleted by evict_url_metadata once this much older
+URL_METADATA_TTL = 60 * 60 * 24 * 7
+URL_METADATA_MAX_AGE = 60 * 60 * 24 * 90
+
+# YouTube API client settings. The discovery document is fetched from google
+# and cached unless YOUTUBE_DISCOVERY_DOCUMENT points at a local copy.
+YOUTUBE_API_TIMEOUT = 10
+YOUTUBE_DISCOVERY_DOCUMENT = None
+YOUTUBE_DISCOVERY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# seconds YouTube video details are reused for before being fetched again
+VIDEO_METADATA_TTL = 60 * 60 * 24 * 30
+
+# most matching recommendations of each type ranked by a search
+SEARCH_CANDIDATE_LIMIT = 500
+
+# search box typeahead: shortest prefix looked up, milliseconds the lookups
+# of one prefix may take between them and seconds a prefix is cached for.
+# The trigram indexes cannot serve a prefix shorter than 3 characters.
+TYPEAHEAD_MIN_LENGTH = 3
+TYPEAHEAD_TIME_BUDGET = 50
+TYPEAHEAD_CACHE_TIMEOUT = 60 * 5
+
+# most operations accepted by one request to /votes/batch/
+VOTE_BATCH_MAX_OPERATIONS = 100
+
+# seconds vote events are kept for after being rolled into hourly
+# snapshots, and hourly snapshots after being rolled into daily ones
+VOTE_EVENT_RETENTION = 60 * 60 * 24 * 7
+VOTE_SNAPSHOT_HOURLY_RETENTION = 60 * 60 * 24 * 30
+
+# hot ordering: hot_score = score / (age in hours + HOT_AGE_OFFSET) **
+# HOT_GRAVITY, a higher gravity lets older recommendations sink faster
+HOT_AGE_OFFSET = 2
+HOT_GRAVITY = 1.8
+# seconds a recommendation stays in the hot ordering, older ones get a
+# hot_score of 0
+HOT_SCORE_WINDOW = 60 * 60 * 24 * 7
+
+# seconds Amazon book lookups are reused for, ISBNs Amazon did not know are
+# looked up again sooner
+BOOK_METADATA_TTL = 60 * 60 * 24 * 30
+BOOK_METADATA_NEGATIVE_TTL = 60 * 60 * 24
+
 # registration-redux settings
 REGISTRATION_OPEN = True        # If True, users can register
 ACCOUNT_ACTIVATION_DAYS = 7     # One-week activation window; you may, of course, use a different value.
@@ -155,3 +211,13 @@ EMAIL_HOST_PASSWORD = os.environ['EMAIL_HOST_PASSWORD']
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = os.environ['EMAIL_HOST_USER']
+
+# queued mail is given up on after this many failed attempts, the delay
+# before retrying starts at MAIL_OUTBOX_RETRY_DELAY seconds and doubles
+MAIL_OUTBOX_MAX_ATTEMPTS = 5
+MAIL_OUTBOX_RETRY_DELAY = 60
+MAIL_OUTBOX_CLAIM_TIMEOUT = 60 * 10  # seconds before a claim is retried
+
+# sender and recipients of the send_report_digest mail
+REPORT_DIGEST_FROM_EMAIL = 'noobhubio@gmail.com'
+REPORT_DIGEST_RECIPIENTS = ['oliver@rotherfields.co.uk']
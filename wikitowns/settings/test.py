@@ -1 +1,9 @@
 from .base import *
+
+# test cases roll back their categories without sending delete signals, so
+# the category navigation cache must not outlive a test
+CATEGORY_CACHE_TIMEOUT = 0
+
+# build the YouTube client from the trimmed discovery document in the tests
+YOUTUBE_DISCOVERY_DOCUMENT = os.path.join(
+    BASE_DIR, 'website', 'tests', 'fixtures', 'youtube_v3_discovery.json')